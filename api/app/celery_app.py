@@ -10,4 +10,26 @@ celery_app = Celery(
     include=["app.tasks"],
 )
 
-celery_app.conf.update(task_track_started=True, result_expires=3600)
+# Redis emulates priorities with one list per step: "celery" for 0 (highest), "celery:9" for 9
+BROKER_PRIORITY_STEPS = [0, 3, 6, 9]
+BROKER_PRIORITY_SEP = ":"
+
+
+def broker_queue_keys(queue: str = "celery") -> list:
+    return [queue if step == 0 else f"{queue}{BROKER_PRIORITY_SEP}{step}" for step in BROKER_PRIORITY_STEPS]
+
+
+celery_app.conf.update(
+    task_track_started=True,
+    result_expires=3600,
+    # Reserve one task at a time so a draft queued behind a low-priority full pass isn't
+    # stuck in some worker's prefetch buffer; process_job also acks late (see tasks.py)
+    worker_prefetch_multiplier=1,
+    broker_transport_options={
+        "priority_steps": BROKER_PRIORITY_STEPS,
+        "sep": BROKER_PRIORITY_SEP,
+        "queue_order_strategy": "priority",
+        # Unacked messages (a running process_job, a countdown not yet due) are redelivered after this
+        "visibility_timeout": settings.celery_visibility_timeout_sec,
+    },
+)
@@ -19,22 +19,92 @@ def _default_redis_url() -> str:
 class Settings:
     redis_url: str = os.getenv("REDIS_URL", _default_redis_url())
     whisper_model: str = os.getenv("WHISPER_MODEL", "large-v3")
+    # legacy: Whisper translate-to-English + full-text Korean passes; single_pass: transcribe + one segment-level pass
+    translation_mode: str = os.getenv("TRANSLATION_MODE", "legacy").lower()
+    translate_concurrency: int = int(os.getenv("TRANSLATE_CONCURRENCY", "4"))
+    translate_max_retries: int = int(os.getenv("TRANSLATE_MAX_RETRIES", "4"))
+    translate_backoff_base_sec: float = float(os.getenv("TRANSLATE_BACKOFF_BASE_SEC", "1.0"))
+    # Stream translated subtitle cues while STT runs (per-job option: progressiveSubs)
+    progressive_subtitles: bool = os.getenv("PROGRESSIVE_SUBTITLES", "false").lower() == "true"
+    stt_window_sec: float = float(os.getenv("STT_WINDOW_SEC", "60"))
+    stt_window_overlap_sec: float = float(os.getenv("STT_WINDOW_OVERLAP_SEC", "10"))  # look-ahead to cut windows between segments
+    # Draft mode (per-job option: draft): quick preview first, full-quality pass queued at low priority
+    draft_whisper_model: str = os.getenv("DRAFT_WHISPER_MODEL", "base")
+    draft_max_height: int = int(os.getenv("DRAFT_MAX_HEIGHT", "0"))  # 0 = stream copy at source resolution
+    draft_full_pass_priority: int = int(os.getenv("DRAFT_FULL_PASS_PRIORITY", "9"))  # 0 highest, 9 lowest
     use_whisperx: bool = os.getenv("USE_WHISPERX", "false").lower() == "true"
     tts_provider: str = os.getenv("TTS_PROVIDER", "elevenlabs").lower()
+    # TTS assembly (app.utils.audio): silence between chunks and per-chunk loudness target
+    tts_gap_sec: float = float(os.getenv("TTS_GAP_SEC", "0.2"))
+    tts_target_dbfs: float = float(os.getenv("TTS_TARGET_DBFS", "-20"))
+    # Segment-timed dubbing (per-job option: timedDub): one TTS clip per subtitle placed at its start
+    timed_dub: bool = os.getenv("TIMED_DUB", "false").lower() == "true"
+    tts_concurrency: int = int(os.getenv("TTS_CONCURRENCY", "4"))
+    dub_max_speedup: float = float(os.getenv("DUB_MAX_SPEEDUP", "1.5"))
     elevenlabs_api_key: Optional[str] = os.getenv("ELEVENLABS_API_KEY")
     elevenlabs_voice_id: Optional[str] = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
     base_data_dir: str = os.getenv("DATA_DIR", "/app/data")
     results_base_url: str = os.getenv("RESULTS_BASE_URL", "/results")
+    # Node-local working space for downloads/renders; defaults to DATA_DIR (single-node setup)
+    scratch_dir: str = os.getenv("SCRATCH_DIR") or os.getenv("DATA_DIR", "/app/data")
+    # Where finished artifacts are published: local (DATA_DIR, served at /results) or s3
+    storage_backend: str = os.getenv("STORAGE_BACKEND", "local").lower()
+    s3_bucket: Optional[str] = os.getenv("S3_BUCKET")
+    s3_prefix: str = os.getenv("S3_PREFIX", "")
+    s3_endpoint_url: Optional[str] = os.getenv("S3_ENDPOINT_URL")  # e.g. http://minio:9000
+    s3_region: Optional[str] = os.getenv("S3_REGION")
+    s3_presign_expires_sec: int = int(os.getenv("S3_PRESIGN_EXPIRES_SEC", "3600"))
+    s3_multipart_threshold_mb: int = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "16"))
+    s3_multipart_chunk_mb: int = int(os.getenv("S3_MULTIPART_CHUNK_MB", "16"))
     cors_origins: str = os.getenv("CORS_ORIGINS", "http://localhost:3000")
+    # A process_job message unacked this long is redelivered to another worker; keep it above
+    # the longest full pass (a job still running past it would run twice)
+    celery_visibility_timeout_sec: int = int(os.getenv("CELERY_VISIBILITY_TIMEOUT_SEC", str(2 * 3600)))
+    # Capture a cProfile of every job into its work dir (per-job option: profile)
+    profile_jobs: bool = os.getenv("PROFILE_JOBS", "false").lower() == "true"
+    # Admission control on POST /jobs (429 + Retry-After above these limits; 0 disables a limit)
+    admission_enabled: bool = os.getenv("ADMISSION_ENABLED", "false").lower() == "true"
+    admission_max_queue: int = int(os.getenv("ADMISSION_MAX_QUEUE", "20"))
+    admission_max_backlog_sec: float = float(os.getenv("ADMISSION_MAX_BACKLOG_SEC", str(4 * 3600)))
+    # Estimated worker seconds per second of video, plus fixed per-job overhead
+    admission_sec_per_media_sec: float = float(os.getenv("ADMISSION_SEC_PER_MEDIA_SEC", "2.0"))
+    admission_job_overhead_sec: float = float(os.getenv("ADMISSION_JOB_OVERHEAD_SEC", "60"))
+    admission_default_duration_sec: float = float(os.getenv("ADMISSION_DEFAULT_DURATION_SEC", "600"))
+    admission_probe_timeout_sec: int = int(os.getenv("ADMISSION_PROBE_TIMEOUT_SEC", "15"))
+    admission_min_retry_sec: int = int(os.getenv("ADMISSION_MIN_RETRY_SEC", "5"))
+    admission_max_retry_sec: int = int(os.getenv("ADMISSION_MAX_RETRY_SEC", "3600"))
+    # A job silent this long (no status change) is presumed dead and leaves the backlog; 0 never reaps
+    admission_stale_sec: float = float(os.getenv("ADMISSION_STALE_SEC", str(6 * 3600)))
+    # Per-API-key token bucket; only keys listed in API_KEYS (comma-separated) get their own,
+    # a missing or unknown X-API-Key is charged to the client IP's bucket
+    api_keys: str = os.getenv("API_KEYS", "")
+    api_key_rate_per_min: float = float(os.getenv("API_KEY_RATE_PER_MIN", "6"))
+    api_key_burst: float = float(os.getenv("API_KEY_BURST", "10"))
+    long_poll_max_sec: float = float(os.getenv("LONG_POLL_MAX_SEC", "30"))
     use_sadtalker: bool = os.getenv("USE_SADTALKER", "false").lower() == "true"
     sadtalker_repo: str = os.getenv("SADTALKER_REPO", "/app/extern/SadTalker")
     sadtalker_checkpoint_dir: str = os.getenv("SADTALKER_CKPT_DIR", "/app/extern/SadTalker/checkpoints")
     lipsync_provider: str = os.getenv("LIPSYNC_PROVIDER", "none").lower()  # one of: none, sadtalker, wav2lip
+    # Lip-sync only the spans that contain speech (per-job option: speechOnly)
+    lipsync_speech_only: bool = os.getenv("LIPSYNC_SPEECH_ONLY", "false").lower() == "true"
+    speech_pad_sec: float = float(os.getenv("SPEECH_PAD_SEC", "0.2"))
+    speech_min_gap_sec: float = float(os.getenv("SPEECH_MIN_GAP_SEC", "1.0"))
     wav2lip_repo: str = os.getenv("WAV2LIP_REPO", "/app/extern/Wav2Lip")
     wav2lip_checkpoint_path: str = os.getenv("WAV2LIP_CKPT", "/app/extern/Wav2Lip/checkpoints/wav2lip_gan.pth")
+    # >1 renders local Wav2Lip in keyframe-aligned chunks across that many processes
+    wav2lip_workers: int = int(os.getenv("WAV2LIP_WORKERS", "1"))
+    wav2lip_chunk_min_sec: float = float(os.getenv("WAV2LIP_CHUNK_MIN_SEC", "30"))
     sync_api_key: Optional[str] = os.getenv("SYNC_API_KEY")
     sync_base_url: str = os.getenv("SYNC_BASE_URL", "https://api.sync.so")
+    # Public base URL of this API; when set, Sync API completions are pushed to /webhooks/sync
+    sync_webhook_base_url: Optional[str] = os.getenv("SYNC_WEBHOOK_BASE_URL")
+    # Required for webhooks: callbacks must carry the body's hex HMAC-SHA256 under this key in the header below
+    sync_webhook_secret: Optional[str] = os.getenv("SYNC_WEBHOOK_SECRET")
+    sync_webhook_signature_header: str = os.getenv("SYNC_WEBHOOK_SIGNATURE_HEADER", "X-Sync-Signature")
+    sync_poll_initial_sec: int = int(os.getenv("SYNC_POLL_INITIAL_SEC", "10"))
+    sync_poll_max_sec: int = int(os.getenv("SYNC_POLL_MAX_SEC", "120"))
+    sync_timeout_sec: int = int(os.getenv("SYNC_TIMEOUT_SEC", str(60 * 20)))
 
 
 settings = Settings()
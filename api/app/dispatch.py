@@ -0,0 +1,25 @@
+"""Enqueue Celery tasks by name.
+
+The API process imports this instead of app.tasks so that uvicorn workers never
+load whisper/torch or the lip-sync pipeline just to put a message on the broker.
+"""
+from typing import Dict, Optional
+
+from app.celery_app import celery_app
+
+
+def enqueue_process_job(job_id: str, youtube_url: str, options: Optional[Dict] = None) -> None:
+    celery_app.send_task("process_job", args=[job_id, youtube_url, options or {}], task_id=job_id)
+
+
+def enqueue_finalize_sync_lipsync(job_id: str, status: str, output_url: Optional[str]) -> None:
+    celery_app.send_task("finalize_sync_lipsync", args=[job_id, status, output_url])
+
+
+def full_pass_task_id(job_id: str) -> str:
+    return f"{job_id}-full"
+
+
+def revoke_job(job_id: str) -> None:
+    """Drop the job's process_job tasks (first pass and draft follow-up) if no worker has started them."""
+    celery_app.control.revoke([job_id, full_pass_task_id(job_id)])
@@ -1,17 +1,42 @@
 import asyncio
+import hashlib
+import hmac
+import json
+import math
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from typing import AsyncIterator, Optional
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
+from app.celery_app import broker_queue_keys
 from app.config import settings
+from app.utils.admission import clip_seconds, decide, estimate_job_seconds
 from app.utils.logging import configure_json_logging
-from app.utils.progress import get_state, get_logs, init_job, get_pubsub, append_log
-from app.tasks import process_job
+from app.utils.media import probe_remote_duration
+from app.utils.object_store import discard_job_files, get_storage, result_key
+from app.utils.progress import (
+    admission_snapshot,
+    append_log,
+    claim_sync_generation,
+    get_logs_since,
+    get_profile,
+    get_state,
+    init_job,
+    register_admitted_job,
+    request_cancel,
+    set_status,
+    subscribe_job_events,
+    sync_generation_pending,
+    take_api_token,
+    wait_for_change,
+)
+from app.utils.wav2lip import SYNC_TERMINAL_STATUSES, get_sync_generation
+from app.dispatch import enqueue_finalize_sync_lipsync, enqueue_process_job, revoke_job
 from app.schemas import CreateJobRequest, CreateJobResponse, JobStatusResponse
 
 
@@ -28,56 +53,237 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After"],
 )
 
-# Serve results as static files (works both in container and local)
-results_dir = Path(settings.base_data_dir) / "results"
-results_dir.mkdir(parents=True, exist_ok=True)
-app.mount("/results", StaticFiles(directory=str(results_dir)), name="results")
+# Serve results as static files from the shared data dir; remote backends go through /jobs/{id}/files
+if settings.storage_backend == "local":
+    results_dir = Path(settings.base_data_dir) / "results"
+    results_dir.mkdir(parents=True, exist_ok=True)
+    app.mount("/results", StaticFiles(directory=str(results_dir)), name="results")
+
+
+def _too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+def _quota_bucket(request: Request, api_key: Optional[str]) -> str:
+    """Token bucket to charge: a configured key's own, else the client IP's, so rotating X-API-Key gains nothing."""
+    if api_key and api_key in {key.strip() for key in settings.api_keys.split(",") if key.strip()}:
+        return f"key:{api_key}"
+    return f"ip:{request.client.host if request.client else 'anonymous'}"
+
+
+def _admit(request: Request, req: CreateJobRequest, api_key: Optional[str]) -> float:
+    """Apply the per-key quota and the queue/backlog limits; returns the job's estimated seconds.
+
+    Cheap checks run first: the quota, then queue depth from one Redis round trip. The
+    video is probed with yt-dlp only when its length can decide the backlog limit, i.e.
+    the ranges are open-ended and there is a backlog to add to; otherwise the estimate
+    uses the default duration.
+    """
+    wait = take_api_token(_quota_bucket(request, api_key), settings.api_key_rate_per_min / 60.0, settings.api_key_burst)
+    if wait > 0:
+        raise _too_many_requests("API key quota exceeded", min(wait, settings.admission_max_retry_sec))
+    limits = {"max_queue_depth": settings.admission_max_queue, "max_backlog_sec": settings.admission_max_backlog_sec}
+    queue_depth, running, backlog_sec = admission_snapshot(broker_queue_keys())
+    ranges = req.clip_ranges()
+    bounded = bool(ranges) and all(end is not None for _, end in ranges)
+    job_sec = estimate_job_seconds(clip_seconds(ranges, None) if bounded else None)
+    decision = decide(queue_depth, running, backlog_sec, job_sec=job_sec if bounded else 0.0, **limits)
+    if decision.admitted and not bounded and settings.admission_max_backlog_sec and backlog_sec > 0:
+        duration = probe_remote_duration(str(req.youtubeUrl), timeout=settings.admission_probe_timeout_sec)
+        job_sec = estimate_job_seconds(clip_seconds(ranges, duration))
+        decision = decide(queue_depth, running, backlog_sec, job_sec=job_sec, **limits)
+    if not decision.admitted:
+        raise _too_many_requests(f"Server busy ({decision.reason}); retry later", decision.retry_after)
+    return job_sec
 
 
 @app.post("/jobs", response_model=CreateJobResponse)
-def create_job(req: CreateJobRequest) -> CreateJobResponse:
+def create_job(req: CreateJobRequest, request: Request, x_api_key: Optional[str] = Header(default=None)) -> CreateJobResponse:
     import uuid
 
+    job_sec = _admit(request, req, x_api_key) if settings.admission_enabled else None
     job_id = uuid.uuid4().hex
     init_job(job_id, str(req.youtubeUrl))
+    if job_sec is not None:
+        register_admitted_job(job_id, job_sec)
     append_log(job_id, "Job queued to Celery")
-    process_job.apply_async(args=[job_id, str(req.youtubeUrl), req.options or {}], task_id=job_id)
+    options = dict(req.options or {})
+    ranges = req.clip_ranges()
+    if ranges:
+        options["ranges"] = [[start, end] for start, end in ranges]
+    enqueue_process_job(job_id, str(req.youtubeUrl), options)
     return CreateJobResponse(jobId=job_id)
 
 
-@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
-def get_job(job_id: str):
+def _etag(version: int) -> str:
+    return f'W/"{version}"'
+
+
+def _parse_etag(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(value.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        return None
+
+
+def _job_status(job_id: str, response: Response, since_log: int) -> JobStatusResponse:
     state = get_state(job_id)
     if not state:
         raise HTTPException(status_code=404, detail="Job not found")
-    logs = get_logs(job_id)
+    logs, cursor = get_logs_since(job_id, since_log)
+    response.headers["ETag"] = _etag(int(state.get("version", 0) or 0))
     return JobStatusResponse(
         status=state.get("status", "QUEUED"),
         progress=int(state.get("progress", 0)),
         resultUrl=state.get("result_url") or None,
+        draftUrl=state.get("draft_url") or None,
+        previewSubtitlesUrl=state.get("preview_subtitles_url") or None,
         logs=logs,
+        logCursor=cursor,
         error=state.get("error") or None,
     )
 
 
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(
+    job_id: str,
+    response: Response,
+    sinceLog: int = 0,
+    wait: float = 0,
+    if_none_match: Optional[str] = Header(default=None),
+):
+    """Job status with incremental logs.
+
+    - ``sinceLog``: return only log lines after this cursor (``logCursor`` of the previous response).
+    - ``If-None-Match``: 304 when the job's version is unchanged; checked with a single HGET.
+    - ``wait``: with ``If-None-Match``, hold the request up to ``wait`` seconds for a change (long-poll).
+
+    The handler is async: the version check and long-poll wait run on the event loop,
+    and only the short state/log reads borrow a threadpool thread.
+    """
+    known = _parse_etag(if_none_match)
+    if known is not None:
+        version = await wait_for_change(job_id, known, min(max(wait, 0), settings.long_poll_max_sec))
+        if version == known:
+            return Response(status_code=304, headers={"ETag": _etag(known)})
+    return await run_in_threadpool(_job_status, job_id, response, sinceLog)
+
+
+@app.delete("/jobs/{job_id}", status_code=202)
+def cancel_job(job_id: str):
+    """Cancel a job.
+
+    A queued task is revoked and marked CANCELLED right away, as is a job waiting on a
+    Sync API render; no worker will touch those again, so their scratch dirs and
+    published intermediates are removed here. A running worker notices the flag within
+    a second, kills the current stage's process tree, cleans up and marks the job CANCELLED.
+    """
+    state = get_state(job_id)
+    status = state.get("status")
+    if not status:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if status in ("DONE", "FAILED"):
+        raise HTTPException(status_code=409, detail=f"Job already {status}")
+    if status != "CANCELLED":
+        request_cancel(job_id)
+        revoke_job(job_id)
+        generation_id = state.get("sync_generation_id")
+        # No worker holds the job while it is queued or parked on a remote render
+        if status == "QUEUED" or (generation_id and claim_sync_generation(generation_id)):
+            append_log(job_id, "Job cancelled")
+            set_status(job_id, "CANCELLED")
+            discard_job_files(job_id)
+    return {"jobId": job_id, "status": get_state(job_id).get("status"), "cancelRequested": True}
+
+
+@app.get("/jobs/{job_id}/profile")
+def get_job_profile(job_id: str):
+    """Per-stage wall/CPU time, peak RSS, child-process usage and I/O recorded by the worker."""
+    state = get_state(job_id)
+    if not state.get("status"):
+        raise HTTPException(status_code=404, detail="Job not found")
+    # Workers publish the cProfile dump as a result when the job stops; scratch is node-local
+    storage = get_storage()
+    exists = storage.exists(result_key(job_id, "profile.pstats"))
+    cprofile = storage.result_url(job_id, "profile.pstats") if exists else None
+    return {
+        "jobId": job_id,
+        "status": state.get("status"),
+        "stages": get_profile(job_id),
+        "cprofile": cprofile,
+    }
+
+
+@app.get("/jobs/{job_id}/files/{name}")
+def get_job_file(job_id: str, name: str):
+    """Redirect to a job artifact: a presigned URL for object storage, /results for the local backend."""
+    if "/" in name or name.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid file name")
+    if not get_state(job_id).get("status"):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return RedirectResponse(get_storage().download_url(result_key(job_id, name)), status_code=307)
+
+
+def _valid_sync_signature(body: bytes, signature: Optional[str]) -> bool:
+    """Check the hex HMAC-SHA256 of the raw body (optionally ``sha256=``-prefixed) against the webhook secret."""
+    expected = hmac.new(settings.sync_webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest((signature or "").strip().removeprefix("sha256="), expected)
+
+
+def _resume_sync_generation(generation_id: str) -> None:
+    # The callback body is untrusted: status and output URL come from the Sync API itself
+    status, output_url = get_sync_generation(generation_id)
+    if status not in SYNC_TERMINAL_STATUSES:
+        return
+    job_id = claim_sync_generation(generation_id)
+    if job_id:
+        append_log(job_id, f"Sync API webhook: generation {generation_id} {status}")
+        enqueue_finalize_sync_lipsync(job_id, status, output_url)
+
+
+@app.post("/webhooks/sync")
+async def sync_webhook(request: Request):
+    """Sync API completion callback: a signed wake-up that resumes the job which handed off its render.
+
+    Only the generation id is taken from the body; its outcome is re-fetched from the
+    Sync API, so a forged or replayed callback cannot inject a result.
+    """
+    if not settings.sync_webhook_secret:
+        raise HTTPException(status_code=404, detail="Sync webhooks are not enabled")
+    body = await request.body()
+    if not _valid_sync_signature(body, request.headers.get(settings.sync_webhook_signature_header)):
+        raise HTTPException(status_code=403, detail="Invalid webhook signature")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    generation = payload.get("result") or payload
+    generation_id = generation.get("id") or (generation.get("data") or {}).get("id")
+    if not generation_id:
+        raise HTTPException(status_code=400, detail="Missing generation id")
+    if sync_generation_pending(generation_id):
+        await run_in_threadpool(_resume_sync_generation, generation_id)
+    return {"ok": True}
+
+
 @app.get("/stream/{job_id}")
 async def stream_events(job_id: str):
-    pubsub = get_pubsub()
-    channel = f"job:{job_id}:events"
-    pubsub.subscribe(channel)
+    """Server-Sent Events for one job, read with the asyncio Redis client so a stream never blocks the loop."""
+    pubsub = await subscribe_job_events(job_id)
 
     async def event_generator():
         try:
             while True:
-                message = pubsub.get_message(timeout=1.0)
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
                 if message and message.get("type") == "message":
-                    data = message.get("data")
-                    yield f"data: {data}\n\n"
-                await asyncio.sleep(0.2)
+                    yield f"data: {message.get('data')}\n\n"
         finally:
-            pubsub.unsubscribe(channel)
-            pubsub.close()
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
 
     return StreamingResponse(event_generator(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -1,9 +1,38 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.utils.audio import assemble_speech
+from app.utils.text import map_concurrently, with_retries
 
 
 class TTSProvider(ABC):
+    #: Provider-specific exception types worth retrying (on top of HTTP 429/5xx and connection errors)
+    retryable_errors: Tuple[type, ...] = ()
+
     @abstractmethod
-    def synthesize(self, texts: Iterable[str], out_path: Path) -> None:
+    def synthesize_chunks(self, texts: Iterable[str]) -> List[bytes]:
+        """Encoded audio (any format ffmpeg decodes) per text, in order; see app.utils.audio."""
         ...
+
+    def synthesize(self, texts: Iterable[str], out_path: Path) -> None:
+        """Write one AAC track for all texts, joined and leveled by assemble_speech."""
+        assemble_speech(
+            self.synthesize_chunks(texts), out_path, gap_sec=settings.tts_gap_sec, target_dbfs=settings.tts_target_dbfs
+        )
+
+    def synthesize_segments(self, texts: Sequence[str], workers: int = 4) -> List[Optional[bytes]]:
+        """One clip per subtitle segment, synthesized concurrently; None for segments without text.
+
+        Each segment is retried with backoff on throttling, 5xx and connection errors, so
+        one rejected request under the provider's concurrency cap doesn't fail the job.
+        """
+
+        def _one(text: str) -> Optional[bytes]:
+            if not text.strip():
+                return None
+            chunks = with_retries(lambda: self.synthesize_chunks([text]), retry_on=self.retryable_errors)
+            return b"".join(chunks) if chunks else None
+
+        return map_concurrently(_one, list(texts), limit=workers)
@@ -1,7 +1,5 @@
-import io
 import os
-from pathlib import Path
-from typing import Iterable
+from typing import Iterable, List
 
 import requests
 
@@ -21,18 +19,17 @@ class ElevenLabsProvider(TTSProvider):
         self.api_key = api_key
         self.voice_id = settings.elevenlabs_voice_id or "21m00Tcm4TlvDq8ikWAM"
 
-    def synthesize(self, texts: Iterable[str], out_path: Path) -> None:
+    def synthesize_chunks(self, texts: Iterable[str]) -> List[bytes]:
         url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}"
         headers = {"xi-api-key": self.api_key, "accept": "audio/mpeg", "Content-Type": "application/json"}
-
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(out_path, "wb") as fout:
-            for text in texts:
-                payload = {
-                    "text": text,
-                    "model_id": "eleven_multilingual_v2",
-                    "voice_settings": {"stability": 0.5, "similarity_boost": 0.75},
-                }
-                resp = requests.post(url, headers=headers, json=payload, timeout=60)
-                resp.raise_for_status()
-                fout.write(resp.content)
+        chunks = []
+        for text in texts:
+            payload = {
+                "text": text,
+                "model_id": "eleven_multilingual_v2",
+                "voice_settings": {"stability": 0.5, "similarity_boost": 0.75},
+            }
+            resp = requests.post(url, headers=headers, json=payload, timeout=60)
+            resp.raise_for_status()
+            chunks.append(resp.content)
+        return chunks
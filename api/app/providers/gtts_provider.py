@@ -1,15 +1,20 @@
-from pathlib import Path
-from typing import Iterable
+import io
+from typing import Iterable, List
 
-from gtts import gTTS
+from gtts import gTTS, gTTSError
 
 from app.providers.base import TTSProvider
 
 
 class GTTSProvider(TTSProvider):
-    def synthesize(self, texts: Iterable[str], out_path: Path) -> None:
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        # gTTS는 멀티 청크를 직접 이어붙이기 까다로우므로 단일 텍스트로 합친다.
-        full_text = "\n".join(texts)
-        tts = gTTS(text=full_text, lang="ko")
-        tts.save(str(out_path))
+    retryable_errors = (gTTSError,)  # raised for throttled or failed requests to the TTS endpoint
+
+    def synthesize_chunks(self, texts: Iterable[str]) -> List[bytes]:
+        chunks = []
+        for text in texts:
+            if not text.strip():
+                continue
+            buf = io.BytesIO()
+            gTTS(text=text, lang="ko").write_to_fp(buf)
+            chunks.append(buf.getvalue())
+        return chunks
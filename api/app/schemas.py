@@ -1,10 +1,45 @@
-from pydantic import BaseModel, AnyHttpUrl
-from typing import Optional, Literal
+from pydantic import BaseModel, AnyHttpUrl, Field, model_validator
+from typing import List, Optional, Literal, Tuple
+
+
+class TimeRange(BaseModel):
+    start: float = Field(ge=0)
+    end: float
+
+    @model_validator(mode="after")
+    def _check_order(self) -> "TimeRange":
+        if self.end <= self.start:
+            raise ValueError("end must be greater than start")
+        return self
 
 
 class CreateJobRequest(BaseModel):
     youtubeUrl: AnyHttpUrl
     options: Optional[dict] = None
+    # Process only part of the video (seconds in the source): start/end for one clip, or ranges
+    start: Optional[float] = Field(default=None, ge=0)
+    end: Optional[float] = None
+    ranges: Optional[List[TimeRange]] = None
+
+    @model_validator(mode="after")
+    def _check_clip(self) -> "CreateJobRequest":
+        if self.ranges and (self.start is not None or self.end is not None):
+            raise ValueError("use either start/end or ranges, not both")
+        if self.start is not None or self.end is not None:
+            TimeRange(start=self.start or 0.0, end=self.end if self.end is not None else float("inf"))
+        if self.ranges:
+            ordered = sorted(self.ranges, key=lambda r: r.start)
+            if any(b.start < a.end for a, b in zip(ordered, ordered[1:])):
+                raise ValueError("ranges must not overlap")
+        return self
+
+    def clip_ranges(self) -> List[Tuple[float, Optional[float]]]:
+        """Requested [start, end) ranges in source order (end None = to the end); empty for the whole video."""
+        if self.ranges:
+            return [(r.start, r.end) for r in sorted(self.ranges, key=lambda r: r.start)]
+        if self.start is not None or self.end is not None:
+            return [(self.start or 0.0, self.end)]
+        return []
 
 
 class CreateJobResponse(BaseModel):
@@ -12,8 +47,11 @@ class CreateJobResponse(BaseModel):
 
 
 class JobStatusResponse(BaseModel):
-    status: Literal["QUEUED", "RUNNING", "FAILED", "DONE"]
+    status: Literal["QUEUED", "RUNNING", "FAILED", "DONE", "CANCELLED"]
     progress: int
     resultUrl: Optional[str] = None
+    draftUrl: Optional[str] = None
+    previewSubtitlesUrl: Optional[str] = None
     logs: Optional[list[str]] = None
+    logCursor: Optional[int] = None
     error: Optional[str] = None
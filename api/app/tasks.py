@@ -1,196 +1,623 @@
 import json
+import shutil
+import time
 import uuid
 from pathlib import Path
-from typing import Dict
-
-import whisper
+from typing import Dict, Optional, Tuple
 
 from app.celery_app import celery_app
 from app.config import settings
+from app.dispatch import full_pass_task_id
 from app.providers.factory import get_tts_provider
+from app.providers.gtts_provider import GTTSProvider
+from app.utils.audio import assemble_speech, assemble_timed_speech
 from app.utils.logging import get_logger
-from app.utils.media import download_video, extract_audio, mux_video_audio, extract_first_frame
-from app.utils.progress import append_log, set_result, set_status
-from app.utils.storage import job_paths
-from app.utils.text import split_text_for_tts, translate_to_korean_natural, contains_hangul
-from app.utils.sadtalker import ensure_wav_16k_mono as ensure_wav_16k_mono_sad
+from app.utils.media import (
+    CommandCancelled,
+    cancellation,
+    download_audio,
+    download_clip,
+    download_video,
+    extract_audio,
+    extract_first_frame,
+    mux_video_audio,
+)
+from app.utils.probe import probe_media
+from app.utils.profiling import JobProfiler
+from app.utils.progress import (
+    append_log,
+    claim_sync_generation,
+    get_state,
+    is_cancel_requested,
+    progress_reporter,
+    publish_subtitles,
+    register_sync_generation,
+    save_profile_stage,
+    set_draft_result,
+    set_preview_subtitles,
+    set_result,
+    set_status,
+    sync_generation_pending,
+)
+from app.utils.object_store import discard_job_files, get_storage, result_key, work_key
+from app.utils.storage import download_file, job_paths, remove_job_dirs
+from app.utils.stt import transcribe, transcribe_windows
+from app.utils.subtitles import append_cues, build_srt
+from app.utils.text import (
+    contains_hangul,
+    split_text_for_tts,
+    translate_segments_to_korean,
+    translate_to_korean_natural,
+)
 from app.utils.sadtalker import run_sadtalker, add_subtitles_soft
-from app.utils.wav2lip import ensure_wav_16k_mono as ensure_wav_16k_mono_w2l
-from app.utils.wav2lip import run_wav2lip
+from app.utils.speech_spans import render_speech_only
+from app.utils.wav2lip import (
+    SYNC_TERMINAL_STATUSES,
+    get_sync_generation,
+    run_wav2lip_chunked,
+    run_wav2lip_local,
+    submit_sync_generation,
+    sync_api_inputs,
+    sync_poll_delay,
+)
 
 
 logger = get_logger(__name__)
 
 
-@celery_app.task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 3}, name="process_job")
+class JobCancelled(Exception):
+    """Raised at a stage boundary once DELETE /jobs/{id} has flagged the job."""
+
+
+def _raise_if_cancelled(job_id: str) -> None:
+    if is_cancel_requested(job_id):
+        raise JobCancelled(job_id)
+
+
+def _start_stage(job_id: str, profiler: JobProfiler, stage: str) -> None:
+    _raise_if_cancelled(job_id)
+    profiler.start(stage)
+
+
+def _was_cancelled(job_id: str, exc: Exception) -> bool:
+    # A killed subprocess can also surface as a plain failure; the flag is authoritative
+    return isinstance(exc, (JobCancelled, CommandCancelled)) or is_cancel_requested(job_id)
+
+
+def _mark_cancelled(job_id: str) -> None:
+    append_log(job_id, "Job cancelled")
+    set_status(job_id, "CANCELLED")
+
+
+def _complete_job(job_id: str, paths: dict) -> None:
+    storage = get_storage()
+    out_video = Path(paths["out_video"])
+    storage.put_file(out_video, result_key(job_id, out_video.name))
+    storage.put_file(Path(paths["subs"]), result_key(job_id, Path(paths["subs"]).name))
+    set_status(job_id, "DONE", progress=100)
+    result_url = storage.result_url(job_id, out_video.name)
+    set_result(job_id, result_url)
+    append_log(job_id, f"Job completed. Result: {result_url}")
+
+
+# Job files a follow-up task may pick up on another node: the draft's full pass (video,
+# audio) and Sync API finalize (subs); published only when that hand-off happens
+_HANDOFF_FILES = ("video", "audio", "subs")
+_PROFILE_FILES = ("profile.pstats", "profile.txt")
+_MAX_RETRIES = 3
+
+
+def _publish_intermediates(job_id: str, paths: dict, names: Tuple[str, ...]) -> None:
+    """Store what a follow-up task on another node needs with the backend."""
+    storage = get_storage()
+    for name in names:
+        path = Path(paths[name])
+        if path.exists():
+            storage.put_file(path, work_key(job_id, path.name))
+
+
+def _reuse_intermediate(job_id: str, path: Path) -> bool:
+    """Bring a file published by an earlier pass into scratch; False when it has to be redone."""
+    try:
+        get_storage().fetch(work_key(job_id, path.name), path)
+        return path.exists()
+    except Exception:  # noqa: BLE001
+        return False
+
+
+def _render_draft(job_id: str, paths: dict) -> str:
+    """Cheap preview: small STT model, one segment-level translation pass, gTTS and a copy mux.
+
+    Writes its own draft_* files so the full pass's subtitles and TTS audio are untouched.
+    Returns the draft video's URL.
+    """
+    work, results = Path(paths["work"]), Path(paths["results"])
+    append_log(job_id, f"Draft: transcribing with {settings.draft_whisper_model}...")
+    result = transcribe(
+        Path(paths["audio"]),
+        task="transcribe",
+        language=None,
+        model_name=settings.draft_whisper_model,
+        log=lambda msg: append_log(job_id, msg),
+    )
+    segments = result["segments"]
+    texts = [(seg.get("text") or "").strip() for seg in segments]
+    ko_segments = texts if result["language"] == "ko" else translate_segments_to_korean(texts)[0]
+    set_status(job_id, "RUNNING", progress=40)
+
+    draft_subs = work / "draft_subtitles_ko.srt"
+    draft_subs.write_text(build_srt(segments, ko_segments), encoding="utf-8")
+    draft_audio = work / "draft_korean_audio.m4a"
+    append_log(job_id, "Draft: synthesizing gTTS audio...")
+    tts_texts = split_text_for_tts(" ".join(t for t in ko_segments if t))
+    assemble_speech(GTTSProvider().synthesize_chunks(tts_texts), draft_audio, gap_sec=settings.tts_gap_sec)
+    set_status(job_id, "RUNNING", progress=50)
+
+    draft_video = results / "draft_video.mp4"
+    append_log(job_id, "Draft: muxing preview...")
+    mux_video_audio(
+        Path(paths["video"]), draft_audio, draft_video, draft_subs, max_height=settings.draft_max_height or None
+    )
+    storage = get_storage()
+    storage.put_file(draft_video, result_key(job_id, draft_video.name))
+    return storage.result_url(job_id, draft_video.name)
+
+
+def _release_scratch(job_id: str, paths: dict, status: str, final: bool = True) -> None:
+    """Publish the job's profile and drop what no later task needs.
+
+    A failure that Celery will retry (``final=False``) keeps everything for the retry.
+    Once a job is done or has finally failed, its hand-off files are deleted from the
+    backend; a failed job's scratch goes too. The profile is published as a result so
+    ``GET /jobs/{id}/profile`` can link to it like any other artifact.
+    """
+    if status == "cancelled":
+        discard_job_files(job_id)  # partial artifacts of a cancelled job are never served
+        return
+    if status == "failed" and not final:
+        return
+    storage = get_storage()
+    work = Path(paths["work"])
+    # The API reads profiles through the backend: its own SCRATCH_DIR is not this worker's
+    for name in _PROFILE_FILES:
+        if (work / name).exists():
+            storage.put_file(work / name, result_key(job_id, name))
+    if status in ("ok", "failed"):
+        for name in _HANDOFF_FILES:
+            storage.delete(work_key(job_id, Path(paths[name]).name))
+    if storage.remote:
+        # Scratch is only a cache once a remote backend holds the artifacts
+        remove_job_dirs(job_id)
+    elif status == "failed":
+        # Local backend: the profile now lives under results/, nothing in work/ is served
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def _job_profiler(job_id: str, paths: dict, options: Optional[Dict]) -> JobProfiler:
+    """Per-stage resource profile stored with the job; cProfile capture is opt-in per job."""
+    capture = bool((options or {}).get("profile", settings.profile_jobs))
+    return JobProfiler(
+        sink=lambda stage, stats: save_profile_stage(job_id, stage, stats),
+        cprofile_path=Path(paths["work"]) / "profile.pstats" if capture else None,
+    )
+
+
+def _sync_webhook_url() -> Optional[str]:
+    # Unsigned callbacks are never accepted, so without a secret the backoff poller resumes the job
+    if not settings.sync_webhook_base_url or not settings.sync_webhook_secret:
+        return None
+    return f"{settings.sync_webhook_base_url.rstrip('/')}/webhooks/sync"
+
+
+# Acked only when done, so a worker busy with a pass reserves nothing else. Redelivery after a
+# crash is safe: a pass restarts from the published intermediates and rewrites the same keys.
+# The other tasks ack on receipt: finalize_sync_lipsync claims the generation and muxes once.
+@celery_app.task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": _MAX_RETRIES},
+    acks_late=True,
+    name="process_job",
+)
 def process_job(self, job_id: str, youtube_url: str, options: Dict | None = None) -> str:
+    if is_cancel_requested(job_id):
+        # Delivered despite the revoke: the API already marked the job CANCELLED, so never flip it back to RUNNING
+        if get_state(job_id).get("status") != "CANCELLED":
+            _mark_cancelled(job_id)
+        discard_job_files(job_id)
+        return job_id
     paths = job_paths(job_id)
+    profiler = _job_profiler(job_id, paths, options)
+    profile_status = "failed"
 
     try:
-        set_status(job_id, "RUNNING", progress=1)
-        append_log(job_id, f"Job accepted. options={json.dumps(options or {})}")
-        append_log(job_id, "Downloading video...")
-        download_video(youtube_url, Path(paths["video"]))
-
-        set_status(job_id, "RUNNING", progress=10)
-        append_log(job_id, "Extracting audio...")
-        try:
-            extract_audio(Path(paths["video"]), Path(paths["audio"]))
-        except Exception as e:  # noqa: BLE001
-            append_log(job_id, f"Audio extraction failed: {e}. Trying ffmpeg re-mux to MP4 with audio...")
-            # Some DASH videos may download as video-only; try merging bestaudio via ffmpeg once
-            # Attempt to let ffmpeg copy streams without re-encoding, then retry extraction
-            import subprocess
-            tmp_fixed = Path(paths["work"]) / "fixed_with_audio.mp4"
-            subprocess.run([
-                "ffmpeg","-y","-i", str(paths["video"]), "-c","copy", str(tmp_fixed)
-            ], check=False)
-            extract_audio(tmp_fixed, Path(paths["audio"]))
-
-        set_status(job_id, "RUNNING", progress=25)
-        append_log(job_id, f"Loading STT model {settings.whisper_model} (USE_WHISPERX={settings.use_whisperx})...")
-
-        text: str = ""
-        segments = []
-
-        used_whisperx = False
-        if settings.use_whisperx:
-            try:
-                import torch  # type: ignore
-                import whisperx  # type: ignore
-
-                device = "cuda" if torch.cuda.is_available() else "cpu"
-                num_devices = torch.cuda.device_count() if device == "cuda" else 0
-                if device == "cuda":
-                    name = torch.cuda.get_device_name(0)
-                    cc = torch.cuda.get_device_capability(0)
-                    append_log(job_id, f"CUDA devices={num_devices}, name={name}, capability={cc}")
-                compute_type = "float16" if device == "cuda" else "int8"
-                append_log(job_id, f"WhisperX device={device} compute_type={compute_type}")
-                wx_model = whisperx.load_model(settings.whisper_model, device, compute_type=compute_type)
-                result = wx_model.transcribe(str(paths["audio"]), batch_size=16, language="ko", task="translate")
-                text = (result.get("text") or "").strip()
-                segments = result.get("segments") or []
-                try:
-                    align_model, metadata = whisperx.load_align_model(language_code="ko", device=device)
-                    aligned = whisperx.align(segments, align_model, metadata, str(paths["audio"]), device=device)
-                    segments = aligned.get("segments") or segments
-                    append_log(job_id, "WhisperX alignment applied")
-                except Exception as e:  # noqa: BLE001
-                    append_log(job_id, f"WhisperX alignment skipped: {e}")
-                used_whisperx = True
-            except Exception as e:  # noqa: BLE001
-                append_log(job_id, f"WhisperX unavailable; fallback to Whisper on CPU: {e}")
-
-        if not used_whisperx:
-            # Try CUDA first if available, otherwise gracefully fall back to CPU
-            try:
-                import torch  # type: ignore
-
-                device = "cuda" if torch.cuda.is_available() else "cpu"
-                if device == "cuda":
-                    name = torch.cuda.get_device_name(0)
-                    cc = torch.cuda.get_device_capability(0)
-                    append_log(job_id, f"Whisper device=cuda ({name}, capability={cc})")
+        with cancellation(lambda: is_cancel_requested(job_id)):
+            set_status(job_id, "RUNNING", progress=1)
+            append_log(job_id, f"Job accepted. options={json.dumps(options or {})}")
+            # The full-quality pass after a draft starts from the draft's download and audio
+            full_pass = bool((options or {}).get("fullPass"))
+            ranges = [(float(start), None if end is None else float(end)) for start, end in (options or {}).get("ranges") or []]
+            _start_stage(job_id, profiler, "download")
+            if full_pass and _reuse_intermediate(job_id, Path(paths["video"])):
+                append_log(job_id, "Reusing the draft pass download")
+            elif ranges:
+                # Only the requested ranges are fetched; every later stage works on the clip
+                append_log(job_id, f"Downloading clip ranges {ranges}...")
+                download_clip(youtube_url, Path(paths["video"]), ranges, on_progress=progress_reporter(job_id, 1, 10))
+            else:
+                append_log(job_id, "Downloading video...")
+                download_video(youtube_url, Path(paths["video"]), on_progress=progress_reporter(job_id, 1, 10))
+
+            set_status(job_id, "RUNNING", progress=10)
+            _start_stage(job_id, profiler, "extract_audio")
+            if full_pass and _reuse_intermediate(job_id, Path(paths["audio"])):
+                append_log(job_id, "Reusing the draft pass audio")
+            else:
+                # Probe once (cached in the work dir) and plan extraction instead of trying and re-muxing on failure
+                media_info = probe_media(Path(paths["video"]))
+                append_log(
+                    job_id,
+                    f"Probed input: duration={media_info['duration']:.1f}s "
+                    f"video={(media_info['video'] or {}).get('codec')} audio={(media_info['audio'] or {}).get('codec')}",
+                )
+                audio_source = Path(paths["video"])
+                if media_info["audio"] is None:
+                    # Some DASH downloads come back video-only; fetch the audio track on its own
+                    append_log(job_id, "Input has no audio stream; downloading audio track separately...")
+                    audio_source = Path(paths["work"]) / "input_audio_src.m4a"
+                    download_audio(youtube_url, audio_source, ranges=ranges or None)
+                append_log(job_id, "Extracting audio...")
+                extract_audio(audio_source, Path(paths["audio"]), on_progress=progress_reporter(job_id, 10, 25))
+
+            if (options or {}).get("draft") and not full_pass:
+                _start_stage(job_id, profiler, "draft")
+                draft_url = _render_draft(job_id, paths)
+                set_draft_result(job_id, draft_url)
+                append_log(job_id, f"Draft ready: {draft_url}. Queueing full-quality pass...")
+                set_status(job_id, "QUEUED", progress=0)
+                # Another node may pick up the full pass
+                _publish_intermediates(job_id, paths, names=("video", "audio"))
+                process_job.apply_async(
+                    args=[job_id, youtube_url, {**(options or {}), "fullPass": True}],
+                    task_id=full_pass_task_id(job_id),
+                    priority=settings.draft_full_pass_priority,
+                )
+                profile_status = "handed_off"
+                return job_id
+
+            set_status(job_id, "RUNNING", progress=25)
+            _start_stage(job_id, profiler, "stt_translate")
+            append_log(job_id, f"Loading STT model {settings.whisper_model} (USE_WHISPERX={settings.use_whisperx})...")
+
+            def log(msg: str) -> None:
+                append_log(job_id, msg)
+
+            single_pass = bool((options or {}).get("singlePass", settings.translation_mode == "single_pass"))
+            progressive = bool((options or {}).get("progressiveSubs", settings.progressive_subtitles))
+            # Speech-only lip-sync cuts each span's audio at source timestamps, so it needs the timed track
+            speech_only = bool((options or {}).get("speechOnly", settings.lipsync_speech_only))
+            timed_dub = bool((options or {}).get("timedDub", settings.timed_dub or speech_only))
+            stt_start = time.perf_counter()
+            if progressive:
+                # Window-by-window STT; each window is translated and published as preview cues right away
+                partial_srt = Path(paths["work"]) / "subtitles_ko.partial.srt"
+                preview_vtt = Path(paths["results"]) / "subtitles_preview.vtt"
+                partial_srt.unlink(missing_ok=True)
+                preview_vtt.unlink(missing_ok=True)
+                storage = get_storage()
+                set_preview_subtitles(job_id, storage.result_url(job_id, preview_vtt.name))
+                segments, ko_segments = [], []
+                source_language = None
+                translation_requests = 0
+                translate_sec = 0.0
+                next_index = 1
+                for window in transcribe_windows(Path(paths["audio"]), settings.stt_window_sec, log=log):
+                    _raise_if_cancelled(job_id)
+                    source_language = window["language"]
+                    win_segments = window["segments"]
+                    win_texts = [seg["text"] for seg in win_segments]
+                    translate_start = time.perf_counter()
+                    if source_language == "ko":
+                        win_ko = win_texts
+                    else:
+                        win_ko, made = translate_segments_to_korean(win_texts)
+                        translation_requests += made
+                    translate_sec += time.perf_counter() - translate_start
+                    next_index = append_cues(partial_srt, preview_vtt, next_index, win_segments, win_ko)
+                    storage.put_file(preview_vtt, result_key(job_id, preview_vtt.name))
+                    publish_subtitles(
+                        job_id, [{"start": seg["start"], "end": seg["end"], "text": ko} for seg, ko in zip(win_segments, win_ko)]
+                    )
+                    segments.extend(win_segments)
+                    ko_segments.extend(win_ko)
+                if settings.use_whisperx:
+                    # The windows ran on plain Whisper as a preview; the final SRT and TTS come from aligned WhisperX
+                    append_log(job_id, "Preview complete; running WhisperX for the final aligned subtitles...")
+                    result = transcribe(Path(paths["audio"]), task="transcribe", language=source_language, log=log)
+                    segments = result["segments"]
+                    seg_texts = [(seg.get("text") or "").strip() for seg in segments]
+                    translate_start = time.perf_counter()
+                    if source_language == "ko":
+                        ko_segments = seg_texts
+                    else:
+                        ko_segments, made = translate_segments_to_korean(seg_texts)
+                        translation_requests += made
+                    translate_sec += time.perf_counter() - translate_start
+                stt_sec = time.perf_counter() - stt_start - translate_sec
+                ko_full = " ".join(t for t in ko_segments if t)
+                translation_passes = 0 if source_language == "ko" else 2 if settings.use_whisperx else 1
+            elif single_pass:
+                # Transcribe in the detected source language, then translate segments to Korean exactly once
+                result = transcribe(Path(paths["audio"]), task="transcribe", language=None, log=log)
+                stt_sec = time.perf_counter() - stt_start
+                segments = result["segments"]
+                source_language = result["language"]
+                translate_start = time.perf_counter()
+                seg_texts = [(seg.get("text") or "").strip() for seg in segments]
+                if source_language == "ko":
+                    ko_segments, translation_requests = seg_texts, 0
+                else:
+                    append_log(job_id, f"Translating {len(segments)} segments ({source_language} -> ko)...")
+                    ko_segments, translation_requests = translate_segments_to_korean(seg_texts)
+                ko_full = " ".join(t for t in ko_segments if t)
+                translation_passes = 0 if source_language == "ko" else 1
+                translate_sec = time.perf_counter() - translate_start
+            else:
+                result = transcribe(Path(paths["audio"]), task="translate", language="ko", log=log)
+                stt_sec = time.perf_counter() - stt_start
+                segments = result["segments"]
+                source_language = result["language"]
+                text = result["text"]
+                translate_start = time.perf_counter()
+                translation_passes = 0
+                translation_requests = None  # not tracked for the legacy full-text passes
+
+                # Translate to Korean if needed (ensure natural Korean output)
+                if not contains_hangul(text):
+                    append_log(job_id, "Translating to Korean...")
+                    text = translate_to_korean_natural(text)
+                    translation_passes += 1
+                Path(paths["ko_text"]).write_text(text, encoding="utf-8")
+
+                # Translate full text once for naturalness
+                append_log(job_id, "Translating full transcript to Korean...")
+                ko_full = translate_to_korean_natural(text)
+                translation_passes += 1
+
+                if timed_dub:
+                    # Each segment is voiced on its own: it needs its own sentence, not a length slice of ko_full
+                    append_log(job_id, f"Translating {len(segments)} segments for timed dubbing...")
+                    ko_segments, _ = translate_segments_to_korean([(seg.get("text") or "").strip() for seg in segments])
+                    translation_passes += 1
+                # Korean subtitles per-segment by aligning translated text roughly by length
+                # Simple proportional mapping: split ko_full by number of segments
+                elif segments:
+                    approx_len = max(1, len(ko_full) // len(segments))
+                    ko_segments = []
+                    idx = 0
+                    for _ in segments:
+                        ko_segments.append(ko_full[idx : idx + approx_len].strip())
+                        idx += approx_len
+                    # append remainder to last
+                    if ko_segments:
+                        ko_segments[-1] = (ko_segments[-1] + " " + ko_full[idx:]).strip()
+                else:
+                    ko_segments = []
+                for i, segment in enumerate(segments):
+                    if not ko_segments[i].strip():
+                        ko_segments[i] = translate_to_korean_natural((segment.get("text") or "").strip())
+                        translation_passes += 1
+                translate_sec = time.perf_counter() - translate_start
+            Path(paths["ko_text"]).write_text(ko_full, encoding="utf-8")
+
+            # SRT export in Korean
+            Path(paths["subs"]).write_text(build_srt(segments, ko_segments), encoding="utf-8")
+            append_log(
+                job_id,
+                "STT/translation stats: "
+                + json.dumps(
+                    {
+                        "mode": "progressive" if progressive else "single_pass" if single_pass else "legacy",
+                        "source_language": source_language,
+                        "stt_sec": round(stt_sec, 2),
+                        "translate_sec": round(translate_sec, 2),
+                        "translation_passes": translation_passes,
+                        "translation_requests": translation_requests,
+                    }
+                ),
+            )
+
+            set_status(job_id, "RUNNING", progress=55)
+            _start_stage(job_id, profiler, "tts")
+            append_log(job_id, "Synthesizing Korean TTS...")
+            provider = get_tts_provider()
+            if timed_dub and segments:
+                # One clip per segment at its start time; the track matches the video's duration
+                tts_stats = assemble_timed_speech(
+                    provider.synthesize_segments(ko_segments, workers=settings.tts_concurrency),
+                    [float(seg["start"]) for seg in segments],
+                    probe_media(Path(paths["video"]))["duration"],
+                    Path(paths["tts_audio"]),
+                    Path(paths["tts_wav16k"]),
+                    target_dbfs=settings.tts_target_dbfs,
+                    max_speedup=settings.dub_max_speedup,
+                )
+            else:
+                chunks = split_text_for_tts(ko_full)
+                tts_stats = assemble_speech(
+                    provider.synthesize_chunks(chunks),
+                    Path(paths["tts_audio"]),
+                    Path(paths["tts_wav16k"]),
+                    gap_sec=settings.tts_gap_sec,
+                    target_dbfs=settings.tts_target_dbfs,
+                )
+            append_log(job_id, f"TTS assembled: {json.dumps(tts_stats)}")
+
+            # If lipsync provider is enabled, generate a lip-synced video using the TTS audio
+            provider = (settings.lipsync_provider or ("sadtalker" if settings.use_sadtalker else "none")).lower()
+            _start_stage(job_id, profiler, "lipsync_mux" if provider in ("sadtalker", "wav2lip") else "mux")
+            if speech_only and not (timed_dub and segments):
+                append_log(job_id, "Speech-only mode needs the timed dub track (timedDub); rendering full video")
+                speech_only = False
+            if provider == "sadtalker":
+                set_status(job_id, "RUNNING", progress=85)
+                append_log(job_id, "Running SadTalker for lip-sync video generation...")
+                ref_image = Path(paths["work"]) / "sadtalker_ref.png"
+                extract_first_frame(Path(paths["video"]), ref_image)
+                wav16k = Path(paths["tts_wav16k"])
+                tmp_sadtalker_out = Path(paths["work"]) / "sadtalker_output.mp4"
+                if speech_only:
+                    append_log(job_id, "Speech-only mode: rendering SadTalker on STT speech spans")
+                    render_speech_only(
+                        ref_image,
+                        wav16k,
+                        segments,
+                        tmp_sadtalker_out,
+                        render=lambda img, wav, out: run_sadtalker(img, wav, out, preprocess="full", still=True, size=256),
+                        work_dir=Path(paths["work"]) / "speech_spans",
+                        still_image=True,
+                    )
+                    set_status(job_id, "RUNNING", progress=90)
+                    append_log(job_id, "Muxing SadTalker video + KR audio + subtitles...")
+                    mux_video_audio(tmp_sadtalker_out, Path(paths["tts_audio"]), Path(paths["out_video"]), Path(paths["subs"]))
+                else:
+                    run_sadtalker(ref_image, wav16k, tmp_sadtalker_out, preprocess="full", still=True, size=256)
+                    set_status(job_id, "RUNNING", progress=90)
+                    append_log(job_id, "Attaching subtitles to SadTalker video...")
+                    add_subtitles_soft(tmp_sadtalker_out, Path(paths["subs"]), Path(paths["out_video"]))
+            elif provider == "wav2lip":
+                set_status(job_id, "RUNNING", progress=85)
+                append_log(job_id, "Running Wav2Lip for lip-sync video generation...")
+                # 상용 Sync API가 설정되어 있으면 원격 실행, 아니면 로컬 체크포인트로 실행
+                tmp_w2l_out = Path(paths["work"]) / "wav2lip_output.mp4"
+                sync_inputs = sync_api_inputs()
+                if sync_inputs:
+                    # Hand off: the webhook or the backoff poller resumes the job with finalize_sync_lipsync
+                    _publish_intermediates(job_id, paths, names=("subs",))
+                    generation_id = submit_sync_generation(*sync_inputs, webhook_url=_sync_webhook_url())
+                    register_sync_generation(job_id, generation_id, ttl_sec=settings.sync_timeout_sec + 3600)
+                    append_log(job_id, f"Submitted Sync API generation {generation_id}; waiting for completion")
+                    profile_status = "handed_off"
+                    poll_sync_generation.apply_async(
+                        args=[job_id, generation_id, 0, time.time()], countdown=sync_poll_delay(0)
+                    )
+                    return job_id
+                if speech_only:
+                    append_log(job_id, "Speech-only mode: rendering Wav2Lip on STT speech spans")
+                    render_speech_only(
+                        Path(paths["video"]),
+                        Path(paths["tts_audio"]),
+                        segments,
+                        tmp_w2l_out,
+                        render=run_wav2lip_local,
+                        work_dir=Path(paths["work"]) / "speech_spans",
+                    )
+                    set_status(job_id, "RUNNING", progress=90)
+                    append_log(job_id, "Muxing Wav2Lip video + KR audio + subtitles...")
+                    mux_video_audio(tmp_w2l_out, Path(paths["tts_audio"]), Path(paths["out_video"]), Path(paths["subs"]))
                 else:
-                    append_log(job_id, "Whisper device=cpu")
-                model = whisper.load_model(settings.whisper_model, device=device)
-            except Exception as e:  # noqa: BLE001
-                append_log(job_id, f"Whisper CUDA load failed, falling back to CPU: {e}")
-                model = whisper.load_model(settings.whisper_model, device="cpu")
-
-            result = model.transcribe(str(paths["audio"]), task="translate", language="ko")
-            text = (result.get("text") or "").strip()
-            segments = result.get("segments") or []
-
-        # Translate to Korean if needed (ensure natural Korean output)
-        if not contains_hangul(text):
-            append_log(job_id, "Translating to Korean...")
-            text = translate_to_korean_natural(text)
-        Path(paths["ko_text"]).write_text(text, encoding="utf-8")
-
-        # Translate full text once for naturalness
-        append_log(job_id, "Translating full transcript to Korean...")
-        ko_full = translate_to_korean_natural(text)
-        Path(paths["ko_text"]).write_text(ko_full, encoding="utf-8")
-
-        # Korean subtitles per-segment by aligning translated text roughly by length
-        # Simple proportional mapping: split ko_full by number of segments
-        if segments:
-            approx_len = max(1, len(ko_full) // len(segments))
-            ko_segments = []
-            idx = 0
-            for _ in segments:
-                ko_segments.append(ko_full[idx : idx + approx_len].strip())
-                idx += approx_len
-            # append remainder to last
-            if ko_segments:
-                ko_segments[-1] = (ko_segments[-1] + " " + ko_full[idx:]).strip()
-        else:
-            ko_segments = []
-
-        # SRT export in Korean
-        srt_lines = []
-        def fmt(t: float) -> str:
-            hh = int(t // 3600)
-            mm = int((t % 3600) // 60)
-            ss = int(t % 60)
-            ms = int((t - int(t)) * 1000)
-            return f"{hh:02d}:{mm:02d}:{ss:02d},{ms:03d}"
-
-        for i, segment in enumerate(segments, start=1):
-            s = float(segment.get("start", 0.0))
-            e = float(segment.get("end", 0.0))
-            text_ko = (ko_segments[i - 1] if i - 1 < len(ko_segments) else "").strip()
-            if not text_ko:
-                text_ko = (segment.get("text") or "").strip()
-                text_ko = translate_to_korean_natural(text_ko)
-            srt_lines.append(str(i))
-            srt_lines.append(f"{fmt(s)} --> {fmt(e)}")
-            srt_lines.append(text_ko)
-            srt_lines.append("")
-        Path(paths["subs"]).write_text("\n".join(srt_lines), encoding="utf-8")
-
-        set_status(job_id, "RUNNING", progress=55)
-        append_log(job_id, "Synthesizing Korean TTS...")
-        provider = get_tts_provider()
-        chunks = split_text_for_tts(ko_full)
-        provider.synthesize(chunks, Path(paths["tts_audio"]))
-
-        # If lipsync provider is enabled, generate a lip-synced video using the TTS audio
-        provider = (settings.lipsync_provider or ("sadtalker" if settings.use_sadtalker else "none")).lower()
-        if provider == "sadtalker":
-            set_status(job_id, "RUNNING", progress=85)
-            append_log(job_id, "Running SadTalker for lip-sync video generation...")
-            ref_image = Path(paths["work"]) / "sadtalker_ref.png"
-            extract_first_frame(Path(paths["video"]), ref_image)
-            wav16k = Path(paths["work"]) / "tts_16k.wav"
-            ensure_wav_16k_mono_sad(Path(paths["tts_audio"]), wav16k)
-            tmp_sadtalker_out = Path(paths["work"]) / "sadtalker_output.mp4"
-            run_sadtalker(ref_image, wav16k, tmp_sadtalker_out, preprocess="full", still=True, size=256)
-            set_status(job_id, "RUNNING", progress=90)
-            append_log(job_id, "Attaching subtitles to SadTalker video...")
-            add_subtitles_soft(tmp_sadtalker_out, Path(paths["subs"]), Path(paths["out_video"]))
-        elif provider == "wav2lip":
-            set_status(job_id, "RUNNING", progress=85)
-            append_log(job_id, "Running Wav2Lip for lip-sync video generation...")
-            # 상용 Sync API가 설정되어 있으면 원격 실행, 아니면 로컬 체크포인트로 실행
-            tmp_w2l_out = Path(paths["work"]) / "wav2lip_output.mp4"
-            run_wav2lip(Path(paths["video"]), Path(paths["tts_audio"]), tmp_w2l_out)
-            set_status(job_id, "RUNNING", progress=90)
-            append_log(job_id, "Attaching subtitles to Wav2Lip video...")
-            add_subtitles_soft(tmp_w2l_out, Path(paths["subs"]), Path(paths["out_video"]))
-        else:
-            set_status(job_id, "RUNNING", progress=80)
-            append_log(job_id, "Muxing video + KR audio + subtitles...")
-            mux_video_audio(Path(paths["video"]), Path(paths["tts_audio"]), Path(paths["out_video"]), Path(paths["subs"]))
-
-        set_status(job_id, "DONE", progress=100)
-        result_url = f"/results/{job_id}/translated_video.mp4"
-        set_result(job_id, result_url)
-        append_log(job_id, f"Job completed. Result: {result_url}")
+                    if settings.wav2lip_workers > 1:
+                        stats = run_wav2lip_chunked(
+                            Path(paths["video"]), Path(paths["tts_audio"]), tmp_w2l_out, workers=settings.wav2lip_workers
+                        )
+                        append_log(job_id, f"Wav2Lip chunked render: {json.dumps(stats)}")
+                    else:
+                        run_wav2lip_local(Path(paths["video"]), Path(paths["tts_audio"]), tmp_w2l_out)
+                    set_status(job_id, "RUNNING", progress=90)
+                    append_log(job_id, "Attaching subtitles to Wav2Lip video...")
+                    add_subtitles_soft(tmp_w2l_out, Path(paths["subs"]), Path(paths["out_video"]))
+            else:
+                set_status(job_id, "RUNNING", progress=80)
+                append_log(job_id, "Muxing video + KR audio + subtitles...")
+                mux_video_audio(
+                    Path(paths["video"]),
+                    Path(paths["tts_audio"]),
+                    Path(paths["out_video"]),
+                    Path(paths["subs"]),
+                    on_progress=progress_reporter(job_id, 80, 99),
+                )
+
+            _complete_job(job_id, paths)
+            profile_status = "ok"
+            return job_id
+    except Exception as e:  # noqa: BLE001
+        if _was_cancelled(job_id, e):
+            profile_status = "cancelled"
+            _mark_cancelled(job_id)
+            return job_id
+        append_log(job_id, f"Error: {e}")
+        set_status(job_id, "FAILED", progress=0, error=str(e))
+        raise
+    finally:
+        profiler.finish(profile_status)
+        _release_scratch(job_id, paths, profile_status, final=self.request.retries >= _MAX_RETRIES)
+
+
+@celery_app.task(name="poll_sync_generation")
+def poll_sync_generation(job_id: str, generation_id: str, attempt: int = 0, submitted_at: Optional[float] = None) -> None:
+    """Check a Sync API generation once, then either finalize the job or re-schedule with backoff.
+
+    Each check is a short task, so no worker slot is held while the remote render runs.
+    """
+    if not sync_generation_pending(generation_id):
+        return  # already claimed by the webhook (or by DELETE /jobs/{id})
+    if is_cancel_requested(job_id):
+        if claim_sync_generation(generation_id):
+            _mark_cancelled(job_id)
+            discard_job_files(job_id)
+        return
+    submitted_at = submitted_at or time.time()
+    try:
+        status, output_url = get_sync_generation(generation_id)
+    except Exception as e:  # noqa: BLE001
+        append_log(job_id, f"Sync API status check failed (attempt {attempt}): {e}")
+        status, output_url = None, None
+
+    if status in SYNC_TERMINAL_STATUSES:
+        if claim_sync_generation(generation_id):
+            finalize_sync_lipsync.apply_async(args=[job_id, status, output_url])
+        return
+    if time.time() - submitted_at > settings.sync_timeout_sec:
+        if claim_sync_generation(generation_id):
+            finalize_sync_lipsync.apply_async(args=[job_id, "TIMEOUT", None])
+        return
+    poll_sync_generation.apply_async(
+        args=[job_id, generation_id, attempt + 1, submitted_at], countdown=sync_poll_delay(attempt + 1)
+    )
+
+
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": _MAX_RETRIES}, name="finalize_sync_lipsync")
+def finalize_sync_lipsync(self, job_id: str, status: str, output_url: Optional[str]) -> str:
+    """Download a finished Sync API render and run the mux step that process_job handed off."""
+    paths = job_paths(job_id)
+    profiler = JobProfiler(sink=lambda stage, stats: save_profile_stage(job_id, stage, stats))
+    profiler.start("sync_download_mux")
+    profile_status = "failed"
+    try:
+        _raise_if_cancelled(job_id)
+        if status != "COMPLETED" or not output_url:
+            raise RuntimeError(f"Sync API generation failed or timed out. status={status}")
+        set_status(job_id, "RUNNING", progress=88)
+        append_log(job_id, "Downloading Sync API result...")
+        tmp_w2l_out = Path(paths["work"]) / "wav2lip_output.mp4"
+        download_file(output_url, tmp_w2l_out)
+        # May run on a different node than process_job: pull the subtitles from the backend
+        get_storage().fetch(work_key(job_id, Path(paths["subs"]).name), Path(paths["subs"]))
+        set_status(job_id, "RUNNING", progress=90)
+        append_log(job_id, "Attaching subtitles to Wav2Lip video...")
+        add_subtitles_soft(tmp_w2l_out, Path(paths["subs"]), Path(paths["out_video"]))
+        _complete_job(job_id, paths)
+        profile_status = "ok"
         return job_id
     except Exception as e:  # noqa: BLE001
+        if _was_cancelled(job_id, e):
+            profile_status = "cancelled"
+            _mark_cancelled(job_id)
+            return job_id
         append_log(job_id, f"Error: {e}")
         set_status(job_id, "FAILED", progress=0, error=str(e))
         raise
+    finally:
+        profiler.finish(profile_status)
+        _release_scratch(job_id, paths, profile_status, final=self.request.retries >= _MAX_RETRIES)
@@ -0,0 +1,91 @@
+"""Admission control for POST /jobs.
+
+Pure decision logic; the Redis reads/writes live in app.utils.progress. A job is
+admitted only while the broker queue and the estimated processing backlog stay under
+their limits, so latency for jobs already accepted stays predictable. Rejections
+carry a Retry-After estimate derived from how fast the backlog drains.
+"""
+import math
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+from app.config import settings
+
+
+class Admission(NamedTuple):
+    admitted: bool
+    reason: str
+    retry_after: int  # seconds, 0 when admitted
+
+
+def estimate_job_seconds(duration_sec: Optional[float]) -> float:
+    """Rough worker time for a video: linear in its duration plus fixed setup overhead."""
+    duration = duration_sec if duration_sec and duration_sec > 0 else settings.admission_default_duration_sec
+    return duration * settings.admission_sec_per_media_sec + settings.admission_job_overhead_sec
+
+
+def clip_seconds(ranges: Sequence[Tuple[float, Optional[float]]], duration_sec: Optional[float]) -> Optional[float]:
+    """Seconds of video a job will process: the requested ranges clamped to the video, or all of it."""
+    if not ranges:
+        return duration_sec
+    if duration_sec is None and any(end is None for _, end in ranges):
+        return None
+    total = 0.0
+    for start, end in ranges:
+        stop = end if end is not None else duration_sec
+        if duration_sec is not None:
+            stop = min(stop, duration_sec)
+        total += max(0.0, stop - start)
+    return total
+
+
+def _clamp_retry(seconds: float) -> int:
+    return int(min(max(math.ceil(seconds), settings.admission_min_retry_sec), settings.admission_max_retry_sec))
+
+
+def decide(
+    queue_depth: int,
+    running: int,
+    backlog_sec: float,
+    job_sec: float,
+    max_queue_depth: int,
+    max_backlog_sec: float,
+) -> Admission:
+    """Admit or reject a new job of ``job_sec`` estimated seconds.
+
+    ``backlog_sec`` is the estimated work of every admitted, unfinished job and drains
+    at roughly ``running`` jobs in parallel. A limit of 0 disables that check. A job
+    longer than ``max_backlog_sec`` on its own is still admitted into an idle system.
+    """
+    parallel = max(running, 1)
+    if max_queue_depth and queue_depth >= max_queue_depth:
+        per_job = backlog_sec / max(queue_depth + running, 1)
+        wait = per_job * (queue_depth - max_queue_depth + 1) / parallel
+        return Admission(False, "queue_full", _clamp_retry(wait))
+    if max_backlog_sec and backlog_sec > 0 and backlog_sec + job_sec > max_backlog_sec:
+        wait = (backlog_sec + job_sec - max_backlog_sec) / parallel
+        return Admission(False, "backlog_full", _clamp_retry(wait))
+    return Admission(True, "ok", 0)
+
+
+def token_bucket(
+    tokens: Optional[float],
+    updated_at: Optional[float],
+    now: float,
+    rate_per_sec: float,
+    burst: float,
+    cost: float = 1.0,
+) -> Tuple[bool, float, float]:
+    """Refill a bucket to ``now`` and try to take ``cost`` tokens.
+
+    A bucket seen for the first time starts full. Returns (allowed, tokens_left,
+    retry_after_sec), where retry_after_sec is how long until ``cost`` tokens are back.
+    """
+    if tokens is None or updated_at is None:
+        tokens = burst
+    else:
+        tokens = min(burst, tokens + max(0.0, now - updated_at) * rate_per_sec)
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    if rate_per_sec <= 0:
+        return False, tokens, float("inf")
+    return False, tokens, (cost - tokens) / rate_per_sec
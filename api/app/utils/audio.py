@@ -0,0 +1,270 @@
+"""In-process TTS audio assembly with NumPy.
+
+All TTS chunks are decoded by one ffmpeg call into float32 arrays. Joining, gap
+insertion, loudness normalization and resampling then happen in memory. The 16 kHz
+WAV for lip-sync is written directly and the final AAC needs one more ffmpeg call.
+Chunk edges get short raised-cosine fades, so joins don't click the way
+byte-concatenated MP3 frames do.
+"""
+import tempfile
+import wave
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.media import run_cmd
+from app.utils.storage import atomic_output
+
+try:
+    from scipy.signal import resample_poly  # type: ignore
+except ImportError:  # pragma: no cover - optional at runtime
+    resample_poly = None  # type: ignore
+
+
+# Working rate for assembly; the AAC is encoded at this rate
+AUDIO_RATE = 44100
+LIPSYNC_RATE = 16000
+
+
+def decode_chunks(chunks: Sequence[bytes], work_dir: Path, sample_rate: int = AUDIO_RATE) -> List[np.ndarray]:
+    """Decode encoded audio chunks (MP3, WAV, ...) to mono float32 at sample_rate with a single ffmpeg run."""
+    if not chunks:
+        return []
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        tmp_dir = Path(tmp)
+        cmd = ["ffmpeg", "-y", "-v", "error"]
+        for i, data in enumerate(chunks):
+            src = tmp_dir / f"in_{i:04d}"
+            src.write_bytes(data)
+            cmd += ["-i", str(src)]
+        outs = [tmp_dir / f"out_{i:04d}.f32" for i in range(len(chunks))]
+        for i, out in enumerate(outs):
+            # One output per input keeps chunk boundaries without extra processes
+            cmd += ["-map", f"{i}:a:0", "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", str(out)]
+        run_cmd(cmd, timeout=60 * 10)
+        return [np.fromfile(out, dtype="<f4").astype(np.float32) for out in outs]
+
+
+def normalize_loudness(samples: np.ndarray, target_dbfs: float = -20.0, max_gain_db: float = 12.0) -> np.ndarray:
+    """Scale to a target RMS level (dBFS); silence is left alone and boost is capped."""
+    if samples.size == 0:
+        return samples
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+    if rms < 1e-6:
+        return samples
+    gain_db = min(target_dbfs - 20.0 * np.log10(rms), max_gain_db)
+    return (samples * np.float32(10.0 ** (gain_db / 20.0))).astype(np.float32)
+
+
+def fade_edges(samples: np.ndarray, sample_rate: int, fade_ms: float = 8.0) -> np.ndarray:
+    """Raised-cosine fade in/out so chunk boundaries start and end at zero."""
+    n = min(int(sample_rate * fade_ms / 1000.0), samples.size // 2)
+    if n <= 0:
+        return samples
+    ramp = (0.5 - 0.5 * np.cos(np.linspace(0.0, np.pi, n, dtype=np.float32))).astype(np.float32)
+    out = samples.copy()
+    out[:n] *= ramp
+    out[-n:] *= ramp[::-1]
+    return out
+
+
+def join_with_gaps(chunks: Sequence[np.ndarray], sample_rate: int, gap_sec: float = 0.25) -> np.ndarray:
+    """Concatenate chunks with gap_sec of silence between them (one allocation)."""
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    gap = int(round(gap_sec * sample_rate))
+    total = sum(c.size for c in chunks) + gap * (len(chunks) - 1)
+    out = np.zeros(total, dtype=np.float32)
+    pos = 0
+    for chunk in chunks:
+        out[pos : pos + chunk.size] = chunk
+        pos += chunk.size + gap
+    return out
+
+
+def _lowpass(samples: np.ndarray, cutoff: float, taps: int = 101) -> np.ndarray:
+    """Windowed-sinc FIR low-pass; cutoff is a fraction of the sample rate (0..0.5)."""
+    n = np.arange(taps) - (taps - 1) / 2.0
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    kernel /= kernel.sum()
+    return np.convolve(samples, kernel.astype(np.float32), mode="same").astype(np.float32)
+
+
+def resample(samples: np.ndarray, rate_from: int, rate_to: int) -> np.ndarray:
+    """Resample mono float32 audio; polyphase via SciPy when available, else low-pass + linear interpolation."""
+    if rate_from == rate_to or samples.size == 0:
+        return samples.astype(np.float32, copy=False)
+    if resample_poly is not None:
+        g = np.gcd(rate_from, rate_to)
+        return resample_poly(samples, rate_to // g, rate_from // g).astype(np.float32)
+    if rate_to < rate_from:
+        # Anti-alias below the new Nyquist before decimating
+        samples = _lowpass(samples, 0.45 * rate_to / rate_from)
+    count = int(round(samples.size * rate_to / rate_from))
+    positions = np.arange(count, dtype=np.float64) * (rate_from / rate_to)
+    return np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+
+
+def limit_peak(samples: np.ndarray, ceiling: float = 0.98) -> np.ndarray:
+    peak = float(np.max(np.abs(samples))) if samples.size else 0.0
+    return samples * np.float32(ceiling / peak) if peak > ceiling else samples
+
+
+def write_wav(samples: np.ndarray, sample_rate: int, out_path: Path) -> None:
+    """16-bit PCM mono WAV straight from the array (no ffmpeg)."""
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2")
+    with wave.open(str(out_path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+
+
+def encode_aac(samples: np.ndarray, sample_rate: int, out_path: Path, bitrate: str = "192k") -> None:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    raw = out_path.with_name(out_path.name + ".f32")
+    samples.astype("<f4").tofile(raw)
+    try:
+        with atomic_output(out_path) as tmp:
+            cmd = [
+                "ffmpeg", "-y", "-v", "error", "-f", "f32le", "-ar", str(sample_rate), "-ac", "1", "-i", str(raw),
+                "-c:a", "aac", "-b:a", bitrate, str(tmp),
+            ]
+            run_cmd(cmd, timeout=60 * 10)
+    finally:
+        raw.unlink(missing_ok=True)
+
+
+def assemble_speech(
+    chunks: Sequence[bytes],
+    out_aac: Path,
+    out_wav16k: Optional[Path] = None,
+    gap_sec: float = 0.25,
+    target_dbfs: float = -20.0,
+) -> dict:
+    """Build the final TTS track from encoded chunks: AAC at AUDIO_RATE and optionally a 16 kHz mono WAV.
+
+    Two ffmpeg runs in total (decode all chunks, encode AAC) however many chunks there are.
+    Returns {"chunks", "duration_sec"}.
+    """
+    decoded = decode_chunks(chunks, out_aac.parent)
+    leveled = [fade_edges(normalize_loudness(c, target_dbfs), AUDIO_RATE) for c in decoded if c.size]
+    track = join_with_gaps(leveled, AUDIO_RATE, gap_sec)
+    if track.size == 0:
+        track = np.zeros(int(0.5 * AUDIO_RATE), dtype=np.float32)  # keep downstream muxes valid
+    track = limit_peak(track)
+    encode_aac(track, AUDIO_RATE, out_aac)
+    if out_wav16k is not None:
+        write_wav(resample(track, AUDIO_RATE, LIPSYNC_RATE), LIPSYNC_RATE, out_wav16k)
+    return {"chunks": len(chunks), "duration_sec": round(track.size / AUDIO_RATE, 3)}
+
+
+def time_stretch(samples: np.ndarray, rate: float, n_fft: int = 1024, hop: int = 256) -> np.ndarray:
+    """Pitch-preserving tempo change by a phase vocoder; rate > 1 shortens the clip by that factor.
+
+    STFT analysis, per-bin phase advance and overlap-add synthesis are all done on whole
+    frame matrices (no per-frame Python loop). Output length is round(len / rate).
+    """
+    target = int(round(samples.size / rate))
+    if abs(rate - 1.0) < 1e-3 or samples.size < n_fft:
+        if samples.size < n_fft and samples.size:
+            # Too short for an STFT: plain resampling (shifts pitch, inaudible at this length)
+            positions = np.linspace(0, samples.size - 1, max(target, 1))
+            return np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+        return samples.astype(np.float32, copy=False)
+
+    window = np.hanning(n_fft).astype(np.float32)
+    padded = np.pad(samples.astype(np.float32), (n_fft // 2, n_fft // 2 + hop))
+    frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft)[::hop] * window
+    spec = np.fft.rfft(frames, axis=1)
+    magnitude, phase = np.abs(spec), np.angle(spec)
+
+    steps = np.arange(0, spec.shape[0] - 1, rate)
+    idx = steps.astype(np.int64)
+    frac = (steps - idx)[:, None].astype(np.float32)
+    out_mag = (1.0 - frac) * magnitude[idx] + frac * magnitude[idx + 1]
+
+    # Expected phase advance per hop for each bin, plus the measured deviation wrapped to [-pi, pi)
+    omega = 2.0 * np.pi * hop * np.arange(spec.shape[1]) / n_fft
+    delta = phase[idx + 1] - phase[idx] - omega
+    delta -= 2.0 * np.pi * np.round(delta / (2.0 * np.pi))
+    out_phase = phase[0] + np.concatenate([np.zeros((1, spec.shape[1])), np.cumsum(omega + delta, axis=0)[:-1]])
+
+    out_frames = np.fft.irfft(out_mag * np.exp(1j * out_phase), n=n_fft, axis=1).astype(np.float32) * window
+    length = hop * (len(steps) - 1) + n_fft
+    positions = (np.arange(len(steps)) * hop)[:, None] + np.arange(n_fft)
+    out = np.zeros(length, dtype=np.float32)
+    norm = np.zeros(length, dtype=np.float32)
+    np.add.at(out, positions, out_frames)
+    np.add.at(norm, positions, np.broadcast_to(window * window, out_frames.shape))
+    out /= np.maximum(norm, 1e-3)
+    out = out[n_fft // 2 : n_fft // 2 + target]
+    if out.size < target:
+        out = np.pad(out, (0, target - out.size))
+    return out
+
+
+def place_on_timeline(
+    clips: Sequence[Optional[np.ndarray]],
+    starts: Sequence[float],
+    total_sec: float,
+    sample_rate: int,
+    max_speedup: float = 1.5,
+    fade_ms: float = 8.0,
+) -> tuple:
+    """Lay clips out on a silent track of total_sec, each starting at its segment start.
+
+    A clip may run until the next segment starts (or the end of the track). Clips that
+    overrun that slot are time-compressed up to max_speedup; anything still too long is
+    cut with a short fade. Returns (track, stats).
+    """
+    total = int(round(total_sec * sample_rate))
+    track = np.zeros(total, dtype=np.float32)
+    stats = {"segments": len(clips), "placed": 0, "stretched": 0, "truncated": 0, "max_speedup": 1.0}
+    bounds = [int(round(s * sample_rate)) for s in starts] + [total]
+    for i, clip in enumerate(clips):
+        begin = min(max(bounds[i], 0), total)
+        slot = max(0, min(bounds[i + 1], total) - begin)
+        if clip is None or clip.size == 0 or slot == 0:
+            continue
+        if clip.size > slot:
+            rate = min(clip.size / slot, max_speedup)
+            clip = time_stretch(clip, rate)
+            stats["stretched"] += 1
+            stats["max_speedup"] = round(max(stats["max_speedup"], rate), 3)
+            if clip.size > slot:
+                clip = fade_edges(clip[:slot], sample_rate, fade_ms)
+                stats["truncated"] += 1
+        track[begin : begin + clip.size] += clip
+        stats["placed"] += 1
+    return track, stats
+
+
+def assemble_timed_speech(
+    chunks: Sequence[Optional[bytes]],
+    starts: Sequence[float],
+    total_sec: float,
+    out_aac: Path,
+    out_wav16k: Optional[Path] = None,
+    target_dbfs: float = -20.0,
+    max_speedup: float = 1.5,
+) -> dict:
+    """Build a dubbing track as long as the video with one clip per subtitle segment at its start time.
+
+    ``chunks[i]`` is the encoded TTS for the segment starting at ``starts[i]`` (None when
+    the segment has no text). Same two-ffmpeg-run budget as assemble_speech.
+    """
+    present = [i for i, c in enumerate(chunks) if c]
+    decoded = decode_chunks([chunks[i] for i in present], out_aac.parent)
+    clips: List[Optional[np.ndarray]] = [None] * len(chunks)
+    for i, samples in zip(present, decoded):
+        clips[i] = fade_edges(normalize_loudness(samples, target_dbfs), AUDIO_RATE)
+    track, stats = place_on_timeline(clips, starts, total_sec, AUDIO_RATE, max_speedup=max_speedup)
+    track = limit_peak(track)
+    encode_aac(track, AUDIO_RATE, out_aac)
+    if out_wav16k is not None:
+        write_wav(resample(track, AUDIO_RATE, LIPSYNC_RATE), LIPSYNC_RATE, out_wav16k)
+    stats["duration_sec"] = round(track.size / AUDIO_RATE, 3)
+    return stats
@@ -1,8 +1,19 @@
+import os
+import re
+import shutil
+import signal
 import subprocess
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Deque, Iterator, List, Optional, Sequence, Tuple
 
 from app.utils.logging import get_logger
+from app.utils.probe import mux_codecs, probe_media
+from app.utils.storage import atomic_output, place_file
 
 
 logger = get_logger(__name__)
@@ -12,38 +23,319 @@ class CommandError(RuntimeError):
     pass
 
 
-def run_cmd(cmd: List[str], timeout: Optional[int] = None) -> None:
+class CommandCancelled(CommandError):
+    pass
+
+
+# Cooperative cancellation check for every run_cmd in the current context (e.g. a job stage)
+_cancel_check: ContextVar[Optional[Callable[[], bool]]] = ContextVar("cancel_check", default=None)
+
+_FFMPEG_OUT_TIME_RE = re.compile(r"^out_time_(?:us|ms)=(\d+)$")
+_FFMPEG_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_YTDLP_PERCENT_RE = re.compile(r"^\[download\]\s+(\d+(?:\.\d+)?)%")
+
+
+@contextmanager
+def cancellation(check: Callable[[], bool]) -> Iterator[None]:
+    """Make every run_cmd inside the block poll ``check`` and abort when it returns True."""
+    token = _cancel_check.set(check)
+    try:
+        yield
+    finally:
+        _cancel_check.reset(token)
+
+
+def parse_progress(line: str, duration: Optional[float]) -> Optional[float]:
+    """Map one ffmpeg ``-progress`` or yt-dlp ``--newline`` output line to a 0..1 fraction."""
+    m = _FFMPEG_OUT_TIME_RE.match(line)
+    if m:
+        # out_time_ms is (despite its name) in microseconds, same as out_time_us
+        return min(1.0, int(m.group(1)) / 1e6 / duration) if duration else None
+    if line == "progress=end":
+        return 1.0
+    m = _YTDLP_PERCENT_RE.match(line)
+    if m:
+        return min(1.0, float(m.group(1)) / 100.0)
+    return None
+
+
+def _with_progress_flags(cmd: List[str]) -> List[str]:
+    prog = Path(cmd[0]).name
+    if prog == "ffmpeg" and "-progress" not in cmd:
+        return [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+    if prog == "yt-dlp" and "--newline" not in cmd:
+        return [cmd[0], "--newline", *cmd[1:]]
+    return cmd
+
+
+def _signal_group(proc: subprocess.Popen, sig: int) -> None:
+    try:
+        os.killpg(proc.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def _terminate(proc: subprocess.Popen) -> None:
+    # The command runs in its own session, so this reaches every child it spawned
+    # (e.g. inference.py's ffmpeg, yt-dlp's ffmpeg merger), not just the direct child.
+    _signal_group(proc, signal.SIGTERM)
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        pass
+    _signal_group(proc, signal.SIGKILL)
+    proc.wait()
+
+
+def run_cmd(
+    cmd: List[str],
+    timeout: Optional[int] = None,
+    cwd: Optional[Path] = None,
+    env: Optional[dict] = None,
+    on_progress: Optional[Callable[[float], None]] = None,
+    duration: Optional[float] = None,
+    should_cancel: Optional[Callable[[], bool]] = None,
+    tail_lines: int = 200,
+    on_line: Optional[Callable[[str], None]] = None,
+) -> List[str]:
+    """Run a command, streaming its merged stdout/stderr instead of buffering it all.
+
+    Output is read incrementally; only the last ``tail_lines`` lines are kept (for
+    error messages), so memory stays flat for long ffmpeg/yt-dlp runs. When
+    ``on_progress`` is given, ffmpeg gets ``-progress pipe:1`` and yt-dlp ``--newline``,
+    and each parsed fraction (0..1) is passed to the callback from the reader thread.
+    ffmpeg's own ``Duration:`` header is used when ``duration`` is not given.
+    ``should_cancel`` (or the enclosing ``cancellation()`` context) is polled while the
+    process runs; when it returns True the command's whole process group is terminated
+    and CommandCancelled is raised. ``on_line`` sees every non-empty output line as it
+    arrives (e.g. to timestamp a tool's phases). Returns the output tail.
+    """
+    if on_progress:
+        cmd = _with_progress_flags(cmd)
+    should_cancel = should_cancel or _cancel_check.get()
     logger.info("run_cmd %s", " ".join(cmd))
+    tail: Deque[str] = deque(maxlen=tail_lines)
+    total = [duration]
+
+    proc = subprocess.Popen(
+        cmd,
+        cwd=str(cwd) if cwd else None,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=0,
+        start_new_session=True,
+    )
+
+    def _handle(raw: bytes) -> None:
+        line = raw.decode("utf-8", errors="replace").strip()
+        if not line:
+            return
+        tail.append(line)
+        if on_line:
+            try:
+                on_line(line)
+            except Exception:  # noqa: BLE001 - same contract as on_progress
+                logger.exception("line callback failed")
+        if not on_progress:
+            return
+        if total[0] is None:
+            m = _FFMPEG_DURATION_RE.search(line)
+            if m:
+                total[0] = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
+        frac = parse_progress(line, total[0])
+        if frac is not None:
+            try:
+                on_progress(frac)
+            except Exception:  # noqa: BLE001 - progress reporting must never break the command
+                logger.exception("progress callback failed")
+
+    def _reader() -> None:
+        buf = b""
+        while True:
+            chunk = proc.stdout.read(65536)  # type: ignore[union-attr]
+            if not chunk:
+                break
+            buf += chunk
+            # ffmpeg/yt-dlp redraw status lines with \r; treat it as a line break too
+            *lines, buf = re.split(rb"[\r\n]", buf)
+            for raw in lines:
+                _handle(raw)
+        if buf:
+            _handle(buf)
+
+    reader = threading.Thread(target=_reader, daemon=True)
+    reader.start()
+    deadline = time.monotonic() + timeout if timeout else None
     try:
-        completed = subprocess.run(cmd, check=True, timeout=timeout, capture_output=True, text=True)
-        if completed.stdout:
-            logger.info("stdout: %s", completed.stdout[:2000])
-        if completed.stderr:
-            logger.info("stderr: %s", completed.stderr[:2000])
-    except subprocess.CalledProcessError as exc:
-        msg = exc.stderr if isinstance(exc.stderr, str) and exc.stderr else str(exc)
-        raise CommandError(f"Command failed: {cmd} -> {msg}") from exc
+        while True:
+            try:
+                proc.wait(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if should_cancel and should_cancel():
+                _terminate(proc)
+                raise CommandCancelled(f"Command cancelled: {cmd}")
+            if deadline and time.monotonic() > deadline:
+                _terminate(proc)
+                raise CommandError(f"Command timed out after {timeout}s: {cmd}")
+    finally:
+        reader.join(timeout=5)
+        if proc.stdout:
+            proc.stdout.close()
+
+    output = "\n".join(tail)
+    if proc.returncode != 0:
+        raise CommandError(f"Command failed: {cmd} -> {output[-2000:]}")
+    if output:
+        logger.info("output: %s", output[-2000:])
+    return list(tail)
+
 
+# Download best video+audio merged as mp4 (avoid video-only DASH)
+# Prefer mp4/m4a to ensure ffmpeg compatibility inside container
+_YTDLP_VIDEO_FORMAT = "bestvideo[ext=mp4][vcodec!=av01]+bestaudio[ext=m4a]/best[ext=mp4]/best"
 
-def download_video(youtube_url: str, out_video: Path) -> None:
+
+def download_video(youtube_url: str, out_video: Path, on_progress: Optional[Callable[[float], None]] = None) -> None:
     out_video.parent.mkdir(parents=True, exist_ok=True)
-    # Download best video+audio merged as mp4 (avoid video-only DASH)
-    # Prefer mp4/m4a to ensure ffmpeg compatibility inside container
     cmd = [
         "yt-dlp",
         "--no-playlist",
         "-f",
-        "bestvideo[ext=mp4][vcodec!=av01]+bestaudio[ext=m4a]/best[ext=mp4]/best",
+        _YTDLP_VIDEO_FORMAT,
         "--merge-output-format",
         "mp4",
         "-o",
         str(out_video),
         youtube_url,
     ]
-    run_cmd(cmd, timeout=60 * 30)
+    run_cmd(cmd, timeout=60 * 30, on_progress=on_progress)
+
+
+def download_clip(
+    youtube_url: str,
+    out_video: Path,
+    ranges: Sequence[Tuple[float, Optional[float]]],
+    on_progress: Optional[Callable[[float], None]] = None,
+) -> None:
+    """Download only the given [start, end) second ranges (end None = to the end), joined in order into one clip.
+
+    Uses ``yt-dlp --download-sections`` with cuts forced onto keyframes so each part
+    starts exactly at its range. If the extractor or yt-dlp build can't do partial
+    downloads, falls back to the full download cut with ffmpeg. Either way the clip
+    starts at 0, so everything downstream (STT timestamps, subtitles) is clip-relative.
+    """
+    parts_dir = out_video.parent / "sections"
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    cmd = ["yt-dlp", "--no-playlist", "-f", _YTDLP_VIDEO_FORMAT, "--merge-output-format", "mp4", "--force-keyframes-at-cuts"]
+    for start, end in ranges:
+        cmd += ["--download-sections", f"*{start:.3f}-{'inf' if end is None else f'{end:.3f}'}"]
+    cmd += ["-o", str(parts_dir / "part_%(section_number)03d.%(ext)s"), youtube_url]
+    try:
+        run_cmd(cmd, timeout=60 * 30, on_progress=on_progress)
+        parts = sorted(parts_dir.glob("part_*.mp4"))
+        if len(parts) != len(ranges):
+            raise CommandError(f"yt-dlp produced {len(parts)} sections for {len(ranges)} ranges")
+    except CommandCancelled:
+        raise
+    except CommandError as e:
+        logger.warning("Section download failed, cutting from the full video instead: %s", e)
+        full = parts_dir / "full.mp4"
+        download_video(youtube_url, full, on_progress=on_progress)
+        parts = [parts_dir / f"cut_{i:03d}.mp4" for i in range(len(ranges))]
+        for (start, end), part in zip(ranges, parts):
+            cut_clip(full, start, end, part)
+    if len(parts) == 1:
+        place_file(parts[0], out_video, move=True)
+    else:
+        ts_parts = [part.with_suffix(".ts") for part in parts]
+        for part, ts_part in zip(parts, ts_parts):
+            remux_to_ts(part, ts_part)
+        concat_videos(ts_parts, out_video)
+    shutil.rmtree(parts_dir, ignore_errors=True)
+
+
+def probe_remote_duration(youtube_url: str, timeout: int = 15) -> Optional[float]:
+    """Video duration in seconds from yt-dlp metadata only (no download); None when unavailable."""
+    cmd = ["yt-dlp", "--no-playlist", "--skip-download", "--no-warnings", "--print", "duration", youtube_url]
+    try:
+        lines = run_cmd(cmd, timeout=timeout, tail_lines=20)
+    except (CommandError, OSError) as e:
+        logger.warning("Duration probe failed for %s: %s", youtube_url, e)
+        return None
+    for line in reversed(lines):
+        try:
+            return float(line.strip())
+        except ValueError:
+            continue
+    return None
+
+
+def download_audio(
+    youtube_url: str,
+    out_audio: Path,
+    on_progress: Optional[Callable[[float], None]] = None,
+    ranges: Optional[Sequence[Tuple[float, Optional[float]]]] = None,
+) -> None:
+    """Fetch only the best audio track (for sources whose merged download came back video-only).
+
+    With ``ranges`` only those sections are fetched and joined in order, so the track
+    lines up with the clip download_clip made for the same ranges; if partial
+    downloads fail, the full track is trimmed instead.
+    """
+    out_audio.parent.mkdir(parents=True, exist_ok=True)
+    cmd = ["yt-dlp", "--no-playlist", "-f", "bestaudio[ext=m4a]/bestaudio"]
+    if not ranges:
+        run_cmd(cmd + ["-o", str(out_audio), youtube_url], timeout=60 * 30, on_progress=on_progress)
+        return
+    parts_dir = out_audio.parent / "audio_sections"
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    for start, end in ranges:
+        cmd += ["--download-sections", f"*{start:.3f}-{'inf' if end is None else f'{end:.3f}'}"]
+    cmd += ["-o", str(parts_dir / "part_%(section_number)03d.%(ext)s"), youtube_url]
+    try:
+        run_cmd(cmd, timeout=60 * 30, on_progress=on_progress)
+        parts = sorted(p for p in parts_dir.glob("part_*") if p.suffix not in (".part", ".ytdl"))
+        if len(parts) != len(ranges):
+            raise CommandError(f"yt-dlp produced {len(parts)} audio sections for {len(ranges)} ranges")
+        join_audio_ranges([(part, 0.0, None) for part in parts], out_audio)
+    except CommandCancelled:
+        raise
+    except CommandError as e:
+        logger.warning("Audio section download failed, trimming the full track instead: %s", e)
+        full = parts_dir / "full.m4a"
+        download_audio(youtube_url, full, on_progress=on_progress)
+        join_audio_ranges([(full, start, end) for start, end in ranges], out_audio)
+    shutil.rmtree(parts_dir, ignore_errors=True)
+
+
+def build_join_audio_command(parts: Sequence[Tuple[Path, float, Optional[float]]], out_audio: Path) -> List[str]:
+    """ffmpeg command joining [start, end) of each (file, start, end) in order (end None = to the end)."""
+    inputs: List[Path] = []
+    filters, labels = [], []
+    for i, (path, start, end) in enumerate(parts):
+        if path not in inputs:
+            inputs.append(path)
+        trim = f"atrim=start={start:.6f}" + (f":end={end:.6f}" if end is not None else "")
+        filters.append(f"[{inputs.index(path)}:a:0]{trim},asetpts=PTS-STARTPTS[a{i}]")
+        labels.append(f"[a{i}]")
+    filters.append(f"{''.join(labels)}concat=n={len(parts)}:v=0:a=1[out]")
+    cmd = ["ffmpeg", "-y"]
+    for path in inputs:
+        cmd += ["-i", str(path)]
+    return cmd + ["-filter_complex", ";".join(filters), "-map", "[out]", "-c:a", "aac", "-b:a", "192k", str(out_audio)]
+
 
+def join_audio_ranges(parts: Sequence[Tuple[Path, float, Optional[float]]], out_audio: Path) -> None:
+    with atomic_output(out_audio) as tmp:
+        run_cmd(build_join_audio_command(parts, tmp), timeout=60 * 10)
 
-def extract_audio(input_video: Path, out_audio: Path) -> None:
+
+def extract_audio(input_video: Path, out_audio: Path, on_progress: Optional[Callable[[float], None]] = None) -> None:
     """Extract audio as WAV (PCM) to maximize compatibility inside containers.
 
     Using MP3 may fail when libmp3lame is not available or licensed differently.
@@ -66,10 +358,18 @@ def extract_audio(input_video: Path, out_audio: Path) -> None:
         "1",
         str(out_path),
     ]
-    run_cmd(cmd, timeout=60 * 10)
+    run_cmd(cmd, timeout=60 * 10, on_progress=on_progress)
 
 
-def build_mux_command(video: Path, audio: Path, out_video: Path, subs: Optional[Path] = None) -> List[str]:
+def build_mux_command(
+    video: Path,
+    audio: Path,
+    out_video: Path,
+    subs: Optional[Path] = None,
+    video_codec: str = "copy",
+    audio_codec: str = "aac",
+    max_height: Optional[int] = None,
+) -> List[str]:
     # Replace audio, keep video; optional soft subtitles
     cmd: List[str] = [
         "ffmpeg",
@@ -81,11 +381,13 @@ def build_mux_command(video: Path, audio: Path, out_video: Path, subs: Optional[
     ]
     if subs and subs.exists():
         cmd += ["-i", str(subs)]
+    cmd += ["-c:v", video_codec]
+    if max_height:
+        # Downscaled preview encode: quality is traded for speed
+        cmd += ["-vf", f"scale=-2:{max_height}", "-preset", "ultrafast", "-crf", "30", "-pix_fmt", "yuv420p"]
     cmd += [
-        "-c:v",
-        "copy",
         "-c:a",
-        "aac",
+        audio_codec,
         "-map",
         "0:v:0",
         "-map",
@@ -97,9 +399,26 @@ def build_mux_command(video: Path, audio: Path, out_video: Path, subs: Optional[
     return cmd
 
 
-def mux_video_audio(video: Path, audio: Path, out_video: Path, subs: Optional[Path] = None) -> None:
-    cmd = build_mux_command(video, audio, out_video, subs)
-    run_cmd(cmd, timeout=60 * 20)
+def mux_video_audio(
+    video: Path,
+    audio: Path,
+    out_video: Path,
+    subs: Optional[Path] = None,
+    on_progress: Optional[Callable[[float], None]] = None,
+    max_height: Optional[int] = None,
+) -> None:
+    # Stream copy whatever already fits in MP4; transcode only the streams that do not
+    video_info = probe_media(video)
+    video_codec, audio_codec = mux_codecs(video_info, probe_media(audio))
+    if max_height and (video_info["video"] or {}).get("height", 0) > max_height:
+        video_codec = "libx264"
+    else:
+        max_height = None
+    with atomic_output(out_video) as tmp:
+        cmd = build_mux_command(
+            video, audio, tmp, subs, video_codec=video_codec, audio_codec=audio_codec, max_height=max_height
+        )
+        run_cmd(cmd, timeout=60 * 20, on_progress=on_progress)
 
 
 def extract_first_frame(input_video: Path, out_image: Path) -> None:
@@ -109,3 +428,95 @@ def extract_first_frame(input_video: Path, out_image: Path) -> None:
         "-vf", "select='eq(n,0)'", "-q:v", "2", str(out_image)
     ]
     run_cmd(cmd, timeout=60)
+
+
+def probe_duration(media: Path) -> float:
+    return probe_media(media)["duration"]
+
+
+def probe_video_stream(video: Path) -> dict:
+    """Return codec, size, pixel format and frame rate of the first video stream."""
+    return dict(probe_media(video)["video"] or {})
+
+
+def keyframe_times(video: Path) -> List[float]:
+    """Presentation times of video keyframes, read from packet flags (no decoding)."""
+    return probe_media(video, keyframes=True)["keyframes"]
+
+
+def cut_video(video: Path, start: float, end: float, out_video: Path, copy: bool = True, encode: Optional[dict] = None) -> None:
+    """Cut [start, end) of the first video stream (audio dropped).
+
+    With copy=True the cut is only frame-accurate when start is a keyframe, so callers
+    snap copy boundaries to keyframe_times(). Otherwise the span is re-encoded with
+    ``encode`` (codec params and size from probe_video_stream) for an exact cut.
+    """
+    cmd = ["ffmpeg", "-y", "-ss", f"{start:.6f}", "-i", str(video), "-t", f"{end - start:.6f}", "-map", "0:v:0", "-an"]
+    if copy:
+        cmd += ["-c", "copy", "-avoid_negative_ts", "make_zero"]
+    else:
+        encode = encode or {}
+        if encode.get("width") and encode.get("height"):
+            cmd += ["-vf", f"scale={encode['width']}:{encode['height']}"]
+        cmd += _encode_args(encode)
+    cmd.append(str(out_video))
+    run_cmd(cmd, timeout=60 * 10)
+
+
+def _encode_args(encode: dict) -> List[str]:
+    args = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", encode.get("pix_fmt", "yuv420p")]
+    if encode.get("fps"):
+        args += ["-r", f"{encode['fps']:.6f}"]
+    return args
+
+
+def encode_video_like(input_video: Path, duration: float, encode: dict, out_video: Path, loop_image: bool = False) -> None:
+    """Re-encode (or render a still image) to exactly ``duration`` seconds with the given codec params.
+
+    Short inputs are padded by cloning the last frame, so every part lands on the
+    frame grid and concatenates without drift.
+    """
+    cmd = ["ffmpeg", "-y"]
+    if loop_image:
+        cmd += ["-loop", "1"]
+    cmd += ["-i", str(input_video), "-map", "0:v:0", "-an"]
+    filters = [f"tpad=stop_mode=clone:stop_duration={duration:.3f}"]
+    if encode.get("width") and encode.get("height"):
+        filters.insert(0, f"scale={encode['width']}:{encode['height']}")
+    cmd += ["-vf", ",".join(filters), "-t", f"{duration:.6f}"] + _encode_args(encode) + [str(out_video)]
+    run_cmd(cmd, timeout=60 * 20)
+
+
+def cut_clip(video: Path, start: float, end: Optional[float], out_video: Path) -> None:
+    """Frame-accurate cut of [start, end) keeping video and audio (both re-encoded); end None = to the end."""
+    cmd = ["ffmpeg", "-y", "-ss", f"{start:.6f}", "-i", str(video)]
+    if end is not None:
+        cmd += ["-t", f"{end - start:.6f}"]
+    cmd += ["-map", "0:v:0", "-map", "0:a:0?"] + _encode_args({}) + ["-c:a", "aac", "-b:a", "192k", str(out_video)]
+    run_cmd(cmd, timeout=60 * 20)
+
+
+def cut_audio(audio: Path, start: float, end: float, out_wav: Path) -> None:
+    cmd = [
+        "ffmpeg", "-y", "-ss", f"{start:.6f}", "-i", str(audio), "-t", f"{end - start:.6f}",
+        "-ar", "16000", "-ac", "1", str(out_wav),
+    ]
+    run_cmd(cmd, timeout=60 * 5)
+
+
+def remux_to_ts(video: Path, out_ts: Path) -> None:
+    """Stream-copy video and audio into MPEG-TS, the part format concat_videos expects."""
+    cmd = ["ffmpeg", "-y", "-i", str(video), "-map", "0:v:0", "-map", "0:a:0?", "-c", "copy", "-f", "mpegts", str(out_ts)]
+    run_cmd(cmd, timeout=60 * 10)
+
+
+def concat_videos(parts: List[Path], out_video: Path) -> None:
+    """Join parts with the concat demuxer, stream copy (no re-encoding).
+
+    Parts should be MPEG-TS so differing encoder headers travel in-band.
+    """
+    list_file = out_video.with_suffix(".concat.txt")
+    list_file.write_text("".join(f"file '{p.resolve()}'\n" for p in parts), encoding="utf-8")
+    with atomic_output(out_video) as tmp:
+        cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(list_file), "-c", "copy", str(tmp)]
+        run_cmd(cmd, timeout=60 * 20)
@@ -0,0 +1,226 @@
+"""Where job artifacts live once a worker is done with them.
+
+Workers always process on node-local scratch (``SCRATCH_DIR``, see ``job_paths``) and
+publish through a ``StorageBackend``:
+
+- ``local``: the shared ``DATA_DIR`` volume served by the API under ``/results``.
+  When scratch and ``DATA_DIR`` are the same directory, publishing is a no-op.
+- ``s3``: any S3-compatible store (AWS, MinIO, R2...). Uploads stream from disk with
+  multipart transfers; downloads are served via short-lived presigned URLs that the
+  API hands out as redirects, so workers need no shared filesystem.
+
+Keys are ``results/{job_id}/{name}`` for deliverables and ``work/{job_id}/{name}`` for
+intermediates another task (possibly on another node) may need to pick up.
+"""
+import mimetypes
+import shutil
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Optional
+
+from app.config import settings
+from app.utils.storage import place_file, remove_job_dirs
+
+
+def result_key(job_id: str, name: str) -> str:
+    return f"results/{job_id}/{name}"
+
+
+def work_key(job_id: str, name: str) -> str:
+    return f"work/{job_id}/{name}"
+
+
+class StorageBackend(ABC):
+    #: True when artifacts leave the node, i.e. scratch copies can be dropped after upload
+    remote: bool = False
+
+    @abstractmethod
+    def put_file(self, local_path: Path, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def get_file(self, key: str, local_path: Path) -> Path:
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def download_url(self, key: str) -> str:
+        """URL a browser can fetch the object from right now."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete one object; a missing key is not an error."""
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> None:
+        """Delete every object under ``prefix/``."""
+
+    def result_url(self, job_id: str, name: str) -> str:
+        """Stable URL stored with the job; resolved through the API for backends with expiring URLs."""
+        return f"/jobs/{job_id}/files/{name}"
+
+    def fetch(self, key: str, local_path: Path) -> Path:
+        """Make sure key is present at local_path, downloading only if scratch doesn't have it."""
+        if not local_path.exists():
+            self.get_file(key, local_path)
+        return local_path
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or settings.base_data_dir)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise ValueError(f"Storage key escapes the data dir: {key}")
+        return path
+
+    def put_file(self, local_path: Path, key: str) -> None:
+        # Hard link (or no-op when scratch is the data dir) instead of copying bytes
+        place_file(local_path, self._path(key))
+
+    def get_file(self, key: str, local_path: Path) -> Path:
+        place_file(self._path(key), local_path)
+        return local_path
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def delete_prefix(self, prefix: str) -> None:
+        shutil.rmtree(self._path(prefix), ignore_errors=True)
+
+    def download_url(self, key: str) -> str:
+        prefix = "results/"
+        if not key.startswith(prefix):
+            raise ValueError(f"Only results are served by the local backend: {key}")
+        return f"{settings.results_base_url.rstrip('/')}/{key[len(prefix):]}"
+
+    def result_url(self, job_id: str, name: str) -> str:
+        return self.download_url(result_key(job_id, name))
+
+
+class S3Storage(StorageBackend):
+    remote = True
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        client: Any = None,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        presign_expires_sec: int = 3600,
+        multipart_threshold_mb: int = 16,
+        multipart_chunk_mb: int = 16,
+        max_concurrency: int = 4,
+    ):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.presign_expires_sec = presign_expires_sec
+        self.transfer_config = None
+        try:
+            import boto3  # type: ignore
+            from boto3.s3.transfer import TransferConfig  # type: ignore
+        except ImportError:
+            if client is None:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+        else:
+            self.transfer_config = TransferConfig(
+                multipart_threshold=multipart_threshold_mb * 1024 * 1024,
+                multipart_chunksize=multipart_chunk_mb * 1024 * 1024,
+                max_concurrency=max_concurrency,
+            )
+            if client is None:
+                client = boto3.client("s3", endpoint_url=endpoint_url or None, region_name=region or None)
+        self.client = client
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _transfer_kwargs(self) -> dict:
+        return {"Config": self.transfer_config} if self.transfer_config is not None else {}
+
+    def put_file(self, local_path: Path, key: str) -> None:
+        # upload_file streams from disk and switches to parallel multipart parts above the threshold
+        content_type = mimetypes.guess_type(local_path.name)[0] or "application/octet-stream"
+        self.client.upload_file(
+            str(local_path),
+            self.bucket,
+            self._key(key),
+            ExtraArgs={"ContentType": content_type},
+            **self._transfer_kwargs(),
+        )
+
+    def get_file(self, key: str, local_path: Path) -> Path:
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        part = local_path.with_name(local_path.name + ".part")
+        self.client.download_file(self.bucket, self._key(key), str(part), **self._transfer_kwargs())
+        part.replace(local_path)
+        return local_path
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception as e:  # noqa: BLE001
+            status = getattr(e, "response", {}).get("ResponseMetadata", {}).get("HTTPStatusCode")
+            if status == 404 or type(e).__name__ in ("NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def delete_prefix(self, prefix: str) -> None:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix.rstrip("/") + "/")):
+            keys = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+            if keys:  # a listing page holds at most 1000 keys, the delete_objects limit
+                self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": keys, "Quiet": True})
+
+    def download_url(self, key: str) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._key(key)},
+            ExpiresIn=self.presign_expires_sec,
+        )
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """Process-wide backend selected by STORAGE_BACKEND (local, s3)."""
+    global _storage
+    if _storage is None:
+        name = (settings.storage_backend or "local").lower()
+        if name == "s3":
+            if not settings.s3_bucket:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+            _storage = S3Storage(
+                settings.s3_bucket,
+                prefix=settings.s3_prefix,
+                endpoint_url=settings.s3_endpoint_url,
+                region=settings.s3_region,
+                presign_expires_sec=settings.s3_presign_expires_sec,
+                multipart_threshold_mb=settings.s3_multipart_threshold_mb,
+                multipart_chunk_mb=settings.s3_multipart_chunk_mb,
+            )
+        else:
+            _storage = LocalStorage()
+    return _storage
+
+
+def discard_job_files(job_id: str) -> None:
+    """Remove a cancelled job's scratch dirs on this node and everything it published."""
+    remove_job_dirs(job_id)
+    storage = get_storage()
+    for prefix in (f"work/{job_id}", f"results/{job_id}"):
+        storage.delete_prefix(prefix)
@@ -0,0 +1,110 @@
+import json
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+
+from app.utils.logging import get_logger
+
+
+logger = get_logger(__name__)
+
+# Codecs the MP4 muxer (and common players) accept as-is, so muxing can stream copy them
+MP4_VIDEO_COPY_CODECS = {"h264", "hevc", "mpeg4", "av1"}
+MP4_AUDIO_COPY_CODECS = {"aac", "mp3", "alac"}
+
+
+def _ffprobe_json(args: List[str]) -> dict:
+    cmd = ["ffprobe", "-v", "error", "-of", "json", *args]
+    completed = subprocess.run(cmd, check=True, timeout=60 * 5, capture_output=True, text=True)
+    return json.loads(completed.stdout or "{}")
+
+
+def _fps(rate: Optional[str]) -> float:
+    num, _, den = (rate or "0/1").partition("/")
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _parse(data: dict) -> dict:
+    fmt = data.get("format") or {}
+    info: dict = {"duration": float(fmt.get("duration") or 0.0), "format": fmt.get("format_name"), "video": None, "audio": None}
+    for stream in data.get("streams") or []:
+        kind = stream.get("codec_type")
+        if kind == "video" and info["video"] is None and not (stream.get("disposition") or {}).get("attached_pic"):
+            info["video"] = {
+                "codec": stream.get("codec_name"),
+                "width": int(stream.get("width") or 0),
+                "height": int(stream.get("height") or 0),
+                "pix_fmt": stream.get("pix_fmt") or "yuv420p",
+                "fps": _fps(stream.get("avg_frame_rate")) or _fps(stream.get("r_frame_rate")) or 25.0,
+                "duration": float(stream.get("duration") or info["duration"]),
+            }
+        elif kind == "audio" and info["audio"] is None:
+            info["audio"] = {
+                "codec": stream.get("codec_name"),
+                "sample_rate": int(stream.get("sample_rate") or 0),
+                "channels": int(stream.get("channels") or 0),
+                "duration": float(stream.get("duration") or info["duration"]),
+            }
+    return info
+
+
+def probe_media(path: Path, cache_dir: Optional[Path] = None, keyframes: bool = False) -> dict:
+    """Probe a media file once and cache the result as JSON next to it (or in cache_dir).
+
+    Returns ``{"duration", "format", "video": {...} | None, "audio": {...} | None}`` and,
+    with keyframes=True, ``"keyframes": [pts seconds]`` read from packet flags without
+    decoding. The cache is keyed on file size and mtime, so a rewritten file is re-probed.
+    """
+    stat = path.stat()
+    source = {"size": stat.st_size, "mtime": stat.st_mtime}
+    cache = (cache_dir or path.parent) / f".probe_{path.name}.json"
+    info: Optional[dict] = None
+    if cache.exists():
+        try:
+            cached = json.loads(cache.read_text(encoding="utf-8"))
+            if cached.get("source") == source:
+                info = cached
+        except ValueError:
+            info = None
+    dirty = False
+    if info is None:
+        info = _parse(_ffprobe_json(["-show_streams", "-show_format", str(path)]))
+        info["source"] = source
+        dirty = True
+    if keyframes and "keyframes" not in info:
+        data = _ffprobe_json(["-select_streams", "v:0", "-show_entries", "packet=pts_time,flags", str(path)])
+        info["keyframes"] = sorted(
+            float(p["pts_time"])
+            for p in data.get("packets") or []
+            if "K" in (p.get("flags") or "") and p.get("pts_time") not in (None, "N/A")
+        )
+        dirty = True
+    if dirty:
+        try:
+            cache.write_text(json.dumps(info), encoding="utf-8")
+        except OSError as exc:
+            logger.info("probe cache not written for %s: %s", path, exc)
+    return info
+
+
+def is_wav_16k_mono(info: dict) -> bool:
+    audio = info.get("audio") or {}
+    return (
+        info.get("video") is None
+        and audio.get("codec") == "pcm_s16le"
+        and audio.get("sample_rate") == 16000
+        and audio.get("channels") == 1
+    )
+
+
+def mux_codecs(video_info: dict, audio_info: dict) -> tuple:
+    """Pick (video_codec, audio_codec) for an MP4 mux: stream copy when the codec fits, else transcode."""
+    vcodec = (video_info.get("video") or {}).get("codec")
+    acodec = (audio_info.get("audio") or {}).get("codec")
+    return (
+        "copy" if vcodec in MP4_VIDEO_COPY_CODECS else "libx264",
+        "copy" if acodec in MP4_AUDIO_COPY_CODECS else "aac",
+    )
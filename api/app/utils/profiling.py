@@ -0,0 +1,113 @@
+import cProfile
+import io
+import pstats
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from app.utils.logging import get_logger
+
+
+logger = get_logger(__name__)
+
+# ru_maxrss is KiB on Linux, bytes on macOS
+_MAXRSS_TO_MB = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+
+
+def _proc_io() -> Dict[str, int]:
+    """Storage bytes read/written by this process, including reaped children (Linux only)."""
+    try:
+        with open("/proc/self/io", encoding="ascii") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines() if ": " in line)
+        return {"read": int(fields.get("read_bytes", 0)), "write": int(fields.get("write_bytes", 0))}
+    except OSError:
+        return {}
+
+
+def _snapshot() -> dict:
+    return {
+        "wall": time.perf_counter(),
+        "self": resource.getrusage(resource.RUSAGE_SELF),
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN),
+        "io": _proc_io(),
+    }
+
+
+def _diff(before: dict, after: dict) -> dict:
+    s0, s1 = before["self"], after["self"]
+    c0, c1 = before["children"], after["children"]
+    stats = {
+        "wall_sec": round(after["wall"] - before["wall"], 3),
+        "cpu_sec": round((s1.ru_utime - s0.ru_utime) + (s1.ru_stime - s0.ru_stime), 3),
+        # ru_maxrss is a high-water mark for the worker process, not per stage
+        "peak_rss_mb": round(s1.ru_maxrss * _MAXRSS_TO_MB, 1),
+        "children": {
+            "cpu_sec": round((c1.ru_utime - c0.ru_utime) + (c1.ru_stime - c0.ru_stime), 3),
+            # largest RSS of any reaped child (ffmpeg, yt-dlp, inference.py) so far
+            "peak_rss_mb": round(c1.ru_maxrss * _MAXRSS_TO_MB, 1),
+            "read_bytes": (c1.ru_inblock - c0.ru_inblock) * 512,
+            "write_bytes": (c1.ru_oublock - c0.ru_oublock) * 512,
+        },
+    }
+    if before["io"] and after["io"]:
+        stats["read_bytes"] = after["io"]["read"] - before["io"]["read"]
+        stats["write_bytes"] = after["io"]["write"] - before["io"]["write"]
+    return stats
+
+
+class JobProfiler:
+    """Record wall time, CPU, peak RSS, child-process usage and I/O per pipeline stage.
+
+    Stages run back to back: ``start(name)`` closes the current stage and opens the
+    next one, ``finish()`` closes the last. Each closed stage is passed to ``sink``
+    (e.g. stored with the job state). With ``cprofile_path`` set, the whole run is
+    also captured with cProfile and written there (plus a text summary) on finish.
+    """
+
+    def __init__(
+        self,
+        sink: Optional[Callable[[str, dict], None]] = None,
+        cprofile_path: Optional[Path] = None,
+    ) -> None:
+        self.sink = sink
+        self.stages: Dict[str, dict] = {}
+        self._current: Optional[str] = None
+        self._before: Optional[dict] = None
+        self._cprofile_path = cprofile_path
+        self._cprofile: Optional[cProfile.Profile] = None
+        if cprofile_path:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def start(self, name: str) -> None:
+        self._close()
+        self._current = name
+        self._before = _snapshot()
+
+    def _close(self, status: str = "ok") -> None:
+        if self._current is None or self._before is None:
+            return
+        stats = _diff(self._before, _snapshot())
+        stats["status"] = status
+        self.stages[self._current] = stats
+        if self.sink:
+            try:
+                self.sink(self._current, stats)
+            except Exception:  # noqa: BLE001 - profiling must never fail the job
+                logger.exception("profile sink failed")
+        self._current = None
+        self._before = None
+
+    def finish(self, status: str = "ok") -> Dict[str, dict]:
+        self._close(status)
+        if self._cprofile is not None and self._cprofile_path is not None:
+            self._cprofile.disable()
+            self._cprofile_path.parent.mkdir(parents=True, exist_ok=True)
+            self._cprofile.dump_stats(str(self._cprofile_path))
+            summary = io.StringIO()
+            pstats.Stats(self._cprofile, stream=summary).sort_stats("cumulative").print_stats(40)
+            self._cprofile_path.with_suffix(".txt").write_text(summary.getvalue(), encoding="utf-8")
+            self._cprofile = None
+        return self.stages
@@ -1,13 +1,17 @@
 import json
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import redis
+import redis.asyncio as aioredis
 
 from app.config import settings
+from app.utils.admission import token_bucket
 
 
 _redis = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+# Used by the API's async handlers (long-poll, SSE) so waiters never park a threadpool thread
+_aredis = aioredis.Redis.from_url(settings.redis_url, decode_responses=True)
 
 
 def _job_key(job_id: str) -> str:
@@ -22,6 +26,26 @@ def _job_events_channel(job_id: str) -> str:
     return f"job:{job_id}:events"
 
 
+def _job_profile_key(job_id: str) -> str:
+    return f"job:{job_id}:profile"
+
+
+def _sync_generation_key(generation_id: str) -> str:
+    return f"sync:{generation_id}"
+
+
+def _api_quota_key(api_key: str) -> str:
+    return f"quota:{api_key}"
+
+
+# Admitted, unfinished jobs -> estimated worker seconds; and the subset a worker is running now
+_BACKLOG_KEY = "jobs:backlog"
+_RUNNING_KEY = "jobs:running"
+# Unfinished job -> time of its admission or last status change; admission_snapshot reaps the silent ones
+_ACTIVE_KEY = "jobs:active"
+TERMINAL_STATUSES = ("DONE", "FAILED", "CANCELLED")
+
+
 def init_job(job_id: str, youtube_url: str) -> None:
     _redis.hset(
         _job_key(job_id),
@@ -32,9 +56,12 @@ def init_job(job_id: str, youtube_url: str) -> None:
             "error": "",
             "youtube_url": youtube_url,
             "started_at": int(time.time()),
+            # version bumps on every change (ETag); log_seq counts all lines ever appended (log cursor)
+            "version": 0,
+            "log_seq": 0,
         },
     )
-    _redis.delete(_job_logs_key(job_id))
+    _redis.delete(_job_logs_key(job_id), _job_profile_key(job_id))
 
 
 def set_status(job_id: str, status: str, progress: Optional[int] = None, error: str = "") -> None:
@@ -43,19 +70,178 @@ def set_status(job_id: str, status: str, progress: Optional[int] = None, error:
         mapping["progress"] = max(0, min(progress, 100))
     if error:
         mapping["error"] = error
-    _redis.hset(_job_key(job_id), mapping=mapping)
+    pipe = _redis.pipeline()
+    pipe.hset(_job_key(job_id), mapping=mapping)
+    pipe.hincrby(_job_key(job_id), "version", 1)
+    if status == "RUNNING":
+        pipe.sadd(_RUNNING_KEY, job_id)
+    else:
+        pipe.srem(_RUNNING_KEY, job_id)
+    if status in TERMINAL_STATUSES:
+        pipe.hdel(_BACKLOG_KEY, job_id)
+        pipe.zrem(_ACTIVE_KEY, job_id)
+    else:
+        pipe.zadd(_ACTIVE_KEY, {job_id: time.time()})
+    pipe.execute()
     publish_event(job_id, {"type": "status", **mapping})
 
 
+def request_cancel(job_id: str) -> None:
+    """Flag a job for cancellation; workers poll is_cancel_requested between and during stages."""
+    pipe = _redis.pipeline()
+    pipe.hset(_job_key(job_id), mapping={"cancel_requested": 1})
+    pipe.hincrby(_job_key(job_id), "version", 1)
+    pipe.execute()
+    publish_event(job_id, {"type": "cancel_requested"})
+
+
+def is_cancel_requested(job_id: str) -> bool:
+    return _redis.hget(_job_key(job_id), "cancel_requested") == "1"
+
+
+def progress_reporter(job_id: str, start: int, end: int, min_interval: float = 1.0) -> Callable[[float], None]:
+    """Return an on_progress callback mapping a stage's 0..1 fraction onto [start, end] job progress.
+
+    Updates are throttled to one per ``min_interval`` seconds and only ever move
+    forward, so chatty ffmpeg/yt-dlp output does not flood Redis or the event stream.
+    """
+    last = {"value": start, "at": 0.0}
+
+    def report(fraction: float) -> None:
+        value = int(start + (end - start) * max(0.0, min(fraction, 1.0)))
+        now = time.monotonic()
+        if value <= last["value"] or now - last["at"] < min_interval:
+            return
+        last.update(value=value, at=now)
+        set_status(job_id, "RUNNING", progress=value)
+
+    return report
+
+
 def set_result(job_id: str, result_url: str) -> None:
-    _redis.hset(_job_key(job_id), mapping={"result_url": result_url})
+    pipe = _redis.pipeline()
+    pipe.hset(_job_key(job_id), mapping={"result_url": result_url})
+    pipe.hincrby(_job_key(job_id), "version", 1)
+    pipe.execute()
     publish_event(job_id, {"type": "result", "result_url": result_url})
 
 
+def set_draft_result(job_id: str, draft_url: str) -> None:
+    pipe = _redis.pipeline()
+    pipe.hset(_job_key(job_id), mapping={"draft_url": draft_url})
+    pipe.hincrby(_job_key(job_id), "version", 1)
+    pipe.execute()
+    publish_event(job_id, {"type": "draft", "draft_url": draft_url})
+
+
+def set_preview_subtitles(job_id: str, url: str) -> None:
+    pipe = _redis.pipeline()
+    pipe.hset(_job_key(job_id), mapping={"preview_subtitles_url": url})
+    pipe.hincrby(_job_key(job_id), "version", 1)
+    pipe.execute()
+    publish_event(job_id, {"type": "preview_subtitles", "url": url})
+
+
+def publish_subtitles(job_id: str, cues: List[Dict[str, Any]]) -> None:
+    """Push newly translated subtitle cues ({start, end, text}) to live listeners."""
+    if cues:
+        publish_event(job_id, {"type": "subtitles", "cues": cues})
+
+
 def append_log(job_id: str, message: str) -> None:
-    _redis.rpush(_job_logs_key(job_id), message)
-    _redis.ltrim(_job_logs_key(job_id), -500, -1)
-    publish_event(job_id, {"type": "log", "message": message})
+    pipe = _redis.pipeline()
+    pipe.rpush(_job_logs_key(job_id), message)
+    pipe.ltrim(_job_logs_key(job_id), -500, -1)
+    pipe.hincrby(_job_key(job_id), "log_seq", 1)
+    pipe.hincrby(_job_key(job_id), "version", 1)
+    _, _, seq, _ = pipe.execute()
+    publish_event(job_id, {"type": "log", "message": message, "seq": seq})
+
+
+def register_sync_generation(job_id: str, generation_id: str, ttl_sec: int) -> None:
+    """Remember which job is waiting on a Sync API generation until the webhook or poller claims it."""
+    _redis.set(_sync_generation_key(generation_id), job_id, ex=ttl_sec)
+    _redis.hset(_job_key(job_id), mapping={"sync_generation_id": generation_id})
+
+
+def sync_generation_pending(generation_id: str) -> bool:
+    return bool(_redis.exists(_sync_generation_key(generation_id)))
+
+
+def claim_sync_generation(generation_id: str) -> Optional[str]:
+    """Atomically take ownership of a finished generation.
+
+    Returns the job id for the first caller only, so a webhook delivery and a poll
+    observing the same completion never finalize the job twice.
+    """
+    return _redis.getdel(_sync_generation_key(generation_id))
+
+
+def register_admitted_job(job_id: str, estimated_sec: float) -> None:
+    pipe = _redis.pipeline()
+    pipe.hset(_BACKLOG_KEY, job_id, round(estimated_sec, 1))
+    pipe.zadd(_ACTIVE_KEY, {job_id: time.time()})
+    pipe.execute()
+
+
+def admission_snapshot(queue_keys: List[str], stale_sec: Optional[float] = None) -> Tuple[int, int, float]:
+    """(broker queue depth over all priority lists, running jobs, estimated backlog seconds) in one round trip.
+
+    Jobs with no status change for ``stale_sec`` (worker killed, message lost, revoked
+    before it started) never reach a terminal status; they are dropped from the backlog
+    and running set here, so a dead job cannot hold admission shut.
+    """
+    stale_sec = settings.admission_stale_sec if stale_sec is None else stale_sec
+    pipe = _redis.pipeline(transaction=False)
+    for key in queue_keys:
+        pipe.llen(key)
+    pipe.smembers(_RUNNING_KEY)
+    pipe.hgetall(_BACKLOG_KEY)
+    pipe.zrangebyscore(_ACTIVE_KEY, "-inf", time.time() - stale_sec if stale_sec > 0 else "-inf")
+    *depths, running, estimates, stale = pipe.execute()
+    stale = set(stale)
+    if stale:
+        pipe = _redis.pipeline(transaction=False)
+        pipe.hdel(_BACKLOG_KEY, *stale)
+        pipe.srem(_RUNNING_KEY, *stale)
+        pipe.zrem(_ACTIVE_KEY, *stale)
+        pipe.execute()
+    backlog = sum(float(v) for job_id, v in estimates.items() if job_id not in stale)
+    return sum(int(d) for d in depths), len(set(running) - stale), backlog
+
+
+def take_api_token(api_key: str, rate_per_sec: float, burst: float) -> float:
+    """Consume one token from the API key's bucket; returns 0 when allowed, else seconds to wait.
+
+    Read-modify-write runs under WATCH, so concurrent API workers never double-spend a token.
+    """
+    key = _api_quota_key(api_key)
+    ttl = max(60, int(burst / rate_per_sec) * 2) if rate_per_sec > 0 else 3600
+
+    def _take(pipe) -> float:
+        tokens, updated_at = pipe.hmget(key, "tokens", "ts")
+        now = time.time()
+        allowed, left, retry_after = token_bucket(
+            float(tokens) if tokens is not None else None,
+            float(updated_at) if updated_at is not None else None,
+            now,
+            rate_per_sec,
+            burst,
+        )
+        pipe.multi()
+        pipe.hset(key, mapping={"tokens": left, "ts": now})
+        pipe.expire(key, ttl)
+        return 0.0 if allowed else retry_after
+
+    return _redis.transaction(_take, key, value_from_callable=True)
+
+
+def save_profile_stage(job_id: str, stage: str, stats: Dict[str, Any]) -> None:
+    _redis.hset(_job_profile_key(job_id), stage, json.dumps(stats))
+
+
+def get_profile(job_id: str) -> Dict[str, Any]:
+    return {stage: json.loads(raw) for stage, raw in _redis.hgetall(_job_profile_key(job_id)).items()}
 
 
 def get_state(job_id: str) -> Dict[str, Any]:
@@ -68,9 +254,63 @@ def get_logs(job_id: str, limit: int = 200) -> List[str]:
     return _redis.lrange(_job_logs_key(job_id), -limit, -1)
 
 
+def get_logs_since(job_id: str, since: int = 0, limit: int = 200) -> Tuple[List[str], int]:
+    """Return (lines appended after cursor ``since``, new cursor).
+
+    The cursor is the absolute number of lines ever appended, so it stays valid
+    while the stored list is trimmed. Both reads happen in one MULTI round trip.
+    """
+    pipe = _redis.pipeline(transaction=True)
+    pipe.hget(_job_key(job_id), "log_seq")
+    pipe.lrange(_job_logs_key(job_id), -limit, -1)
+    seq, lines = pipe.execute()
+    total = int(seq or len(lines))
+    new_count = max(0, total - since)
+    return (lines[-new_count:] if new_count else []), total
+
+
+def get_version(job_id: str) -> Optional[int]:
+    version = _redis.hget(_job_key(job_id), "version")
+    return int(version) if version is not None else None
+
+
+async def wait_for_change(job_id: str, version: int, timeout: float) -> Optional[int]:
+    """Wait until the job's version differs from ``version`` or ``timeout`` elapses.
+
+    Runs on the event loop with the asyncio client, so a long-poll costs a socket and
+    no thread. Subscribes before re-reading the version so a change between the two
+    cannot be missed. Returns the current version.
+    """
+    if timeout <= 0:
+        return await _aget_version(job_id)
+    pubsub = _aredis.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(_job_events_channel(job_id))
+    try:
+        deadline = time.monotonic() + timeout
+        current = await _aget_version(job_id)
+        while current == version:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await pubsub.get_message(timeout=remaining)
+            current = await _aget_version(job_id)
+        return current
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+
+
+async def _aget_version(job_id: str) -> Optional[int]:
+    version = await _aredis.hget(_job_key(job_id), "version")
+    return int(version) if version is not None else None
+
+
 def publish_event(job_id: str, event: Dict[str, Any]) -> None:
     _redis.publish(_job_events_channel(job_id), json.dumps(event, ensure_ascii=False))
 
 
-def get_pubsub():
-    return _redis.pubsub()
+async def subscribe_job_events(job_id: str):
+    """Async pubsub subscribed to the job's event channel, for the API's SSE stream."""
+    pubsub = _aredis.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(_job_events_channel(job_id))
+    return pubsub
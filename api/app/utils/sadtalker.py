@@ -1,45 +1,23 @@
 import sys
-import shutil
-import subprocess
 from pathlib import Path
 from typing import Optional
 
 from app.config import settings
 from app.utils.logging import get_logger
-from app.utils.media import run_cmd
+from app.utils.media import CommandCancelled, CommandError, run_cmd
+from app.utils.storage import atomic_output, place_file
 
 
 logger = get_logger(__name__)
 
 
-def ensure_wav_16k_mono(input_audio: Path, out_wav: Path) -> Path:
-    """Convert any audio to 16kHz mono WAV for SadTalker.
-
-    Always re-encode to avoid codec surprises.
-    """
-    out_wav.parent.mkdir(parents=True, exist_ok=True)
-    cmd = [
-        "ffmpeg",
-        "-y",
-        "-i",
-        str(input_audio),
-        "-ar",
-        "16000",
-        "-ac",
-        "1",
-        str(out_wav),
-    ]
-    run_cmd(cmd, timeout=60 * 5)
-    return out_wav
-
-
 def _find_latest_mp4(dir_path: Path) -> Optional[Path]:
     candidates = sorted(dir_path.glob("*.mp4"), key=lambda p: p.stat().st_mtime, reverse=True)
     return candidates[0] if candidates else None
 
 
 def run_sadtalker(source_image: Path, audio_wav_16k: Path, out_video: Path, preprocess: str = "full", still: bool = True, size: int = 256) -> None:
-    """Run SadTalker inference.py as a subprocess and copy the resulting mp4 to out_video.
+    """Run SadTalker inference.py as a subprocess and move the resulting mp4 to out_video.
 
     Requirements:
     - settings.sadtalker_repo must point to the SadTalker repo root (contains inference.py)
@@ -79,27 +57,26 @@ def run_sadtalker(source_image: Path, audio_wav_16k: Path, out_video: Path, prep
         cmd.append("--still")
 
     logger.info("Running SadTalker: %s", " ".join(cmd))
-    # Use raw subprocess here to control CWD for relative paths used inside the repo
-    completed = subprocess.run(cmd, cwd=str(repo), capture_output=True, text=True)
-    if completed.stdout:
-        logger.info("SadTalker stdout: %s", completed.stdout[:2000])
-    if completed.stderr:
-        logger.info("SadTalker stderr: %s", completed.stderr[:2000])
-    if completed.returncode != 0:
-        raise RuntimeError(f"SadTalker failed with code {completed.returncode}: {completed.stderr}")
+    # Run from the repo root: inference.py resolves relative paths from its CWD
+    try:
+        run_cmd(cmd, cwd=repo)
+    except CommandCancelled:
+        raise
+    except CommandError as exc:
+        raise RuntimeError(f"SadTalker failed: {exc}") from exc
 
     produced = _find_latest_mp4(result_dir)
     if not produced or not produced.exists():
         raise RuntimeError("SadTalker did not produce an MP4 output in result dir")
 
-    out_video.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copy2(produced, out_video)
+    # The SadTalker result dir is scratch; take the file instead of copying it
+    place_file(produced, out_video, move=True)
 
 
 def add_subtitles_soft(input_video: Path, subs_path: Path, out_video: Path) -> None:
     """Add SRT subtitles as a soft track (mov_text) without re-encoding video/audio."""
     if not subs_path.exists() or subs_path.stat().st_size == 0:
-        shutil.copy2(input_video, out_video)
+        place_file(input_video, out_video)
         return
     cmd = [
         "ffmpeg",
@@ -118,8 +95,8 @@ def add_subtitles_soft(input_video: Path, subs_path: Path, out_video: Path) -> N
         "copy",
         "-c:s",
         "mov_text",
-        str(out_video),
     ]
-    run_cmd(cmd, timeout=60 * 10)
+    with atomic_output(out_video) as tmp:
+        run_cmd(cmd + [str(tmp)], timeout=60 * 10)
 
 
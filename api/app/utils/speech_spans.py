@@ -0,0 +1,137 @@
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.utils.logging import get_logger
+from app.utils.media import (
+    concat_videos,
+    cut_audio,
+    cut_video,
+    encode_video_like,
+    keyframe_times,
+    probe_duration,
+    probe_video_stream,
+)
+
+
+logger = get_logger(__name__)
+
+# (start, end, is_speech) in seconds; a plan covers the whole timeline without gaps
+Span = Tuple[float, float, bool]
+
+
+def speech_spans(segments: Iterable[dict], duration: float, pad: float = 0.2, min_gap: float = 1.0) -> List[Tuple[float, float]]:
+    """Merge STT segments into padded speech spans, joining pauses shorter than min_gap."""
+    spans: List[Tuple[float, float]] = []
+    for seg in sorted(segments, key=lambda s: float(s.get("start", 0.0))):
+        start = max(0.0, float(seg.get("start", 0.0)) - pad)
+        end = min(duration, float(seg.get("end", 0.0)) + pad)
+        if end <= start:
+            continue
+        if spans and start - spans[-1][1] < min_gap:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def plan_spans(
+    segments: Iterable[dict],
+    duration: float,
+    keyframes: Optional[List[float]] = None,
+    pad: float = 0.2,
+    min_gap: float = 1.0,
+) -> List[Span]:
+    """Split [0, duration) into alternating speech / non-speech spans.
+
+    When keyframes are given, speech spans are widened outward to the surrounding
+    keyframes so every non-speech span starts on a keyframe and can be stream-copied
+    with a frame-accurate cut.
+    """
+    spans = speech_spans(segments, duration, pad=pad, min_gap=min_gap)
+    if keyframes:
+        snapped: List[Tuple[float, float]] = []
+        for start, end in spans:
+            start = max([k for k in keyframes if k <= start] or [0.0])
+            end = min([k for k in keyframes if k >= end] or [duration])
+            if snapped and start - snapped[-1][1] < min_gap:
+                snapped[-1] = (snapped[-1][0], max(snapped[-1][1], end))
+            else:
+                snapped.append((start, end))
+        spans = snapped
+
+    plan: List[Span] = []
+    cursor = 0.0
+    for start, end in spans:
+        if start - cursor > 1e-3:
+            plan.append((cursor, start, False))
+        plan.append((start, end, True))
+        cursor = end
+    if duration - cursor > 1e-3:
+        plan.append((cursor, duration, False))
+    return plan
+
+
+def render_speech_only(
+    face: Path,
+    audio: Path,
+    segments: List[dict],
+    out_video: Path,
+    render: Callable[[Path, Path, Path], None],
+    work_dir: Path,
+    still_image: bool = False,
+) -> None:
+    """Run ``render(face_part, audio_part, out_part)`` only on speech spans and splice the result.
+
+    ``audio`` must share the face video's timeline (the segment-timed dub track), since
+    each span's audio is cut at the source timestamps. For an H.264 source, speech spans
+    are widened to the surrounding keyframes and non-speech spans are stream-copied as
+    MPEG-TS parts (their SPS/PPS travel in-band, so they concatenate with the libx264
+    speech parts); only the lip-synced spans are re-encoded. Other codecs, and the still
+    image for SadTalker, get a cheap encode of the non-speech spans instead. The output
+    is video-only with the audio's timeline, so callers mux the full TTS track over it.
+    """
+    work_dir.mkdir(parents=True, exist_ok=True)
+    encode = probe_video_stream(face)
+    if still_image:
+        duration = probe_duration(audio)
+        encode.update(fps=25.0, pix_fmt="yuv420p")
+    else:
+        duration = probe_duration(face)
+    copy = not still_image and encode.get("codec") == "h264"
+    if not still_image and not copy:
+        logger.info("Speech-only lip-sync: %s input is re-encoded, not stream-copied", encode.get("codec"))
+    # libx264 with 4:2:0 chroma needs even dimensions
+    for dim in ("width", "height"):
+        encode[dim] = encode.get(dim, 0) - encode.get(dim, 0) % 2
+
+    plan = plan_spans(
+        segments,
+        duration,
+        keyframe_times(face) if copy else None,
+        pad=settings.speech_pad_sec,
+        min_gap=settings.speech_min_gap_sec,
+    )
+    speech_total = sum(end - start for start, end, is_speech in plan if is_speech)
+    logger.info("Speech-only plan: %d spans, %.1fs of %.1fs rendered", len(plan), speech_total, duration)
+
+    parts: List[Path] = []
+    for i, (start, end, is_speech) in enumerate(plan):
+        part = work_dir / f"part_{i:04d}.ts"
+        if not is_speech:
+            if still_image:
+                encode_video_like(face, end - start, encode, part, loop_image=True)
+            else:
+                cut_video(face, start, end, part, copy=copy, encode=encode)
+        else:
+            face_part = face if still_image else work_dir / f"face_{i:04d}.mp4"
+            if not still_image:
+                cut_video(face, start, end, face_part, copy=False, encode=encode)
+            audio_part = work_dir / f"audio_{i:04d}.wav"
+            cut_audio(audio, start, end, audio_part)
+            rendered = work_dir / f"rendered_{i:04d}.mp4"
+            render(face_part, audio_part, rendered)
+            encode_video_like(rendered, end - start, encode, part)
+        parts.append(part)
+
+    concat_videos(parts, out_video)
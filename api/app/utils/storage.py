@@ -1,12 +1,16 @@
 import os
+import shutil
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Tuple
+from typing import Iterator, Optional, Tuple
 
 from app.config import settings
 
 
 def ensure_job_dirs(job_id: str) -> Tuple[Path, Path]:
-    base = Path(settings.base_data_dir)
+    # Node-local scratch; artifacts are published from here through app.utils.object_store
+    base = Path(settings.scratch_dir)
     work = base / "work" / job_id
     results = base / "results" / job_id
     work.mkdir(parents=True, exist_ok=True)
@@ -23,7 +27,127 @@ def job_paths(job_id: str) -> dict:
         "audio": work / "input_audio.wav",
         "subs": work / "subtitles_ko.srt",
         "ko_text": work / "korean_text.txt",
-        "tts_audio": work / "korean_audio.mp3",
+        "tts_audio": work / "korean_audio.m4a",
+        "tts_wav16k": work / "korean_audio_16k.wav",
         "out_video": results / "translated_video.mp4",
         "log": work / "job.log",
     }
+
+
+def remove_job_dirs(job_id: str) -> None:
+    """Drop a job's scratch directories (after its artifacts were published elsewhere)."""
+    base = Path(settings.scratch_dir)
+    for sub in ("work", "results"):
+        shutil.rmtree(base / sub / job_id, ignore_errors=True)
+
+
+# ioctl(FICLONE): copy-on-write clone of a whole file (btrfs, XFS with reflink, overlayfs on those)
+_FICLONE = 0x40049409
+
+
+def _temp_sibling(dst: Path) -> Path:
+    # Keep the real suffix last so tools like ffmpeg still pick the right muxer
+    return dst.with_name(f".{dst.stem}.{uuid.uuid4().hex[:8]}.tmp{dst.suffix}")
+
+
+@contextmanager
+def atomic_output(dst: Path) -> Iterator[Path]:
+    """Yield a temp path next to dst and rename it over dst only if the block succeeds.
+
+    Readers never see a half-written file, and an existing dst (possibly hard-linked
+    elsewhere) is replaced by a new inode instead of being truncated in place.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _temp_sibling(dst)
+    try:
+        yield tmp
+        os.replace(tmp, dst)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    try:
+        import fcntl
+
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return True
+    except (ImportError, OSError):
+        if dst.exists():
+            dst.unlink()
+        return False
+
+
+def place_file(src: Path, dst: Path, move: bool = False) -> str:
+    """Make src's content appear at dst atomically, avoiding a byte copy whenever possible.
+
+    move=True renames (src is consumed). Otherwise dst becomes a hard link, or a
+    reflink clone, and only as a last resort a full copy. Writers in this codebase go
+    through atomic_output, so a shared inode is never rewritten in place. Returns the
+    method used: "same", "move", "hardlink", "reflink" or "copy".
+    """
+    if dst.exists() and os.path.samefile(src, dst):
+        return "same"
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if move:
+        try:
+            os.replace(src, dst)
+            return "move"
+        except OSError:
+            pass  # cross-device: fall through to link/clone/copy, then drop src
+    tmp = _temp_sibling(dst)
+    try:
+        try:
+            os.link(src, tmp)
+            method = "hardlink"
+        except OSError:
+            if _reflink(src, tmp):
+                method = "reflink"
+            else:
+                shutil.copyfile(src, tmp)
+                method = "copy"
+        os.replace(tmp, dst)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    if move:
+        src.unlink()
+    return method
+
+
+def download_file(url: str, out_path: Path, chunk_size: int = 1024 * 1024, max_attempts: int = 5, timeout: int = 120) -> Path:
+    """Stream a remote file to out_path with large buffered writes and HTTP Range resume.
+
+    Data is written to ``<out_path>.part`` and renamed once complete, so a partially
+    downloaded file never appears under the final name. When the connection drops,
+    the next attempt resumes from the bytes already on disk if the server honors
+    ``Range`` (206); otherwise the partial file is discarded and restarted.
+    """
+    import requests
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    part = out_path.with_name(out_path.name + ".part")
+    last_error: Optional[Exception] = None
+    for _ in range(max_attempts):
+        offset = part.stat().st_size if part.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with requests.get(url, headers=headers, stream=True, timeout=timeout) as r:
+                if r.status_code == 416:
+                    # Requested range past the end: the part file already holds everything
+                    break
+                r.raise_for_status()
+                mode = "ab" if offset and r.status_code == 206 else "wb"
+                with open(part, mode, buffering=chunk_size) as f:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk)
+            break
+        except requests.RequestException as exc:
+            last_error = exc
+    else:
+        raise RuntimeError(f"Download failed after {max_attempts} attempts: {url} -> {last_error}")
+    os.replace(part, out_path)
+    return out_path
@@ -0,0 +1,162 @@
+"""Speech-to-text with Whisper / WhisperX.
+
+whisper, whisperx and torch are imported inside the functions so that importing
+this module stays cheap; loaded models are cached per worker process.
+"""
+import wave
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.config import settings
+
+
+_models: Dict[str, Any] = {}
+
+
+def _noop(_: str) -> None:
+    pass
+
+
+def load_whisper_model(model_name: str, log: Callable[[str], None] = _noop) -> Any:
+    """Load (once per process) a Whisper model, trying CUDA first and falling back to CPU."""
+    if model_name in _models:
+        return _models[model_name]
+    import whisper  # type: ignore
+
+    try:
+        import torch  # type: ignore
+
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        if device == "cuda":
+            name = torch.cuda.get_device_name(0)
+            cc = torch.cuda.get_device_capability(0)
+            log(f"Whisper device=cuda ({name}, capability={cc})")
+        else:
+            log("Whisper device=cpu")
+        model = whisper.load_model(model_name, device=device)
+    except Exception as e:  # noqa: BLE001
+        log(f"Whisper CUDA load failed, falling back to CPU: {e}")
+        model = whisper.load_model(model_name, device="cpu")
+    _models[model_name] = model
+    return model
+
+
+def _transcribe_whisperx(audio: Path, model_name: str, task: str, language: Optional[str], log: Callable[[str], None]) -> dict:
+    import torch  # type: ignore
+    import whisperx  # type: ignore
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    num_devices = torch.cuda.device_count() if device == "cuda" else 0
+    if device == "cuda":
+        name = torch.cuda.get_device_name(0)
+        cc = torch.cuda.get_device_capability(0)
+        log(f"CUDA devices={num_devices}, name={name}, capability={cc}")
+    compute_type = "float16" if device == "cuda" else "int8"
+    log(f"WhisperX device={device} compute_type={compute_type}")
+    wx_model = whisperx.load_model(model_name, device, compute_type=compute_type)
+    result = wx_model.transcribe(str(audio), batch_size=16, language=language, task=task)
+    segments = result.get("segments") or []
+    detected = result.get("language") or language
+    try:
+        align_model, metadata = whisperx.load_align_model(language_code=language or detected, device=device)
+        aligned = whisperx.align(segments, align_model, metadata, str(audio), device=device)
+        segments = aligned.get("segments") or segments
+        log("WhisperX alignment applied")
+    except Exception as e:  # noqa: BLE001
+        log(f"WhisperX alignment skipped: {e}")
+    text = (result.get("text") or " ".join((s.get("text") or "").strip() for s in segments)).strip()
+    return {"text": text, "segments": segments, "language": detected}
+
+
+def transcribe(
+    audio: Path,
+    task: str = "translate",
+    language: Optional[str] = "ko",
+    model_name: Optional[str] = None,
+    log: Callable[[str], None] = _noop,
+) -> dict:
+    """Transcribe (task="transcribe") or translate-to-English (task="translate") an audio file.
+
+    ``language=None`` lets Whisper detect the source language. Uses WhisperX when
+    USE_WHISPERX=true and it is importable, otherwise openai-whisper. Returns
+    ``{"text", "segments", "language"}``.
+    """
+    model_name = model_name or settings.whisper_model
+    if settings.use_whisperx:
+        try:
+            return _transcribe_whisperx(audio, model_name, task, language, log)
+        except Exception as e:  # noqa: BLE001
+            log(f"WhisperX unavailable; fallback to Whisper on CPU: {e}")
+
+    model = load_whisper_model(model_name, log)
+    result = model.transcribe(str(audio), task=task, language=language)
+    return {
+        "text": (result.get("text") or "").strip(),
+        "segments": result.get("segments") or [],
+        "language": result.get("language") or language,
+    }
+
+
+def split_at_seam(segments: List[dict], cut_sec: float, span_sec: float, last: bool) -> Tuple[List[dict], float]:
+    """Keep a window's segments that start before ``cut_sec``; return (kept, where the next window starts).
+
+    Segments starting in the look-ahead past ``cut_sec`` are left to the next window,
+    which starts where the last kept segment ended, so a segment is never cut at a
+    window edge or emitted twice. Times are relative to the window.
+    """
+    kept = [seg for seg in segments if last or seg["start"] < cut_sec]
+    if last:
+        return kept, span_sec
+    resume = kept[-1]["end"] if kept else cut_sec
+    # Always move forward, even if Whisper reports a degenerate first segment
+    return kept, min(max(resume, 1.0), span_sec)
+
+
+def transcribe_windows(
+    wav_path: Path,
+    window_sec: float,
+    overlap_sec: Optional[float] = None,
+    language: Optional[str] = None,
+    model_name: Optional[str] = None,
+    log: Callable[[str], None] = _noop,
+) -> Iterator[dict]:
+    """Transcribe a 16 kHz mono WAV window by window, yielding each window's segments as soon as it is done.
+
+    Yields ``{"offset", "language", "segments"}`` with segment times relative to the
+    whole file. Each window is decoded with ``overlap_sec`` of look-ahead and cut at a
+    segment boundary (see split_at_seam), so windowed output has no split or
+    duplicated segments at the seams. The language detected in the first window is
+    kept for the rest, and the previous window's text is passed as the prompt so
+    wording stays consistent. Segments keep only start/end/text; only one window of
+    samples is in memory at a time.
+    """
+    import numpy as np
+
+    overlap_sec = settings.stt_window_overlap_sec if overlap_sec is None else overlap_sec
+    model = load_whisper_model(model_name or settings.whisper_model, log)
+    prompt: Optional[str] = None
+    with wave.open(str(wav_path), "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+            raise ValueError(f"Expected 16-bit mono WAV: {wav_path}")
+        rate, total = wf.getframerate(), wf.getnframes()
+        start = 0
+        while start < total:
+            frames = min(total - start, max(1, int((window_sec + overlap_sec) * rate)))
+            wf.setpos(start)
+            samples = np.frombuffer(wf.readframes(frames), dtype=np.int16).astype(np.float32) / 32768.0
+            result = model.transcribe(samples, task="transcribe", language=language, initial_prompt=prompt)
+            language = language or result.get("language")
+            segments = [
+                {"start": float(seg.get("start", 0.0)), "end": float(seg.get("end", 0.0)), "text": (seg.get("text") or "").strip()}
+                for seg in result.get("segments") or []
+                if (seg.get("text") or "").strip()
+            ]
+            last = start + frames >= total
+            kept, resume = split_at_seam(segments, window_sec, frames / rate, last)
+            offset = start / rate
+            for seg in kept:
+                seg["start"] += offset
+                seg["end"] += offset
+            prompt = " ".join(seg["text"] for seg in kept)[-200:] or prompt
+            yield {"offset": offset, "language": language, "segments": kept}
+            start = total if last else start + int(resume * rate)
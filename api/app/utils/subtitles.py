@@ -0,0 +1,45 @@
+from pathlib import Path
+from typing import Iterable, List, Sequence
+
+
+def format_srt_time(t: float) -> str:
+    hh = int(t // 3600)
+    mm = int((t % 3600) // 60)
+    ss = int(t % 60)
+    ms = int((t - int(t)) * 1000)
+    return f"{hh:02d}:{mm:02d}:{ss:02d},{ms:03d}"
+
+
+def srt_cue(index: int, start: float, end: float, text: str) -> str:
+    return f"{index}\n{format_srt_time(start)} --> {format_srt_time(end)}\n{text}\n"
+
+
+def build_srt(segments: Sequence[dict], texts: Iterable[str]) -> str:
+    """Render SRT from STT segments (for timing) and the matching subtitle texts."""
+    cues: List[str] = []
+    for i, (segment, text) in enumerate(zip(segments, texts), start=1):
+        cues.append(srt_cue(i, float(segment.get("start", 0.0)), float(segment.get("end", 0.0)), text.strip()))
+    return "\n".join(cues)
+
+
+def format_vtt_time(t: float) -> str:
+    return format_srt_time(t).replace(",", ".")
+
+
+def append_cues(srt_path: Path, vtt_path: Path, first_index: int, segments: Sequence[dict], texts: Sequence[str]) -> int:
+    """Append cues to a growing SRT and WebVTT pair; returns the next cue index.
+
+    Used for the live preview: each finished STT window is appended as it comes, so
+    only that window's cues are held in memory.
+    """
+    if not vtt_path.exists():
+        vtt_path.parent.mkdir(parents=True, exist_ok=True)
+        vtt_path.write_text("WEBVTT\n\n", encoding="utf-8")
+    index = first_index
+    with open(srt_path, "a", encoding="utf-8") as srt, open(vtt_path, "a", encoding="utf-8") as vtt:
+        for segment, text in zip(segments, texts):
+            start, end = float(segment.get("start", 0.0)), float(segment.get("end", 0.0))
+            srt.write(srt_cue(index, start, end, text.strip()) + "\n")
+            vtt.write(f"{format_vtt_time(start)} --> {format_vtt_time(end)}\n{text.strip()}\n\n")
+            index += 1
+    return index
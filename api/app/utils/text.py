@@ -1,98 +1,278 @@
 import os
+import random
 import re
-from typing import List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
 import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import settings
+from app.utils.logging import get_logger
 
 try:
     from deep_translator import GoogleTranslator  # type: ignore
+    from deep_translator.exceptions import RequestError, ServerException, TooManyRequests  # type: ignore
+
+    _TRANSLATOR_ERRORS: Tuple[type, ...] = (RequestError, ServerException, TooManyRequests)
 except Exception:  # pragma: no cover - optional at runtime
     GoogleTranslator = None  # type: ignore
+    _TRANSLATOR_ERRORS = ()
+
+logger = get_logger(__name__)
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_local = threading.local()
+
+
+class RetryableError(RuntimeError):
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TranslationError(RuntimeError):
+    """A translation request still failed after its retries."""
 
 
 def contains_hangul(text: str) -> bool:
     return bool(re.search(r"[\uAC00-\uD7A3]", text))
 
 
+def _http() -> requests.Session:
+    """Shared keep-alive session sized for the translation concurrency limit."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            size = max(1, settings.translate_concurrency)
+            adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than a server-provided Retry-After."""
+    delay = random.uniform(0, min(30.0, settings.translate_backoff_base_sec * (2 ** attempt)))
+    return max(delay, retry_after or 0.0)
+
+
+def _is_transient(exc: BaseException, retry_on: Tuple[type, ...] = ()) -> bool:
+    """RetryableError, HTTP 429/5xx, connection errors and timeouts, the translator's
+    request/throttling errors, and any ``retry_on`` types a provider adds."""
+    if isinstance(exc, requests.HTTPError):
+        return exc.response is not None and exc.response.status_code in RETRYABLE_STATUS
+    return isinstance(exc, (RetryableError, requests.ConnectionError, requests.Timeout) + _TRANSLATOR_ERRORS + retry_on)
+
+
+def _retry_budget_sec() -> float:
+    """Upper bound of the backoff sleeps one request may spend across all its retries."""
+    return sum(min(30.0, settings.translate_backoff_base_sec * (2 ** attempt)) for attempt in range(settings.translate_max_retries))
+
+
+def with_retries(
+    fn: Callable[[], T],
+    attempts: Optional[int] = None,
+    retry_on: Tuple[type, ...] = (),
+    deadline: Optional[float] = None,
+) -> T:
+    """Call fn, retrying transient failures (see _is_transient) with jittered backoff.
+
+    Anything else (a KeyError from a changed response shape, a 4xx) is raised at once.
+    With a ``deadline`` (time.monotonic()), no retry starts after it, so several calls
+    can share one retry budget.
+    """
+    attempts = attempts or settings.translate_max_retries + 1
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as exc:
+            if not _is_transient(exc, retry_on) or attempt == attempts - 1:
+                raise
+            delay = _backoff_delay(attempt, getattr(exc, "retry_after", None))
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def map_concurrently(fn: Callable[[T], R], items: Sequence[T], limit: Optional[int] = None) -> List[R]:
+    """Apply fn to every item under ``limit`` concurrent calls (default TRANSLATE_CONCURRENCY), keeping input order."""
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    workers = limit if limit is not None else settings.translate_concurrency
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(items)))) as pool:
+        return list(pool.map(fn, items))
+
+
+SYSTEM_PROMPT = (
+    "You are a professional Korean translator and editor. Translate the user's text into natural, fluent Korean, "
+    "preserving meaning, tone, and context. Use consistent terminology, readable sentence flow, and appropriate honorifics. "
+    "Do not add explanations. Output only the translated Korean text."
+)
+LINES_PROMPT = (
+    " The input is subtitle lines, one per line. Translate each line on its own line, "
+    "keeping exactly the same number of lines in the same order."
+)
+
+
+def _chunk_parts(parts: List[str], limit: int) -> List[str]:
+    """Greedily pack consecutive parts into chunks of at most ``limit`` characters."""
+    chunks: List[str] = []
+    buf: List[str] = []
+    size = 0
+    for part in parts:
+        part_len = len(part)
+        if size + part_len > limit and buf:
+            chunks.append("".join(buf))
+            buf, size = [part], part_len
+        else:
+            buf.append(part)
+            size += part_len
+    if buf:
+        chunks.append("".join(buf))
+    return chunks
+
+
+def _openai_key() -> Optional[str]:
+    provider = os.getenv("TRANSLATION_PROVIDER", "").lower()
+    api_key = os.getenv("OPENAI_API_KEY")
+    return api_key if provider == "openai" and api_key else None
+
+
+def _openai_translate(chunk: str, api_key: str, lines: bool = False, deadline: Optional[float] = None) -> str:
+    model = os.getenv("OPENAI_TRANSLATE_MODEL", "gpt-4o-mini")
+    url = "https://api.openai.com/v1/chat/completions"
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    payload = {
+        "model": model,
+        "temperature": 0.3,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT + (LINES_PROMPT if lines else "")},
+            {"role": "user", "content": chunk},
+        ],
+    }
+
+    def _call() -> str:
+        resp = _http().post(url, headers=headers, json=payload, timeout=60)
+        if resp.status_code in RETRYABLE_STATUS:
+            retry_after = resp.headers.get("Retry-After")
+            raise RetryableError(
+                f"OpenAI HTTP {resp.status_code}",
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        resp.raise_for_status()
+        data = resp.json()
+        return data["choices"][0]["message"]["content"].strip()
+
+    return with_retries(_call, deadline=deadline)
+
+
+def _google_translate(chunk: str, deadline: Optional[float] = None) -> str:
+    # deep_translator has no session hook; reuse one translator per worker thread
+    translator = getattr(_local, "google", None)
+    if translator is None:
+        translator = _local.google = GoogleTranslator(source="auto", target="ko")
+    return with_retries(lambda: translator.translate(chunk), deadline=deadline)
+
+
 def translate_to_korean_natural(text: str) -> str:
     """Translate any input to Korean using GoogleTranslator when available.
 
-    Falls back to original text if translator is unavailable or errors occur.
+    Chunks are translated concurrently with retries. A provider that still fails
+    falls back as a whole (OpenAI -> Google), so the output is never a mix of
+    translated and untranslated chunks; when no provider succeeds TranslationError
+    is raised rather than returning the source text.
     """
     if not text.strip():
         return text
     # 1) Prefer OpenAI if configured
-    provider = os.getenv("TRANSLATION_PROVIDER", "").lower()
-    api_key = os.getenv("OPENAI_API_KEY")
-    if provider == "openai" and api_key:
+    api_key = _openai_key()
+    if api_key:
         try:
-            model = os.getenv("OPENAI_TRANSLATE_MODEL", "gpt-4o-mini")
             # Chunk by ~6000 chars for OpenAI; conservative for safety
-            chunks: List[str] = []
-            buf = []
-            size = 0
-            for part in re.split(r"(\n{2,})", text):
-                part_len = len(part)
-                if size + part_len > 6000 and buf:
-                    chunks.append("".join(buf))
-                    buf, size = [part], part_len
-                else:
-                    buf.append(part)
-                    size += part_len
-            if buf:
-                chunks.append("".join(buf))
-
-            out: List[str] = []
-            url = "https://api.openai.com/v1/chat/completions"
-            headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-            system_prompt = (
-                "You are a professional Korean translator and editor. Translate the user's text into natural, fluent Korean, "
-                "preserving meaning, tone, and context. Use consistent terminology, readable sentence flow, and appropriate honorifics. "
-                "Do not add explanations. Output only the translated Korean text."
-            )
-            for ch in chunks:
-                payload = {
-                    "model": model,
-                    "temperature": 0.3,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": ch},
-                    ],
-                }
-                resp = requests.post(url, headers=headers, json=payload, timeout=60)
-                resp.raise_for_status()
-                data = resp.json()
-                out.append(data["choices"][0]["message"]["content"].strip())
-            return "\n\n".join(out)
-        except Exception:
-            # Soft-fallback to Google
-            pass
+            chunks = _chunk_parts(re.split(r"(\n{2,})", text), 6000)
+            return "\n\n".join(map_concurrently(lambda ch: _openai_translate(ch, api_key), chunks))
+        except Exception as exc:  # noqa: BLE001
+            if GoogleTranslator is None:
+                raise TranslationError(f"OpenAI translation failed after retries: {exc}") from exc
+            logger.warning("OpenAI translation failed after retries, falling back to Google: %s", exc)
 
     # 2) Fallback to GoogleTranslator (no key required)
     if GoogleTranslator is None:
+        logger.warning("No translation provider available (deep_translator missing, no OpenAI key); text stays untranslated")
         return text
     try:
         # Chunk by ~4000 chars to satisfy API limits
-        chunks: List[str] = []
-        buf = []
-        size = 0
-        for part in re.split(r"(\n{2,})", text):
-            part_len = len(part)
-            if size + part_len > 4000 and buf:
-                chunks.append("".join(buf))
-                buf, size = [part], part_len
-            else:
-                buf.append(part)
-                size += part_len
-        if buf:
-            chunks.append("".join(buf))
+        chunks = _chunk_parts(re.split(r"(\n{2,})", text), 4000)
+        return "".join(map_concurrently(_google_translate, chunks))
+    except Exception as exc:  # noqa: BLE001
+        logger.error("Google translation failed after retries: %s", exc)
+        raise TranslationError(f"Translation failed after retries: {exc}") from exc
 
-        translated: List[str] = []
-        translator = GoogleTranslator(source="auto", target="ko")
-        for ch in chunks:
-            translated.append(translator.translate(ch))
-        return "".join(translated)
-    except Exception:
-        return text
+
+def translate_segments_to_korean(texts: List[str]) -> Tuple[List[str], int]:
+    """Translate subtitle segments to Korean in one pass, one output line per input segment.
+
+    Segments are packed one per line into as few requests as the provider limits
+    allow, and chunks run concurrently. A chunk whose translation comes back with a
+    different line count, or fails transiently after its retries, is redone line by
+    line so segment alignment is never guessed; those lines share one request's retry
+    budget, so an outage fails fast. Any other error, or a line that still fails,
+    raises TranslationError so the job fails instead of shipping untranslated text.
+    Returns (texts, translation requests made).
+    """
+    lines = [" ".join(t.split()) for t in texts]
+    api_key = _openai_key()
+    if api_key:
+        translate, limit = (lambda ch, many, deadline=None: _openai_translate(ch, api_key, many, deadline)), 6000
+    elif GoogleTranslator is not None:
+        translate, limit = (lambda ch, many, deadline=None: _google_translate(ch, deadline)), 4000
+    else:
+        logger.warning("No translation provider available (deep_translator missing, no OpenAI key); segments stay untranslated")
+        return lines, 0
+
+    def _translate_chunk(chunk: str) -> Tuple[List[str], int]:
+        chunk_lines = chunk.rstrip("\n").split("\n")
+        made = 0
+        try:
+            translated = (translate(chunk.rstrip("\n"), True) or "").strip().split("\n")
+            made += 1
+        except Exception as exc:
+            if not isinstance(exc, TranslationError) and not _is_transient(exc):
+                raise
+            logger.warning("Chunk translation failed (%s); translating its %d lines one by one", exc, len(chunk_lines))
+            translated = []
+        if len(translated) != len(chunk_lines):
+            translated = []
+            deadline = time.monotonic() + _retry_budget_sec()
+            for line in chunk_lines:
+                translated.append((translate(line, False, deadline) or "").strip() if line.strip() else line)
+                made += 1
+        return [t.strip() for t in translated], made
+
+    chunks = _chunk_parts([line + "\n" for line in lines], limit)
+    try:
+        results = map_concurrently(_translate_chunk, chunks)
+    except Exception as exc:  # noqa: BLE001
+        logger.error("Segment translation failed after retries: %s", exc)
+        raise TranslationError(f"Segment translation failed after retries: {exc}") from exc
+    out: List[str] = []
+    requests_made = 0
+    for translated, made in results:
+        out.extend(translated)
+        requests_made += made
+    return out, requests_made
 
 
 def split_text_for_tts(text: str, max_chars: int = 250) -> List[str]:
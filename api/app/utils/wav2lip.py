@@ -1,62 +1,56 @@
+import contextvars
 import os
-import shutil
-import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
 
 import requests
 
 from app.config import settings
 from app.utils.logging import get_logger
-from app.utils.media import run_cmd
+from app.utils.media import (
+    CommandCancelled,
+    CommandError,
+    concat_videos,
+    cut_audio,
+    cut_video,
+    keyframe_times,
+    mux_video_audio,
+    probe_duration,
+    remux_to_ts,
+    run_cmd,
+)
+from app.utils.storage import download_file
 
 
 logger = get_logger(__name__)
 
+SYNC_TERMINAL_STATUSES = ("COMPLETED", "FAILED", "REJECTED", "CANCELED")
 
-def ensure_wav_16k_mono(input_audio: Path, out_wav: Path) -> Path:
-    out_wav.parent.mkdir(parents=True, exist_ok=True)
-    cmd = [
-        "ffmpeg",
-        "-y",
-        "-i",
-        str(input_audio),
-        "-ar",
-        "16000",
-        "-ac",
-        "1",
-        str(out_wav),
-    ]
-    run_cmd(cmd, timeout=60 * 5)
-    return out_wav
 
-
-def run_wav2lip_sync_api(face_video_or_image: Path, audio_wav_16k: Path, out_video: Path, timeout_sec: int = 60 * 20) -> None:
-    """Use Sync.so commercial Wav2Lip API to generate lipsynced video.
-
-    Requires SYNC_API_KEY in env. Downloads the resulting video to out_video.
-    """
+def _sync_headers() -> dict:
     api_key = settings.sync_api_key
-    base_url = settings.sync_base_url.rstrip("/")
     if not api_key:
         raise RuntimeError("SYNC_API_KEY is required to use Wav2Lip commercial API")
+    return {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+
 
-    # 1) Upload files to a temporary hosting if necessary. The Sync API expects URLs.
-    # For simplicity here, we use a pre-signed upload via a minimal file server assumption.
-    # In production, replace with your own file storage and provide URLs.
-    # As a fallback for local usage, we can use file:// URLs only if the API supports it (likely not).
-    # So we implement a naive upload to tmpfiles.org (anonymous) or similar; but to avoid external deps,
-    # we will error if URLs are not provided via options. The caller should provide accessible URLs.
-    raise_if_no_public_url = True
+def sync_api_inputs() -> Optional[Tuple[str, str]]:
+    """Return the public (video_url, audio_url) pair for the Sync API, or None when not configured.
+
+    The Sync API expects URLs, not uploads. The caller must provide accessible URLs
+    via W2L_VIDEO_URL / W2L_AUDIO_URL; file:// URLs are not supported by the service.
+    """
     video_url = os.getenv("W2L_VIDEO_URL")
     audio_url = os.getenv("W2L_AUDIO_URL")
-    if not video_url or not audio_url:
-        # As a minimal helper, if not provided, try to spin up an error explaining requirement.
-        raise RuntimeError("W2L_VIDEO_URL and W2L_AUDIO_URL must be provided as public URLs for Sync API")
+    if not settings.sync_api_key or not video_url or not audio_url:
+        return None
+    return video_url, audio_url
+
 
-    # 2) Submit generation job
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+def submit_sync_generation(video_url: str, audio_url: str, webhook_url: Optional[str] = None) -> str:
+    """Submit a lipsync generation to the Sync API and return its generation id without waiting."""
     payload = {
         "input": [
             {"type": "video", "url": video_url},
@@ -64,44 +58,82 @@ def run_wav2lip_sync_api(face_video_or_image: Path, audio_wav_16k: Path, out_vid
         ],
         "model": "lipsync-2",
         "options": {"sync_mode": "cut_off"},
-        "outputFileName": "auto_video"
+        "outputFileName": "auto_video",
     }
-    create_url = f"{base_url}/generations"
-    resp = requests.post(create_url, headers=headers, json=payload, timeout=60)
+    if webhook_url:
+        payload["webhookUrl"] = webhook_url
+    base_url = settings.sync_base_url.rstrip("/")
+    resp = requests.post(f"{base_url}/generations", headers=_sync_headers(), json=payload, timeout=60)
     resp.raise_for_status()
     data = resp.json()
-    job_id = data.get("id") or data.get("data", {}).get("id")
-    if not job_id:
+    generation_id = data.get("id") or data.get("data", {}).get("id")
+    if not generation_id:
         raise RuntimeError(f"Sync API: missing job id in response: {data}")
+    return generation_id
+
+
+def parse_sync_generation(data: dict) -> Tuple[Optional[str], Optional[str]]:
+    """Extract (status, output_url) from a generation object (poll response or webhook body)."""
+    inner = data.get("data") or {}
+    status = data.get("status") or inner.get("status")
+    output_url = data.get("output_url") or data.get("outputUrl") or inner.get("outputUrl")
+    return status, output_url
+
+
+def get_sync_generation(generation_id: str) -> Tuple[Optional[str], Optional[str]]:
+    """Fetch a generation once and return (status, output_url)."""
+    base_url = settings.sync_base_url.rstrip("/")
+    r = requests.get(f"{base_url}/generations/{generation_id}", headers=_sync_headers(), timeout=30)
+    r.raise_for_status()
+    return parse_sync_generation(r.json())
+
+
+def sync_poll_delay(attempt: int) -> int:
+    """Exponential backoff (capped) between Sync API status checks."""
+    return min(settings.sync_poll_max_sec, settings.sync_poll_initial_sec * (2 ** attempt))
+
+
+def run_wav2lip_sync_api(face_video_or_image: Path, audio_wav_16k: Path, out_video: Path, timeout_sec: int = 60 * 20) -> None:
+    """Use Sync.so commercial Wav2Lip API to generate lipsynced video, blocking until done.
+
+    Requires SYNC_API_KEY in env. Downloads the resulting video to out_video.
+    The Celery pipeline does not use this; it submits with submit_sync_generation and
+    resumes from the webhook or the backoff poller instead of holding the worker.
+    """
+    inputs = sync_api_inputs()
+    if not inputs:
+        raise RuntimeError("W2L_VIDEO_URL and W2L_AUDIO_URL must be provided as public URLs for Sync API")
+    generation_id = submit_sync_generation(*inputs)
 
-    # 3) Poll
-    get_url = f"{base_url}/generations/{job_id}"
     start = time.time()
     status = None
     output_url: Optional[str] = None
+    attempt = 0
     while time.time() - start < timeout_sec:
-        time.sleep(10)
-        r = requests.get(get_url, headers=headers, timeout=30)
-        r.raise_for_status()
-        g = r.json()
-        status = g.get("status") or g.get("data", {}).get("status")
-        output_url = g.get("output_url") or g.get("data", {}).get("outputUrl")
-        if status in ("COMPLETED", "FAILED"):
+        time.sleep(sync_poll_delay(attempt))
+        attempt += 1
+        status, output_url = get_sync_generation(generation_id)
+        if status in SYNC_TERMINAL_STATUSES:
             break
     if status != "COMPLETED" or not output_url:
         raise RuntimeError(f"Sync API generation failed or timed out. status={status}")
 
-    # 4) Download
-    out_video.parent.mkdir(parents=True, exist_ok=True)
-    with requests.get(output_url, stream=True, timeout=120) as r:
-        r.raise_for_status()
-        with open(out_video, "wb") as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+    download_file(output_url, out_video)
+
 
+def run_wav2lip_local(
+    face_video_or_image: Path,
+    audio_path: Path,
+    out_video: Path,
+    cwd: Optional[Path] = None,
+    env: Optional[dict] = None,
+    on_line: Optional[Callable[[str], None]] = None,
+) -> None:
+    """Run Wav2Lip inference.py as a subprocess.
 
-def run_wav2lip_local(face_video_or_image: Path, audio_path: Path, out_video: Path) -> None:
+    inference.py writes scratch files to ``temp/`` relative to its CWD, so concurrent
+    runs must each get their own ``cwd`` (its models resolve paths from the repo).
+    """
     repo = Path(settings.wav2lip_repo)
     if not repo.exists():
         raise RuntimeError(f"Wav2Lip repo not found: {repo}. Set WAV2LIP_REPO env var correctly.")
@@ -114,6 +146,8 @@ def run_wav2lip_local(face_video_or_image: Path, audio_path: Path, out_video: Pa
         raise RuntimeError(f"Wav2Lip checkpoint not found at {ckpt}. Set WAV2LIP_CKPT env var correctly.")
 
     out_video.parent.mkdir(parents=True, exist_ok=True)
+    workdir = cwd or repo
+    (workdir / "temp").mkdir(parents=True, exist_ok=True)
 
     cmd = [
         os.environ.get("PYTHON", "python"),
@@ -132,24 +166,113 @@ def run_wav2lip_local(face_video_or_image: Path, audio_path: Path, out_video: Pa
         "32",
     ]
     logger.info("Running Wav2Lip (local): %s", " ".join(cmd))
-    completed = subprocess.run(cmd, cwd=str(repo), capture_output=True, text=True)
-    if completed.stdout:
-        logger.info("Wav2Lip stdout: %s", completed.stdout[:2000])
-    if completed.stderr:
-        logger.info("Wav2Lip stderr: %s", completed.stderr[:2000])
-    if completed.returncode != 0:
-        raise RuntimeError(f"Wav2Lip failed with code {completed.returncode}: {completed.stderr}")
+    try:
+        run_cmd(cmd, cwd=workdir, env=env, on_line=on_line)
+    except CommandCancelled:
+        raise
+    except CommandError as exc:
+        raise RuntimeError(f"Wav2Lip failed: {exc}") from exc
+
+
+def chunk_boundaries(duration: float, keyframes: List[float], chunks: int, min_chunk_sec: float) -> List[Tuple[float, float]]:
+    """Split [0, duration) into up to ``chunks`` spans whose starts are keyframes.
+
+    Chunks shorter than min_chunk_sec are not worth a model load, so long videos get
+    ``chunks`` spans and short ones fewer (down to a single span).
+    """
+    chunks = max(1, min(chunks, int(duration // max(min_chunk_sec, 1e-6)) or 1))
+    starts = [0.0]
+    for i in range(1, chunks):
+        ideal = duration * i / chunks
+        candidates = [k for k in keyframes if starts[-1] + min_chunk_sec / 2 <= k <= duration - min_chunk_sec / 2]
+        if not candidates:
+            break
+        best = min(candidates, key=lambda k: abs(k - ideal))
+        if best > starts[-1]:
+            starts.append(best)
+    ends = starts[1:] + [duration]
+    return list(zip(starts, ends))
+
+
+def run_wav2lip_chunked(face_video: Path, audio_path: Path, out_video: Path, workers: int) -> dict:
+    """Render Wav2Lip over keyframe-aligned chunks in parallel processes and stream-copy join them.
+
+    Each chunk is a stream-copied slice of the face video plus the matching slice of
+    the audio, rendered by its own inference.py process (threads per process are
+    capped so the pool does not oversubscribe the CPU). The chunk videos are joined
+    with the concat demuxer without re-encoding and the full audio track is muxed
+    back on, so there are no audio seams. Returns timing stats: ``utilization`` is
+    chunk render time / (wall time * processes), with each process's checkpoint load
+    excluded and reported separately as ``model_load_sec_total``. It measures how busy
+    the pool was; ``python -m bench.wav2lip_scaling`` measures the speedup and scaling
+    efficiency against a single-process render.
+    """
+    duration = probe_duration(face_video)
+    bounds = chunk_boundaries(duration, keyframe_times(face_video), workers, settings.wav2lip_chunk_min_sec)
+    work_dir = out_video.parent / "wav2lip_chunks"
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    env = dict(os.environ)
+    threads = str(max(1, (os.cpu_count() or 1) // max(1, min(workers, len(bounds)))))
+    env.update(OMP_NUM_THREADS=threads, MKL_NUM_THREADS=threads)
+
+    jobs = []
+    for i, (start, end) in enumerate(bounds):
+        chunk_dir = work_dir / f"chunk_{i:03d}"
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+        face_part = chunk_dir / "face.mp4"
+        audio_part = chunk_dir / "audio.wav"
+        cut_video(face_video, start, end, face_part, copy=True)
+        cut_audio(audio_path, start, end, audio_part)
+        jobs.append((face_part, audio_part, chunk_dir / "out.mp4", chunk_dir))
+
+    def _render(job: Tuple[Path, Path, Path, Path]) -> Tuple[float, float]:
+        marks = {}
+
+        def on_line(line: str) -> None:
+            # inference.py prints these around its checkpoint load
+            if line.startswith("Load checkpoint from"):
+                marks.setdefault("load", time.perf_counter())
+            elif line.startswith("Model loaded"):
+                marks.setdefault("loaded", time.perf_counter())
+
+        t0 = time.perf_counter()
+        run_wav2lip_local(job[0], job[1], job[2], cwd=job[3], env=env, on_line=on_line)
+        load = marks["loaded"] - marks["load"] if "load" in marks and "loaded" in marks else 0.0
+        return time.perf_counter() - t0 - load, load
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Run each chunk in a copy of this context so the job's cancellation() check reaches it
+        futures = [pool.submit(contextvars.copy_context().run, _render, job) for job in jobs]
+        timings = [f.result() for f in futures]
+    wall = time.perf_counter() - wall_start
+
+    # concat_videos expects MPEG-TS parts so each chunk's encoder headers travel in-band
+    ts_parts = [job[2].with_suffix(".ts") for job in jobs]
+    for job, ts_part in zip(jobs, ts_parts):
+        remux_to_ts(job[2], ts_part)
+    joined = work_dir / "joined.mp4"
+    concat_videos(ts_parts, joined)
+    mux_video_audio(joined, audio_path, out_video)
+
+    render_sec = sum(render for render, _ in timings)
+    used = min(workers, len(jobs))
+    stats = {
+        "workers": workers,
+        "chunks": len(jobs),
+        "wall_sec": round(wall, 2),
+        "chunk_sec_total": round(render_sec, 2),
+        "model_load_sec_total": round(sum(load for _, load in timings), 2),
+        "utilization": round(render_sec / (wall * used), 2) if wall else 0.0,
+    }
+    logger.info("Wav2Lip chunked render: %s", stats)
+    return stats
 
 
 def run_wav2lip(face_video_or_image: Path, audio_path: Path, out_video: Path) -> None:
     """Auto-select Sync API if configured with URLs; otherwise run local inference."""
-    api_key = settings.sync_api_key
-    video_url = os.getenv("W2L_VIDEO_URL")
-    audio_url = os.getenv("W2L_AUDIO_URL")
-    if api_key and video_url and audio_url:
+    if sync_api_inputs():
         run_wav2lip_sync_api(face_video_or_image, audio_path, out_video)
         return
     run_wav2lip_local(face_video_or_image, audio_path, out_video)
-
-
-
@@ -0,0 +1,303 @@
+"""Load test for the API: job submission, status polling and SSE streaming.
+
+Runs ``app.main`` in-process under uvicorn against Redis (``--redis-url``) or, with
+``--fake-redis``, an in-process fakeredis server. Celery is replaced by a stub worker
+that replays a job's ``set_status``/``append_log`` traffic at a configurable rate, so
+only the API and Redis are measured. Each stub log line carries its send time, which
+gives the event delivery lag seen by SSE and polling clients.
+
+Prints (or writes with ``--out``) a JSON report with p50/p95/p99 latency and
+throughput per endpoint and the event lag, to compare API hot-path changes against a
+baseline. Run from ``api/``:
+
+    python -m bench.loadtest --fake-redis --jobs 200 --concurrency 20 --streams 20 --out baseline.json
+
+The stub worker runs as threads in the same process, so very high event rates also
+compete with the API for the GIL; use a real Redis and a low ``--worker-concurrency``
+when that matters.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import socket
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+_TS_RE = re.compile(r"ts=(\d+\.\d+)")
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest rank: the smallest value with at least pct% of the samples at or below it
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def _summary_ms(values: List[float]) -> dict:
+    ms = [v * 1000.0 for v in values]
+    return {
+        "count": len(ms),
+        "p50": _round(_percentile(ms, 50)),
+        "p95": _round(_percentile(ms, 95)),
+        "p99": _round(_percentile(ms, 99)),
+        "mean": _round(sum(ms) / len(ms)) if ms else None,
+        "max": _round(max(ms)) if ms else None,
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.codes: Dict[str, Counter] = defaultdict(Counter)
+        self.lag: Dict[str, List[float]] = defaultdict(list)
+        self.jobs = Counter()
+
+    def request(self, name: str, started: float, status: int) -> None:
+        self.latency[name].append(time.perf_counter() - started)
+        self.codes[name][str(status)] += 1
+
+    def event(self, channel: str, message: str) -> None:
+        m = _TS_RE.search(message or "")
+        if m:
+            self.lag[channel].append(max(0.0, time.time() - float(m.group(1))))
+
+    def report(self, args: argparse.Namespace, wall: float) -> dict:
+        endpoints = {}
+        for name, values in self.latency.items():
+            codes = self.codes[name]
+            errors = sum(n for code, n in codes.items() if not code.startswith(("2", "3")))
+            endpoints[name] = {
+                "requests": len(values),
+                "errors": errors,
+                "status_codes": dict(codes),
+                "throughput_rps": round(len(values) / wall, 2) if wall else None,
+                "latency_ms": _summary_ms(values),
+            }
+        return {
+            "config": vars(args),
+            "wall_sec": round(wall, 3),
+            "jobs": dict(self.jobs),
+            "endpoints": endpoints,
+            "event_lag_ms": {channel: _summary_ms(values) for channel, values in self.lag.items()},
+        }
+
+
+class StubWorker:
+    """Stands in for Celery: runs each job's progress traffic on a bounded thread pool."""
+
+    def __init__(self, progress, concurrency: int, steps: int, interval: float, start_delay: float) -> None:
+        self.progress = progress
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="stub-worker")
+        self.steps = steps
+        self.interval = interval
+        self.start_delay = start_delay
+
+    def enqueue(self, job_id: str, youtube_url: str, options: Optional[dict] = None) -> None:
+        self.pool.submit(self._run, job_id)
+
+    def _run(self, job_id: str) -> None:
+        p = self.progress
+        time.sleep(self.start_delay)  # let followers subscribe before the first event
+        for step in range(self.steps):
+            p.set_status(job_id, "RUNNING", progress=int(100 * step / self.steps))
+            p.append_log(job_id, f"loadtest step {step} ts={time.time():.6f}")
+            time.sleep(self.interval)
+        p.set_result(job_id, f"/results/{job_id}/translated_video.mp4")
+        p.set_status(job_id, "DONE", progress=100)
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _follow_stream(client, rec: Recorder, job_id: str, deadline: float) -> None:
+    # The SSE stream never ends on its own, so a missed DONE must not hang the run
+    try:
+        if await asyncio.wait_for(_read_stream(client, rec, job_id), max(0.0, deadline - time.monotonic())):
+            rec.jobs["completed"] += 1
+            return
+    except asyncio.TimeoutError:
+        pass
+    except Exception:  # noqa: BLE001 - counted, the run goes on
+        rec.codes["GET /stream/{id}"]["exception"] += 1
+    rec.jobs["timed_out"] += 1
+
+
+async def _read_stream(client, rec: Recorder, job_id: str) -> bool:
+    """Record SSE events until the job's DONE status; False if the stream closes first."""
+    started = time.perf_counter()
+    async with client.stream("GET", f"/stream/{job_id}", timeout=None) as r:
+        rec.request("GET /stream/{id}", started, r.status_code)
+        async for line in r.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[6:])
+            if event.get("type") == "log":
+                rec.event("sse", event.get("message", ""))
+            elif event.get("type") == "status" and event.get("status") == "DONE":
+                return True
+    return False
+
+
+async def _follow_poll(client, rec: Recorder, job_id: str, deadline: float, interval: float, wait: float) -> None:
+    cursor, etag = 0, None
+    while time.monotonic() < deadline:
+        headers = {"If-None-Match": etag} if etag else {}
+        params = {"sinceLog": cursor, "wait": wait} if wait else {"sinceLog": cursor}
+        started = time.perf_counter()
+        try:
+            r = await client.get(f"/jobs/{job_id}", params=params, headers=headers, timeout=wait + 30)
+        except Exception:  # noqa: BLE001
+            rec.codes["GET /jobs/{id}"]["exception"] += 1
+            await asyncio.sleep(interval)
+            continue
+        rec.request("GET /jobs/{id}", started, r.status_code)
+        if r.status_code == 200:
+            etag = r.headers.get("ETag")
+            data = r.json()
+            for line in data.get("logs") or []:
+                rec.event("poll", line)
+            cursor = data.get("logCursor", cursor)
+            if data.get("status") == "DONE":
+                rec.jobs["completed"] += 1
+                return
+        if not wait:
+            await asyncio.sleep(interval)
+    rec.jobs["timed_out"] += 1
+
+
+async def _drive(args: argparse.Namespace, base_url: str, rec: Recorder) -> None:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency + args.jobs + 10, max_keepalive_connections=args.concurrency + 10)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        submit_slots = asyncio.Semaphore(args.concurrency)
+        followers: List[asyncio.Task] = []
+        streams_started = 0
+
+        async def submit(i: int) -> None:
+            nonlocal streams_started
+            async with submit_slots:
+                started = time.perf_counter()
+                r = await client.post(
+                    "/jobs",
+                    json={"youtubeUrl": "https://www.youtube.com/watch?v=loadtest", "options": {}},
+                    headers={"X-API-Key": f"loadtest-{i % args.api_keys}"},
+                )
+                rec.request("POST /jobs", started, r.status_code)
+            rec.jobs["submitted"] += 1
+            if r.status_code != 200:
+                rec.jobs["rejected"] += 1
+                return
+            rec.jobs["accepted"] += 1
+            job_id = r.json()["jobId"]
+            deadline = time.monotonic() + args.job_timeout
+            if streams_started < args.streams:
+                streams_started += 1
+                followers.append(asyncio.create_task(_follow_stream(client, rec, job_id, deadline)))
+            elif args.poll:
+                followers.append(
+                    asyncio.create_task(_follow_poll(client, rec, job_id, deadline, args.poll_interval, args.poll_wait))
+                )
+
+        await asyncio.gather(*(submit(i) for i in range(args.jobs)))
+        await asyncio.gather(*followers)
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    backend = p.add_mutually_exclusive_group()
+    backend.add_argument("--redis-url", help="Redis to run against (default: REDIS_URL / settings)")
+    backend.add_argument("--fake-redis", action="store_true", help="use an in-process fakeredis server")
+    p.add_argument("--jobs", type=int, default=100, help="total POST /jobs submissions")
+    p.add_argument("--concurrency", type=int, default=10, help="in-flight POST /jobs requests")
+    p.add_argument("--streams", type=int, default=10, help="accepted jobs followed via /stream (SSE)")
+    p.add_argument("--no-poll", dest="poll", action="store_false", help="don't poll the jobs not followed via SSE")
+    p.add_argument("--poll-interval", type=float, default=0.5, help="seconds between plain polls")
+    p.add_argument("--poll-wait", type=float, default=0.0, help="long-poll with If-None-Match and this wait (s)")
+    p.add_argument("--api-keys", type=int, default=10, help="distinct X-API-Key values to spread quota over")
+    p.add_argument("--admission", action="store_true", help="keep admission control on (duration probe stubbed)")
+    p.add_argument("--video-sec", type=float, default=60.0, help="stubbed video duration for admission")
+    p.add_argument("--worker-concurrency", type=int, default=4, help="stub worker slots")
+    p.add_argument("--worker-steps", type=int, default=20, help="status+log updates per stub job")
+    p.add_argument("--event-interval", type=float, default=0.1, help="seconds between stub job updates")
+    p.add_argument("--start-delay", type=float, default=0.5, help="stub job delay before its first update")
+    p.add_argument("--job-timeout", type=float, default=120.0, help="per-job follow deadline (s)")
+    p.add_argument("--port", type=int, default=0, help="API port (default: a free one)")
+    p.add_argument("--out", help="write the JSON report here as well")
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    args = _parse_args(argv)
+    if args.redis_url:
+        os.environ["REDIS_URL"] = args.redis_url  # before app.* builds its Redis client
+
+    import uvicorn
+
+    import app.main as api
+    from app.config import settings
+    from app.utils import progress
+
+    if args.fake_redis:
+        import fakeredis  # type: ignore
+
+        server = fakeredis.FakeServer()
+        progress._redis = fakeredis.FakeRedis(server=server, decode_responses=True)
+        progress._aredis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+
+    worker = StubWorker(progress, args.worker_concurrency, args.worker_steps, args.event_interval, args.start_delay)
+    api.enqueue_process_job = worker.enqueue
+    api.revoke_job = lambda job_id: None
+    settings.admission_enabled = args.admission
+    settings.api_keys = ",".join(f"loadtest-{i}" for i in range(args.api_keys))
+    api.probe_remote_duration = lambda url, timeout=None: args.video_sec
+
+    port = args.port or _free_port()
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise SystemExit("API server failed to start")
+        time.sleep(0.05)
+
+    rec = Recorder()
+    started = time.perf_counter()
+    try:
+        asyncio.run(_drive(args, f"http://127.0.0.1:{port}", rec))
+    finally:
+        wall = time.perf_counter() - started
+        worker.shutdown()
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    report = rec.report(args, wall)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,76 @@
+"""Scaling benchmark for chunked local Wav2Lip: one process versus N processes.
+
+Renders the same face video and audio once with a single ``inference.py`` process
+(``run_wav2lip_local``, the ``WAV2LIP_WORKERS=1`` path) and then with
+``run_wav2lip_chunked`` for each requested worker count. Reports wall time per run,
+``speedup = T1 / TN`` and ``efficiency = speedup / N``, next to the chunked renderer's
+own stats (pool utilization, model load time). Needs the Wav2Lip repo and checkpoint
+(``WAV2LIP_REPO``, ``WAV2LIP_CKPT``) and ffmpeg. Run from ``api/``:
+
+    python -m bench.wav2lip_scaling face.mp4 audio.wav --workers 2 4 --out scaling.json
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def scaling_report(baseline_sec: float, runs: Dict[int, dict]) -> dict:
+    """Speedup and efficiency of each N-worker run (``{"wall_sec", ...}``) against the 1-process time."""
+    report = {"baseline_sec": round(baseline_sec, 2), "runs": {}}
+    for workers, run in sorted(runs.items()):
+        speedup = baseline_sec / run["wall_sec"] if run["wall_sec"] else 0.0
+        report["runs"][str(workers)] = {
+            **run,
+            "speedup": round(speedup, 2),
+            "efficiency": round(speedup / workers, 2),
+        }
+    return report
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("face", type=Path, help="face video (H.264, so chunks can be stream-copied)")
+    p.add_argument("audio", type=Path, help="audio track to lip-sync to")
+    p.add_argument("--workers", type=int, nargs="+", default=[2, 4], help="worker counts to compare against 1")
+    p.add_argument("--chunk-min-sec", type=float, help="override WAV2LIP_CHUNK_MIN_SEC")
+    p.add_argument("--out", help="write the JSON report here as well")
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    args = _parse_args(argv)
+
+    from app.config import settings
+    from app.utils.wav2lip import run_wav2lip_chunked, run_wav2lip_local
+
+    if args.chunk_min_sec is not None:
+        settings.wav2lip_chunk_min_sec = args.chunk_min_sec
+
+    with tempfile.TemporaryDirectory(prefix="wav2lip_scaling_") as tmp:
+        work = Path(tmp)
+        started = time.perf_counter()
+        run_wav2lip_local(args.face, args.audio, work / "single" / "out.mp4", cwd=work / "single")
+        baseline = time.perf_counter() - started
+
+        runs: Dict[int, dict] = {}
+        for workers in args.workers:
+            started = time.perf_counter()
+            stats = run_wav2lip_chunked(args.face, args.audio, work / f"workers_{workers}" / "out.mp4", workers=workers)
+            # End to end, including the cuts and the join, so it compares with the single render
+            runs[workers] = {**stats, "wall_sec": round(time.perf_counter() - started, 2), "render_wall_sec": stats["wall_sec"]}
+
+    report = scaling_report(baseline, runs)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,40 @@
+import math
+
+from app.config import settings
+from app.utils.admission import decide, estimate_job_seconds, token_bucket
+
+
+def test_estimate_scales_with_duration_and_falls_back_when_unknown():
+    assert estimate_job_seconds(100) == 100 * settings.admission_sec_per_media_sec + settings.admission_job_overhead_sec
+    assert estimate_job_seconds(None) == estimate_job_seconds(settings.admission_default_duration_sec)
+
+
+def test_decide_admits_under_limits_and_into_idle_system():
+    assert decide(2, 1, 600, 300, max_queue_depth=10, max_backlog_sec=3600).admitted
+    # A job longer than the whole backlog budget still runs when nothing else is queued
+    assert decide(0, 0, 0, 10_000, max_queue_depth=10, max_backlog_sec=3600).admitted
+
+
+def test_decide_rejects_full_queue_with_drain_estimate():
+    decision = decide(10, 2, 1200, 300, max_queue_depth=10, max_backlog_sec=0)
+    assert not decision.admitted and decision.reason == "queue_full"
+    # 12 jobs share 1200s of backlog -> 100s each, one must finish across 2 parallel workers
+    assert decision.retry_after == 50
+
+
+def test_decide_rejects_backlog_overflow_and_clamps_retry_after():
+    decision = decide(3, 1, 3500, 300, max_queue_depth=0, max_backlog_sec=3600)
+    assert (decision.admitted, decision.reason, decision.retry_after) == (False, "backlog_full", 200)
+    tiny = decide(3, 1, 3599, 2, max_queue_depth=0, max_backlog_sec=3600)
+    assert tiny.retry_after == settings.admission_min_retry_sec
+
+
+def test_token_bucket_bursts_then_refills():
+    allowed, left, wait = token_bucket(None, None, now=0.0, rate_per_sec=0.5, burst=2)
+    assert allowed and left == 1
+    allowed, left, wait = token_bucket(left, 0.0, now=0.0, rate_per_sec=0.5, burst=2)
+    assert allowed and left == 0
+    allowed, left, wait = token_bucket(left, 0.0, now=1.0, rate_per_sec=0.5, burst=2)
+    assert not allowed and math.isclose(wait, 1.0)
+    allowed, left, _ = token_bucket(0.0, 0.0, now=100.0, rate_per_sec=0.5, burst=2)
+    assert allowed and left == 1  # refill is capped at the burst size
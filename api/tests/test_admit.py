@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.schemas import CreateJobRequest
+
+main = pytest.importorskip("app.main")
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    seen = {"buckets": [], "probes": 0, "snapshot": (0, 0, 0.0)}
+
+    def take(bucket, rate, burst):
+        seen["buckets"].append(bucket)
+        return 0.0
+
+    def probe(url, timeout=None):
+        seen["probes"] += 1
+        return 120.0
+
+    monkeypatch.setattr(main, "take_api_token", take)
+    monkeypatch.setattr(main, "probe_remote_duration", probe)
+    monkeypatch.setattr(main, "admission_snapshot", lambda keys: seen["snapshot"])
+    monkeypatch.setattr(settings, "api_keys", "good-key, other-key")
+    monkeypatch.setattr(settings, "admission_max_queue", 5)
+    monkeypatch.setattr(settings, "admission_max_backlog_sec", 3600)
+    return seen
+
+
+def _request(host="10.0.0.1"):
+    return SimpleNamespace(client=SimpleNamespace(host=host))
+
+
+def _job(**kwargs):
+    return CreateJobRequest(youtubeUrl="https://www.youtube.com/watch?v=abc", **kwargs)
+
+
+def test_only_configured_keys_get_their_own_bucket(calls):
+    for key in ("good-key", "rotated-1", "rotated-2", None):
+        main._admit(_request(), _job(), key)
+    assert calls["buckets"] == ["key:good-key", "ip:10.0.0.1", "ip:10.0.0.1", "ip:10.0.0.1"]
+
+
+def test_full_queue_rejects_without_probing(calls):
+    calls["snapshot"] = (5, 2, 1000.0)
+    with pytest.raises(main.HTTPException) as exc:
+        main._admit(_request(), _job(), None)
+    assert exc.value.status_code == 429
+    assert calls["probes"] == 0
+
+
+def test_probe_only_when_backlog_limit_can_bite(calls):
+    main._admit(_request(), _job(), None)  # idle system: default estimate, no probe
+    main._admit(_request(), _job(start=10, end=70), None)  # bounded clip: length is known
+    assert calls["probes"] == 0
+
+    calls["snapshot"] = (1, 1, 600.0)
+    job_sec = main._admit(_request(), _job(), None)
+    assert calls["probes"] == 1
+    assert job_sec == pytest.approx(120 * settings.admission_sec_per_media_sec + settings.admission_job_overhead_sec)
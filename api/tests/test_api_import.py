@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Budget for `import app.main` in a fresh interpreter (uvicorn worker cold start)
+MAX_IMPORT_SEC = 5.0
+MAX_RSS_MB = 150
+FORBIDDEN_MODULES = ("whisper", "whisperx", "torch", "app.tasks", "app.utils.sadtalker")
+
+PROBE = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - t0
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({"sec": elapsed, "rss_mb": rss_mb, "modules": sorted(sys.modules)}))
+"""
+
+
+def test_api_import_stays_light(tmp_path):
+    env = dict(os.environ, DATA_DIR=str(tmp_path))
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=Path(__file__).resolve().parents[1],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    report = json.loads(out.strip().splitlines()[-1])
+    assert not [m for m in FORBIDDEN_MODULES if m in report["modules"]]
+    assert report["sec"] < MAX_IMPORT_SEC, report["sec"]
+    assert report["rss_mb"] < MAX_RSS_MB, report["rss_mb"]
@@ -0,0 +1,83 @@
+import wave
+
+import numpy as np
+
+from app.utils import audio
+from app.utils.audio import (
+    fade_edges,
+    join_with_gaps,
+    limit_peak,
+    normalize_loudness,
+    place_on_timeline,
+    resample,
+    time_stretch,
+    write_wav,
+)
+
+
+def _tone(freq, seconds, rate, amp=0.5):
+    t = np.arange(int(seconds * rate)) / rate
+    return (amp * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_join_with_gaps_and_faded_edges():
+    a, b = np.ones(100, np.float32), np.ones(50, np.float32)
+    out = join_with_gaps([fade_edges(a, 1000, fade_ms=10), fade_edges(b, 1000, fade_ms=10)], 1000, gap_sec=0.02)
+    assert out.size == 170
+    assert out[0] == 0 and out[99] == 0 and out[120] == 0  # chunks start/end at silence
+    assert np.all(out[100:120] == 0) and out[50] == 1
+
+
+def test_normalize_loudness_hits_target_and_leaves_silence():
+    quiet = _tone(440, 1.0, 16000, amp=0.01)
+    leveled = normalize_loudness(quiet, target_dbfs=-20.0, max_gain_db=60.0)
+    rms_db = 20 * np.log10(np.sqrt(np.mean(leveled.astype(np.float64) ** 2)))
+    assert abs(rms_db - -20.0) < 0.1
+    silence = np.zeros(100, np.float32)
+    assert np.array_equal(normalize_loudness(silence), silence)
+    assert np.max(np.abs(limit_peak(np.array([2.0, -1.0], np.float32)))) <= 0.98 + 1e-6
+
+
+def test_numpy_resample_fallback_keeps_tone_and_drops_aliases(monkeypatch):
+    monkeypatch.setattr(audio, "resample_poly", None)
+    rate_from, rate_to = 44100, 16000
+    signal = _tone(1000, 1.0, rate_from) + _tone(12000, 1.0, rate_from)  # 12 kHz is above the new Nyquist
+    out = resample(signal, rate_from, rate_to)
+    assert out.size == rate_to
+    spectrum = np.abs(np.fft.rfft(out[2000:-2000]))
+    freqs = np.fft.rfftfreq(out[2000:-2000].size, 1 / rate_to)
+    peak = freqs[np.argmax(spectrum)]
+    assert abs(peak - 1000) < 5
+    alias = spectrum[np.abs(freqs - 4000) < 20].max()  # 12 kHz would fold to 4 kHz
+    assert alias < 0.05 * spectrum.max()
+
+
+def test_write_wav_is_16k_mono_pcm(tmp_path):
+    out = tmp_path / "speech_16k.wav"
+    write_wav(_tone(440, 0.5, 16000), 16000, out)
+    with wave.open(str(out)) as w:
+        assert (w.getnchannels(), w.getsampwidth(), w.getframerate(), w.getnframes()) == (1, 2, 16000, 8000)
+
+
+def _peak_freq(samples, rate):
+    spectrum = np.abs(np.fft.rfft(samples))
+    return np.fft.rfftfreq(samples.size, 1 / rate)[np.argmax(spectrum)]
+
+
+def test_time_stretch_shortens_without_changing_pitch():
+    rate = 16000
+    out = time_stretch(_tone(440, 1.0, rate), 1.5)
+    assert out.size == round(rate / 1.5)
+    assert abs(_peak_freq(out[1000:-1000], rate) - 440) < 5
+    assert abs(np.sqrt(np.mean(out[1000:-1000] ** 2)) - 0.5 / np.sqrt(2)) < 0.05
+
+
+def test_place_on_timeline_matches_video_length_and_compresses_overruns():
+    rate = 1000
+    clips = [np.ones(500, np.float32), _tone(50, 3.0, rate), None]
+    track, stats = place_on_timeline(clips, [0.5, 2.0, 3.0], total_sec=4.0, sample_rate=rate, max_speedup=1.5)
+    assert track.size == 4000
+    assert np.all(track[:500] == 0) and track[700] == 1  # first clip starts at its segment
+    # The 3 s clip only has 1 s before the next segment: stretched by the cap, then cut to the slot
+    assert np.all(track[3000:] == 0)
+    assert stats == {"segments": 3, "placed": 2, "stretched": 1, "truncated": 1, "max_speedup": 1.5}
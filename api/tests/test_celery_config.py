@@ -0,0 +1,19 @@
+from app import tasks
+from app.celery_app import broker_queue_keys, celery_app
+
+
+def test_broker_queue_keys_cover_every_priority_list():
+    assert broker_queue_keys() == ["celery", "celery:3", "celery:6", "celery:9"]
+
+
+def test_workers_reserve_one_task_so_priorities_apply():
+    assert celery_app.conf.worker_prefetch_multiplier == 1
+    assert not celery_app.conf.task_acks_late
+    assert celery_app.conf.broker_transport_options["queue_order_strategy"] == "priority"
+
+
+def test_only_the_redeliverable_pass_acks_late():
+    assert tasks.process_job.acks_late is True
+    assert not tasks.finalize_sync_lipsync.acks_late
+    assert not tasks.poll_sync_generation.acks_late
+    assert celery_app.conf.broker_transport_options["visibility_timeout"] == tasks.settings.celery_visibility_timeout_sec
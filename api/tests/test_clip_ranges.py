@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from app.schemas import CreateJobRequest
+from app.utils import media
+from app.utils.admission import clip_seconds
+
+URL = "https://www.youtube.com/watch?v=abc"
+
+
+def test_clip_ranges_from_start_end_and_sorted_ranges():
+    assert CreateJobRequest(youtubeUrl=URL).clip_ranges() == []
+    assert CreateJobRequest(youtubeUrl=URL, start=30, end=90).clip_ranges() == [(30, 90)]
+    assert CreateJobRequest(youtubeUrl=URL, start=30).clip_ranges() == [(30, None)]
+    req = CreateJobRequest(youtubeUrl=URL, ranges=[{"start": 120, "end": 150}, {"start": 0, "end": 10}])
+    assert req.clip_ranges() == [(0, 10), (120, 150)]
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"start": 50, "end": 40},
+        {"start": -1},
+        {"start": 0, "ranges": [{"start": 1, "end": 2}]},
+        {"ranges": [{"start": 0, "end": 20}, {"start": 10, "end": 30}]},
+    ],
+)
+def test_invalid_clip_requests_are_rejected(fields):
+    with pytest.raises(ValidationError):
+        CreateJobRequest(youtubeUrl=URL, **fields)
+
+
+def test_clip_seconds_scales_admission_with_clip_length():
+    assert clip_seconds([], 600) == 600
+    assert clip_seconds([(0, 10), (120, 150)], None) == 40
+    assert clip_seconds([(550, 700)], 600) == 50
+    assert clip_seconds([(500, None)], 600) == 100
+    assert clip_seconds([(500, None)], None) is None
+
+
+def test_download_clip_concatenates_sections_as_mpegts(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_run_cmd(cmd, **kwargs):
+        calls.append(cmd)
+        if cmd[0] == "yt-dlp":
+            template = Path(cmd[cmd.index("-o") + 1])
+            for i in range(cmd.count("--download-sections")):
+                (template.parent / f"part_{i + 1:03d}.mp4").write_bytes(b"mp4")
+        else:
+            Path(cmd[-1]).write_bytes(b"out")
+        return []
+
+    monkeypatch.setattr(media, "run_cmd", fake_run_cmd)
+    media.download_clip(URL, tmp_path / "input.mp4", [(0, 10), (120, 150)])
+    remuxes = [cmd for cmd in calls if "mpegts" in cmd]
+    assert [Path(cmd[-1]).suffix for cmd in remuxes] == [".ts", ".ts"]
+    concat_list = (tmp_path / "input.concat.txt").read_text().splitlines()
+    assert all(line.endswith(".ts'") for line in concat_list)
+    assert (tmp_path / "input.mp4").exists()
@@ -1,6 +1,6 @@
 from pathlib import Path
 
-from app.utils.media import build_mux_command
+from app.utils.media import build_join_audio_command, build_mux_command
 
 
 def test_build_mux_command_maps():
@@ -8,3 +8,21 @@ def test_build_mux_command_maps():
     joined = " ".join(cmd)
     assert "-map 0:v:0" in joined
     assert "-map 1:a:0" in joined
+
+
+def test_build_mux_command_draft_downscale():
+    cmd = build_mux_command(Path("v.mp4"), Path("a.mp3"), Path("o.mp4"), video_codec="libx264", max_height=360)
+    joined = " ".join(cmd)
+    assert "-c:v libx264 -vf scale=-2:360 -preset ultrafast" in joined
+    assert "-vf" not in build_mux_command(Path("v.mp4"), Path("a.mp3"), Path("o.mp4"))
+
+
+def test_build_join_audio_command_trims_each_range_from_one_input():
+    src = Path("full.m4a")
+    cmd = build_join_audio_command([(src, 0.0, 10.0), (src, 120.0, None)], Path("o.m4a"))
+    assert cmd.count("-i") == 1
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert "[0:a:0]atrim=start=0.000000:end=10.000000,asetpts=PTS-STARTPTS[a0]" in graph
+    assert "[0:a:0]atrim=start=120.000000,asetpts=PTS-STARTPTS[a1]" in graph
+    assert graph.endswith("[a0][a1]concat=n=2:v=0:a=1[out]")
+
@@ -0,0 +1,34 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from bench.loadtest import Recorder, _follow_stream, _percentile
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(v) for v in range(1, 11)]
+    assert _percentile(values, 50) == 5.0
+    assert _percentile(values, 95) == 10.0
+    assert _percentile([1.0, 2.0], 50) == 1.0
+    assert _percentile([], 50) is None
+
+
+def test_follow_stream_gives_up_at_deadline_when_done_never_arrives():
+    class _SilentStream:
+        status_code = 200
+
+        async def aiter_lines(self):
+            yield 'data: {"type": "log", "message": "step"}'
+            await asyncio.sleep(3600)  # connection stays open, DONE was missed
+            yield ""
+
+    class _Client:
+        @asynccontextmanager
+        async def stream(self, method, url, timeout=None):
+            yield _SilentStream()
+
+    rec = Recorder()
+    started = time.monotonic()
+    asyncio.run(_follow_stream(_Client(), rec, "job1", time.monotonic() + 0.2))
+    assert time.monotonic() - started < 2
+    assert rec.jobs == {"timed_out": 1}
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.utils import progress  # noqa: E402
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(progress, "_redis", fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(progress, "_aredis", fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    progress.init_job("job1", "https://example.com/v")
+    return server
+
+
+def test_wait_for_change_times_out_on_unchanged_version(fake_redis):
+    started = time.monotonic()
+    assert asyncio.run(progress.wait_for_change("job1", 0, 0.3)) == 0
+    assert time.monotonic() - started >= 0.25
+
+
+def test_wait_for_change_wakes_on_update_without_blocking_the_loop(fake_redis):
+    async def scenario():
+        waiter = asyncio.create_task(progress.wait_for_change("job1", 0, 5))
+        await asyncio.sleep(0.1)
+        assert not waiter.done()  # the loop stays free while the long-poll waits
+        await asyncio.to_thread(progress.append_log, "job1", "hello")
+        return await asyncio.wait_for(waiter, 2)
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_wait_for_change_zero_timeout_reads_once(fake_redis):
+    async def scenario():
+        return await progress.wait_for_change("job1", 0, 0), await progress.wait_for_change("missing", 0, 0)
+
+    assert asyncio.run(scenario()) == (0, None)
+
+
+def test_sse_stream_yields_events_without_blocking_the_loop(fake_redis):
+    main = pytest.importorskip("app.main")
+
+    async def scenario():
+        response = await main.stream_events("job1")
+        events = response.body_iterator
+        reader = asyncio.create_task(events.__anext__())
+        await asyncio.sleep(0.1)
+        assert not reader.done()  # the loop stays free while the stream waits for a message
+        await asyncio.to_thread(progress.append_log, "job1", "hello")
+        chunk = await asyncio.wait_for(reader, 2)
+        await events.aclose()
+        return chunk
+
+    assert '"message": "hello"' in asyncio.run(scenario())
+
+
+def test_admission_snapshot_reaps_jobs_that_went_silent(fake_redis, monkeypatch):
+    for job_id in ("dead", "alive", "done"):
+        progress.register_admitted_job(job_id, 100.0)
+    progress.set_status("dead", "RUNNING")
+    progress.set_status("alive", "RUNNING")
+    progress.set_status("done", "DONE")
+    progress._redis.zadd(progress._ACTIVE_KEY, {"dead": time.time() - 7200})  # worker killed two hours ago
+
+    assert progress.admission_snapshot([], stale_sec=0) == (0, 2, 200.0)
+    assert progress.admission_snapshot([], stale_sec=3600) == (0, 1, 100.0)
+    assert progress.admission_snapshot([], stale_sec=0) == (0, 1, 100.0)
@@ -0,0 +1,171 @@
+import os
+
+import pytest
+
+from app import tasks
+from app.utils.object_store import LocalStorage, S3Storage, result_key, work_key
+from app.utils.storage import job_paths
+
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 client calls the backend makes."""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = []
+
+    def upload_file(self, filename, bucket, key, ExtraArgs=None, Config=None):
+        with open(filename, "rb") as f:
+            self.objects[(bucket, key)] = f.read()
+        self.uploads.append((key, (ExtraArgs or {}).get("ContentType")))
+
+    def download_file(self, bucket, key, filename, Config=None):
+        with open(filename, "wb") as f:
+            f.write(self.objects[(bucket, key)])
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            err = Exception("Not Found")
+            err.response = {"ResponseMetadata": {"HTTPStatusCode": 404}}
+            raise err
+        return {}
+
+    def get_paginator(self, op):
+        client = self
+
+        class _Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = sorted(k for b, k in client.objects if b == Bucket and k.startswith(Prefix))
+                yield {"Contents": [{"Key": k} for k in keys]} if keys else {}
+
+        return _Paginator()
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def delete_objects(self, Bucket, Delete):
+        for obj in Delete["Objects"]:
+            self.objects.pop((Bucket, obj["Key"]), None)
+
+    def generate_presigned_url(self, op, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Bucket']}/{Params['Key']}?op={op}&expires={ExpiresIn}"
+
+
+def test_local_storage_links_into_data_dir_and_serves_results(tmp_path):
+    storage = LocalStorage(tmp_path / "data")
+    src = tmp_path / "scratch" / "translated_video.mp4"
+    src.parent.mkdir()
+    src.write_bytes(b"video")
+    key = result_key("job1", src.name)
+
+    storage.put_file(src, key)
+    assert storage.exists(key)
+    assert os.path.samefile(src, tmp_path / "data" / "results" / "job1" / src.name)
+    assert storage.result_url("job1", src.name) == "/results/job1/translated_video.mp4"
+
+    back = storage.fetch(key, tmp_path / "other" / "v.mp4")
+    assert back.read_bytes() == b"video"
+    with pytest.raises(ValueError):
+        storage.put_file(src, "../escape.mp4")
+
+
+def test_s3_storage_uploads_fetches_and_presigns(tmp_path):
+    client = FakeS3Client()
+    storage = S3Storage("bucket", prefix="autoshorts/", client=client, presign_expires_sec=600)
+    subs = tmp_path / "subtitles_ko.srt"
+    subs.write_text("1\n", encoding="utf-8")
+    key = work_key("job1", subs.name)
+
+    assert not storage.exists(key)
+    storage.put_file(subs, key)
+    assert storage.exists(key)
+    assert [k for k, _ in client.uploads] == ["autoshorts/work/job1/subtitles_ko.srt"]
+
+    local = tmp_path / "node2" / "subtitles_ko.srt"
+    storage.fetch(key, local)
+    assert local.read_text(encoding="utf-8") == "1\n"
+    assert not local.with_name(local.name + ".part").exists()
+
+    assert storage.result_url("job1", "translated_video.mp4") == "/jobs/job1/files/translated_video.mp4"
+    url = storage.download_url(result_key("job1", "translated_video.mp4"))
+    assert url == "https://s3.test/bucket/autoshorts/results/job1/translated_video.mp4?op=get_object&expires=600"
+
+
+def test_delete_prefix_removes_a_jobs_objects_only(tmp_path):
+    local = LocalStorage(tmp_path / "data")
+    for job in ("job1", "job2"):
+        (tmp_path / "data" / "work" / job).mkdir(parents=True)
+        (tmp_path / "data" / "work" / job / "input_audio.wav").write_bytes(b"a")
+    local.delete_prefix("work/job1")
+    assert not local.exists(work_key("job1", "input_audio.wav"))
+    assert local.exists(work_key("job2", "input_audio.wav"))
+
+    client = FakeS3Client()
+    client.objects = {("bucket", "p/work/job1/a"): b"", ("bucket", "p/work/job10/a"): b"", ("bucket", "p/results/job1/v"): b""}
+    S3Storage("bucket", prefix="p", client=client).delete_prefix("work/job1")
+    assert set(client.objects) == {("bucket", "p/work/job10/a"), ("bucket", "p/results/job1/v")}
+
+
+def test_delete_removes_one_object_and_ignores_missing(tmp_path):
+    local = LocalStorage(tmp_path / "data")
+    (tmp_path / "data" / "work" / "job1").mkdir(parents=True)
+    (tmp_path / "data" / "work" / "job1" / "input_audio.wav").write_bytes(b"a")
+    (tmp_path / "data" / "work" / "job1" / "profile.pstats").write_bytes(b"p")
+    local.delete(work_key("job1", "input_audio.wav"))
+    local.delete(work_key("job1", "input_audio.wav"))
+    assert not local.exists(work_key("job1", "input_audio.wav")) and local.exists(work_key("job1", "profile.pstats"))
+
+    client = FakeS3Client()
+    client.objects = {("bucket", "p/work/job1/a"): b"", ("bucket", "p/work/job1/b"): b""}
+    S3Storage("bucket", prefix="p", client=client).delete(work_key("job1", "a"))
+    assert set(client.objects) == {("bucket", "p/work/job1/b")}
+
+
+def _job_with_files(monkeypatch, tmp_path, storage):
+    monkeypatch.setattr(tasks.settings, "scratch_dir", str(tmp_path / "scratch"))
+    monkeypatch.setattr(tasks, "get_storage", lambda: storage)
+    paths = job_paths("job1")
+    for name in ("video", "audio", "subs", "tts_audio"):
+        paths[name].write_bytes(b"x")
+    (paths["work"] / "profile.pstats").write_bytes(b"p")
+    return paths
+
+
+def test_job_with_files_keeps_scratch_until_last_retry_then_only_the_profile_result(monkeypatch, tmp_path):
+    storage = LocalStorage(tmp_path / "scratch")  # single-node setup: the data dir is the scratch
+    paths = _job_with_files(monkeypatch, tmp_path, storage)
+
+    tasks._release_scratch("job1", paths, "failed", final=False)
+    assert paths["video"].exists() and paths["tts_audio"].exists()
+
+    tasks._release_scratch("job1", paths, "failed", final=True)
+    assert not paths["work"].exists()
+    assert storage.exists(result_key("job1", "profile.pstats"))
+    assert storage.result_url("job1", "profile.pstats").endswith("/job1/profile.pstats")
+
+
+def test_finished_job_publishes_profile_and_drops_handoff_files(monkeypatch, tmp_path):
+    client = FakeS3Client()
+    storage = S3Storage("bucket", client=client)
+    paths = _job_with_files(monkeypatch, tmp_path, storage)
+    tasks._publish_intermediates("job1", paths, names=("video", "audio"))
+
+    tasks._release_scratch("job1", paths, "handed_off")
+    assert storage.exists(work_key("job1", "input_video.mp4")) and not paths["work"].exists()
+
+    tasks._release_scratch("job1", paths, "ok")
+    assert set(client.objects) == {("bucket", "results/job1/profile.pstats")}
+
+
+def test_job_profile_links_the_published_cprofile(monkeypatch, tmp_path):
+    main = pytest.importorskip("app.main")
+    storage = LocalStorage(tmp_path / "data")
+    monkeypatch.setattr(main, "get_storage", lambda: storage)
+    monkeypatch.setattr(main, "get_state", lambda job_id: {"status": "DONE"})
+    monkeypatch.setattr(main, "get_profile", lambda job_id: {})
+    monkeypatch.setattr(main.settings, "results_base_url", "/results")
+    assert main.get_job_profile("job1")["cprofile"] is None
+
+    (tmp_path / "p.pstats").write_bytes(b"p")
+    storage.put_file(tmp_path / "p.pstats", result_key("job1", "profile.pstats"))
+    assert main.get_job_profile("job1")["cprofile"] == "/results/job1/profile.pstats"
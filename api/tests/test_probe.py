@@ -0,0 +1,32 @@
+from app.utils import probe
+from app.utils.probe import is_wav_16k_mono, mux_codecs, probe_media
+
+FFPROBE_OUT = {
+    "format": {"duration": "12.5", "format_name": "mov,mp4,m4a,3gp,3g2,mj2"},
+    "streams": [
+        {"codec_type": "video", "codec_name": "h264", "width": 1280, "height": 720, "avg_frame_rate": "30000/1001"},
+        {"codec_type": "audio", "codec_name": "aac", "sample_rate": "44100", "channels": 2},
+    ],
+}
+
+
+def test_probe_media_parses_and_caches(tmp_path, monkeypatch):
+    video = tmp_path / "input_video.mp4"
+    video.write_bytes(b"\0" * 16)
+    calls = []
+    monkeypatch.setattr(probe, "_ffprobe_json", lambda args: calls.append(args) or FFPROBE_OUT)
+
+    info = probe_media(video)
+    assert info["duration"] == 12.5
+    assert info["video"]["codec"] == "h264" and round(info["video"]["fps"], 2) == 29.97
+    assert info["audio"]["channels"] == 2
+    probe_media(video)
+    assert len(calls) == 1  # second call served from the work-dir cache
+
+
+def test_mux_codecs_copy_when_mp4_compatible():
+    info = probe._parse(FFPROBE_OUT)
+    assert mux_codecs(info, {"audio": {"codec": "mp3"}}) == ("copy", "copy")
+    assert mux_codecs({"video": {"codec": "vp9"}}, {"audio": {"codec": "opus"}}) == ("libx264", "aac")
+    assert not is_wav_16k_mono(info)
+    assert is_wav_16k_mono({"video": None, "audio": {"codec": "pcm_s16le", "sample_rate": 16000, "channels": 1}})
@@ -0,0 +1,21 @@
+import subprocess
+import sys
+
+from app.utils.profiling import JobProfiler
+
+
+def test_job_profiler_records_stages_and_child_usage(tmp_path):
+    saved = {}
+    profiler = JobProfiler(sink=lambda stage, stats: saved.__setitem__(stage, stats), cprofile_path=tmp_path / "p.pstats")
+    profiler.start("busy")
+    sum(i * i for i in range(200_000))
+    profiler.start("child")
+    subprocess.run([sys.executable, "-c", "sum(i * i for i in range(2_000_000))"], check=True)
+    stages = profiler.finish()
+
+    assert list(stages) == ["busy", "child"] == list(saved)
+    assert stages["busy"]["cpu_sec"] > 0
+    assert stages["child"]["children"]["cpu_sec"] > 0
+    assert stages["child"]["children"]["peak_rss_mb"] > 0
+    assert stages["child"]["status"] == "ok"
+    assert (tmp_path / "p.pstats").exists() and (tmp_path / "p.txt").exists()
@@ -1,5 +1,8 @@
-import os
+import requests
 
+from app.config import settings
+from app.providers import base
+from app.providers.base import TTSProvider
 from app.providers.factory import get_tts_provider
 
 
@@ -8,3 +11,36 @@ def test_provider_fallback_gtts(monkeypatch):
     monkeypatch.delenv("ELEVENLABS_API_KEY", raising=False)
     provider = get_tts_provider()
     assert provider.__class__.__name__ == "GTTSProvider"
+
+
+def test_synthesize_segments_retries_throttled_segments(monkeypatch):
+    class _Throttled(requests.HTTPError):
+        def __init__(self):
+            super().__init__(response=type("R", (), {"status_code": 429})())
+
+    class _Flaky(TTSProvider):
+        def __init__(self):
+            self.failed = set()
+
+        def synthesize_chunks(self, texts):
+            (text,) = texts
+            if text not in self.failed:
+                self.failed.add(text)
+                raise _Throttled()
+            return [text.encode()]
+
+    monkeypatch.setattr(settings, "translate_backoff_base_sec", 0.01)
+    assert _Flaky().synthesize_segments(["a", " ", "b"], workers=2) == [b"a", None, b"b"]
+
+
+def test_synthesize_assembles_chunks_instead_of_concatenating(monkeypatch, tmp_path):
+    class _Chunks(TTSProvider):
+        def synthesize_chunks(self, texts):
+            return [text.encode() for text in texts]
+
+    calls = []
+    monkeypatch.setattr(base, "assemble_speech", lambda chunks, out, **kwargs: calls.append((chunks, out, kwargs)))
+    _Chunks().synthesize(["a", "b"], tmp_path / "tts.m4a")
+    assert calls == [
+        ([b"a", b"b"], tmp_path / "tts.m4a", {"gap_sec": settings.tts_gap_sec, "target_dbfs": settings.tts_target_dbfs})
+    ]
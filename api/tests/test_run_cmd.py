@@ -0,0 +1,68 @@
+import sys
+import time
+
+import pytest
+
+from app.utils.media import CommandCancelled, CommandError, cancellation, parse_progress, run_cmd
+
+
+def test_parse_progress_ffmpeg_and_ytdlp():
+    assert parse_progress("out_time_us=5000000", 10.0) == 0.5
+    assert parse_progress("progress=end", None) == 1.0
+    assert parse_progress("[download]  42.0% of 10.00MiB at 1.00MiB/s ETA 00:05", None) == 0.42
+    assert parse_progress("frame=12", 10.0) is None
+
+
+def test_run_cmd_streams_progress_with_bounded_tail():
+    script = (
+        "import sys\n"
+        "for i in range(5000): print('noise', i)\n"
+        "for p in (10, 50, 100): print(f'[download] {p}.0% of 1MiB', end='\\r', flush=True)\n"
+    )
+    seen = []
+    tail = run_cmd([sys.executable, "-c", script], on_progress=seen.append, tail_lines=50)
+    assert seen == [0.1, 0.5, 1.0]
+    assert len(tail) == 50
+
+
+def test_run_cmd_passes_every_line_to_on_line():
+    lines = []
+    run_cmd([sys.executable, "-c", "print('Load checkpoint from: x'); print(); print('Model loaded')"], on_line=lines.append)
+    assert lines == ["Load checkpoint from: x", "Model loaded"]
+
+
+def test_run_cmd_failure_reports_tail():
+    with pytest.raises(CommandError, match="boom"):
+        run_cmd([sys.executable, "-c", "import sys; print('boom'); sys.exit(3)"])
+
+
+def test_run_cmd_cancellation_terminates_process():
+    start = time.monotonic()
+    with pytest.raises(CommandCancelled):
+        run_cmd([sys.executable, "-c", "import time; time.sleep(30)"], should_cancel=lambda: time.monotonic() - start > 0.5)
+    assert time.monotonic() - start < 10
+
+
+def _gone(pid: int) -> bool:
+    # Reparented grandchildren may linger as zombies until init reaps them; that still counts as dead
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(")")[-1].split()[0] == "Z"
+    except FileNotFoundError:
+        return True
+
+
+def test_run_cmd_cancellation_kills_whole_process_tree(tmp_path):
+    pid_file = tmp_path / "child.pid"
+    # A wrapper that ignores SIGTERM and a grandchild doing the actual long-running work
+    script = f"trap '' TERM; sleep 60 & echo $! > {pid_file}; wait"
+    start = time.monotonic()
+    with cancellation(lambda: pid_file.exists() and time.monotonic() - start > 0.5):
+        with pytest.raises(CommandCancelled):
+            run_cmd(["sh", "-c", script])
+    assert time.monotonic() - start < 15
+    grandchild = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while not _gone(grandchild) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert _gone(grandchild)
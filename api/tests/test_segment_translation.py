@@ -0,0 +1,39 @@
+from app.utils import text
+from app.utils.subtitles import build_srt
+
+
+def test_translate_segments_one_request_keeps_alignment(monkeypatch):
+    calls = []
+    monkeypatch.setattr(text, "_openai_key", lambda: None)
+    monkeypatch.setattr(text, "GoogleTranslator", object)
+    monkeypatch.setattr(text, "_google_translate", lambda chunk, deadline=None: calls.append(chunk) or chunk.upper())
+    out, requests_made = text.translate_segments_to_korean(["hello there", "  general\nkenobi "])
+    assert out == ["HELLO THERE", "GENERAL KENOBI"]
+    assert requests_made == 1 and len(calls) == 1
+
+
+def test_translate_segments_falls_back_per_line_on_line_mismatch(monkeypatch):
+    monkeypatch.setattr(text, "_openai_key", lambda: None)
+    monkeypatch.setattr(text, "GoogleTranslator", object)
+    monkeypatch.setattr(text, "_google_translate", lambda chunk, deadline=None: chunk.replace("\n", " ") + "!")
+    out, requests_made = text.translate_segments_to_korean(["a", "b"])
+    assert out == ["a!", "b!"]
+    assert requests_made == 3
+
+
+def test_build_srt():
+    srt = build_srt([{"start": 0.0, "end": 1.5}, {"start": 61.25, "end": 62.0}], ["안녕", "하세요"])
+    assert srt == "1\n00:00:00,000 --> 00:00:01,500\n안녕\n\n2\n00:01:01,250 --> 00:01:02,000\n하세요\n"
+
+
+def test_append_cues_grows_srt_and_vtt(tmp_path):
+    from app.utils.subtitles import append_cues
+
+    srt, vtt = tmp_path / "p.srt", tmp_path / "p.vtt"
+    nxt = append_cues(srt, vtt, 1, [{"start": 0.0, "end": 1.0}], ["하나"])
+    nxt = append_cues(srt, vtt, nxt, [{"start": 60.0, "end": 61.5}], ["둘"])
+    assert nxt == 3
+    assert srt.read_text(encoding="utf-8").startswith("1\n00:00:00,000 --> 00:00:01,000\n하나\n\n2\n")
+    assert vtt.read_text(encoding="utf-8") == (
+        "WEBVTT\n\n00:00:00.000 --> 00:00:01.000\n하나\n\n00:01:00.000 --> 00:01:01.500\n둘\n\n"
+    )
@@ -0,0 +1,100 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from app.utils import media, speech_spans
+from app.utils.speech_spans import plan_spans, render_speech_only, speech_spans as merge_speech_spans
+
+
+def test_speech_spans_merge_short_pauses():
+    segs = [{"start": 1.0, "end": 2.0}, {"start": 2.5, "end": 3.0}, {"start": 8.0, "end": 9.0}]
+    assert merge_speech_spans(segs, 10.0, pad=0.0, min_gap=1.0) == [(1.0, 3.0), (8.0, 9.0)]
+
+
+def test_plan_spans_cover_timeline_and_snap_to_keyframes():
+    segs = [{"start": 3.2, "end": 4.1}, {"start": 12.5, "end": 13.0}]
+    plan = plan_spans(segs, 20.0, keyframes=[0.0, 2.0, 5.0, 10.0, 15.0], pad=0.0, min_gap=1.0)
+    assert plan == [(0.0, 2.0, False), (2.0, 5.0, True), (5.0, 10.0, False), (10.0, 15.0, True), (15.0, 20.0, False)]
+    # non-speech spans start on keyframes so they can be stream-copied
+    assert all(start in (0.0, 2.0, 5.0, 10.0, 15.0) for start, _, speech in plan if not speech)
+
+
+def _render_mocked(monkeypatch, tmp_path, codec):
+    cmds, rendered = [], []
+
+    def fake_run_cmd(cmd, **kwargs):
+        cmds.append(cmd)
+        Path(cmd[-1]).touch()
+
+    monkeypatch.setattr(media, "run_cmd", fake_run_cmd)
+    monkeypatch.setattr(speech_spans, "probe_video_stream", lambda v: {"codec": codec, "width": 64, "height": 48, "fps": 25.0})
+    monkeypatch.setattr(speech_spans, "probe_duration", lambda m: 10.0)
+    monkeypatch.setattr(speech_spans, "keyframe_times", lambda v: [0.0, 2.0, 5.0, 8.0])
+    monkeypatch.setattr(speech_spans.settings, "speech_pad_sec", 0.0)
+    monkeypatch.setattr(speech_spans.settings, "speech_min_gap_sec", 1.0)
+
+    render_speech_only(
+        tmp_path / "face.mp4",
+        tmp_path / "timed_dub.wav",
+        [{"start": 3.0, "end": 4.5}],
+        tmp_path / "out.mp4",
+        render=lambda face, audio, out: rendered.append((face.name, audio.name)),
+        work_dir=tmp_path / "spans",
+    )
+    parts = {Path(c[-1]).name: c for c in cmds if c[-1].endswith(".ts")}
+    (audio_cut,) = [c for c in cmds if str(tmp_path / "timed_dub.wav") in c]
+    return parts, rendered, audio_cut
+
+
+def test_render_speech_only_copies_h264_between_keyframes(monkeypatch, tmp_path):
+    parts, rendered, audio_cut = _render_mocked(monkeypatch, tmp_path, "h264")
+
+    assert sorted(parts) == ["part_0000.ts", "part_0001.ts", "part_0002.ts"]
+    assert rendered == [("face_0001.mp4", "audio_0001.wav")]
+    # non-speech spans are stream-copied; only the keyframe-widened speech span is encoded
+    assert "copy" in parts["part_0000.ts"] and "copy" in parts["part_0002.ts"]
+    assert "libx264" in parts["part_0001.ts"]
+    assert audio_cut[audio_cut.index("-ss") + 1] == "2.000000" and audio_cut[audio_cut.index("-t") + 1] == "3.000000"
+
+
+def test_render_speech_only_encodes_other_codecs_alike(monkeypatch, tmp_path):
+    parts, rendered, audio_cut = _render_mocked(monkeypatch, tmp_path, "hevc")
+
+    assert len(parts) == 3 and rendered == [("face_0001.mp4", "audio_0001.wav")]
+    encoder_args = [c[c.index("-c:v") : -1] for c in parts.values()]
+    assert all(args == encoder_args[0] for args in encoder_args) and "copy" not in encoder_args[0]
+    assert audio_cut[audio_cut.index("-ss") + 1] == "3.000000" and audio_cut[audio_cut.index("-t") + 1] == "1.500000"
+
+
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="needs ffmpeg")
+def test_render_speech_only_splices_synthetic_clip(tmp_path):
+    face, audio = tmp_path / "face.mp4", tmp_path / "dub.wav"
+    subprocess.run(
+        ["ffmpeg", "-y", "-f", "lavfi", "-i", "testsrc=size=96x64:rate=25:duration=4", "-c:v", "libx264", "-g", "25", str(face)],
+        check=True,
+        capture_output=True,
+    )
+    subprocess.run(
+        ["ffmpeg", "-y", "-f", "lavfi", "-i", "anullsrc=r=16000:cl=mono", "-t", "4", str(audio)], check=True, capture_output=True
+    )
+    out = tmp_path / "out.mp4"
+
+    render_speech_only(
+        face,
+        audio,
+        [{"start": 1.3, "end": 2.6}],
+        out,
+        render=lambda face_part, audio_part, out_part: shutil.copy(face_part, out_part),
+        work_dir=tmp_path / "spans",
+    )
+
+    assert media.probe_duration(out) == pytest.approx(4.0, abs=0.1)
+    frames = subprocess.run(
+        ["ffprobe", "-v", "error", "-count_frames", "-select_streams", "v:0", "-show_entries", "stream=nb_read_frames", "-of", "csv=p=0", str(out)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+    assert int(frames) == 100
@@ -0,0 +1,37 @@
+import pytest
+
+from app.utils.storage import atomic_output, place_file
+
+
+def test_place_file_links_without_copy(tmp_path):
+    src = tmp_path / "work" / "out.mp4"
+    src.parent.mkdir()
+    src.write_bytes(b"video")
+    dst = tmp_path / "results" / "translated_video.mp4"
+    assert place_file(src, dst) in ("hardlink", "reflink")
+    assert dst.read_bytes() == b"video" and src.exists()
+    assert place_file(src, dst) == "same"
+
+
+def test_place_file_move_consumes_source(tmp_path):
+    src = tmp_path / "a.mp4"
+    src.write_bytes(b"x")
+    assert place_file(src, tmp_path / "b.mp4", move=True) == "move"
+    assert not src.exists() and (tmp_path / "b.mp4").read_bytes() == b"x"
+
+
+def test_atomic_output_replaces_linked_inode_and_cleans_up_on_error(tmp_path):
+    src = tmp_path / "src.mp4"
+    src.write_bytes(b"old")
+    dst = tmp_path / "dst.mp4"
+    place_file(src, dst)
+    with atomic_output(dst) as tmp:
+        assert tmp.suffix == ".mp4" and tmp.parent == dst.parent
+        tmp.write_bytes(b"new")
+    assert dst.read_bytes() == b"new" and src.read_bytes() == b"old"
+
+    with pytest.raises(RuntimeError), atomic_output(dst) as tmp:
+        tmp.write_bytes(b"partial")
+        raise RuntimeError("ffmpeg failed")
+    assert dst.read_bytes() == b"new"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["dst.mp4", "src.mp4"]
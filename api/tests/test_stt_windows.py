@@ -0,0 +1,50 @@
+import wave
+
+import numpy as np
+
+from app.utils import stt
+
+RATE = 100  # frames per second; each sample stores its own frame index so the fake model knows its offset
+UTTERANCES = [(t, t + 6.0) for t in np.arange(0.0, 200.0, 7.0)]
+
+
+class _FakeWhisper:
+    """Reports every utterance overlapping the window, truncated at the window end like Whisper would."""
+
+    def transcribe(self, samples, task, language, initial_prompt):
+        offset = round(float(samples[0]) * 32768) / RATE
+        span_end = offset + len(samples) / RATE
+        segments = []
+        for start, end in UTTERANCES:
+            if end <= offset or start >= span_end:
+                continue
+            text = f"u{start:g}" if start >= offset else f"tail-of-u{start:g}"
+            segments.append({"start": max(start, offset) - offset, "end": min(end, span_end) - offset, "text": text})
+        return {"language": "en", "text": " ".join(s["text"] for s in segments), "segments": segments}
+
+
+def _write_wav(path, seconds):
+    frames = np.arange(int(seconds * RATE), dtype=np.int16)
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(RATE)
+        wf.writeframes(frames.tobytes())
+
+
+def test_windows_cut_between_segments_without_fragments_or_duplicates(monkeypatch, tmp_path):
+    wav = tmp_path / "audio.wav"
+    _write_wav(wav, 200)
+    monkeypatch.setattr(stt, "load_whisper_model", lambda name, log: _FakeWhisper())
+    windows = list(stt.transcribe_windows(wav, window_sec=30, overlap_sec=10))
+    segments = [seg for w in windows for seg in w["segments"]]
+    assert len(windows) > 1
+    assert [seg["text"] for seg in segments] == [f"u{start:g}" for start, _ in UTTERANCES]
+    assert [(seg["start"], seg["end"]) for seg in segments] == [(s, min(e, 200.0)) for s, e in UTTERANCES]
+
+
+def test_split_at_seam_always_moves_forward():
+    kept, resume = stt.split_at_seam([{"start": 31.0, "end": 35.0, "text": "late"}], 30.0, 40.0, last=False)
+    assert kept == [] and resume == 30.0
+    kept, resume = stt.split_at_seam([{"start": 0.0, "end": 0.0, "text": "x"}], 30.0, 40.0, last=False)
+    assert resume == 1.0
@@ -0,0 +1,81 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.config import settings
+from app.utils.storage import download_file
+from app.utils.wav2lip import run_wav2lip_sync_api
+
+PAYLOAD = bytes(range(256)) * 4096  # 1 MiB
+
+
+class _FakeSyncHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the Sync API and its output file host."""
+
+    polls = 0
+    ranges: list = []
+
+    def log_message(self, *args):  # silence test output
+        pass
+
+    def _json(self, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._json({"id": "gen-1", "status": "PENDING"})
+
+    def do_GET(self):
+        if self.path.startswith("/generations/"):
+            type(self).polls += 1
+            done = type(self).polls >= 2
+            host = f"http://{self.headers['Host']}"
+            self._json({"status": "COMPLETED" if done else "PROCESSING", "outputUrl": f"{host}/out.mp4"})
+            return
+        rng = self.headers.get("Range")
+        type(self).ranges.append(rng)
+        start = int(rng.split("=")[1].rstrip("-")) if rng else 0
+        body = PAYLOAD[start:]
+        self.send_response(206 if rng else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture()
+def fake_sync():
+    _FakeSyncHandler.polls = 0
+    _FakeSyncHandler.ranges = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeSyncHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_download_file_resumes_from_partial(tmp_path, fake_sync):
+    out = tmp_path / "out.mp4"
+    (tmp_path / "out.mp4.part").write_bytes(PAYLOAD[:1000])
+    download_file(f"{fake_sync}/out.mp4", out)
+    assert out.read_bytes() == PAYLOAD
+    assert _FakeSyncHandler.ranges == ["bytes=1000-"]
+    assert not (tmp_path / "out.mp4.part").exists()
+
+
+def test_sync_api_polls_with_backoff_and_downloads(tmp_path, fake_sync, monkeypatch):
+    monkeypatch.setattr(settings, "sync_api_key", "test-key")
+    monkeypatch.setattr(settings, "sync_base_url", fake_sync)
+    monkeypatch.setattr(settings, "sync_poll_initial_sec", 0)
+    monkeypatch.setenv("W2L_VIDEO_URL", "http://example.invalid/v.mp4")
+    monkeypatch.setenv("W2L_AUDIO_URL", "http://example.invalid/a.wav")
+    out = tmp_path / "result.mp4"
+    run_wav2lip_sync_api(tmp_path / "face.mp4", tmp_path / "a.wav", out, timeout_sec=30)
+    assert _FakeSyncHandler.polls == 2
+    assert out.read_bytes() == PAYLOAD
@@ -0,0 +1,50 @@
+import hashlib
+import hmac
+import json
+
+import pytest
+
+from app.config import settings
+
+main = pytest.importorskip("app.main")
+testclient = pytest.importorskip("fastapi.testclient")
+
+
+@pytest.fixture
+def webhook(monkeypatch):
+    seen = {"fetched": [], "enqueued": []}
+
+    def fetch(generation_id):
+        seen["fetched"].append(generation_id)
+        return "COMPLETED", "https://sync.example/out.mp4"
+
+    monkeypatch.setattr(settings, "sync_webhook_secret", "s3cret")
+    monkeypatch.setattr(main, "sync_generation_pending", lambda generation_id: generation_id == "gen-1")
+    monkeypatch.setattr(main, "get_sync_generation", fetch)
+    monkeypatch.setattr(main, "claim_sync_generation", lambda generation_id: "job1")
+    monkeypatch.setattr(main, "append_log", lambda job_id, message: None)
+    monkeypatch.setattr(main, "enqueue_finalize_sync_lipsync", lambda *args: seen["enqueued"].append(args))
+    return seen
+
+
+def _post(body, secret="s3cret"):
+    raw = json.dumps(body).encode()
+    signature = hmac.new(secret.encode(), raw, hashlib.sha256).hexdigest()
+    client = testclient.TestClient(main.app)
+    return client.post("/webhooks/sync", content=raw, headers={"X-Sync-Signature": signature})
+
+
+def test_webhook_uses_the_generation_fetched_from_sync_not_the_body(webhook):
+    r = _post({"id": "gen-1", "status": "COMPLETED", "outputUrl": "https://attacker.example/evil.mp4"})
+    assert r.status_code == 200
+    assert webhook["fetched"] == ["gen-1"]
+    assert webhook["enqueued"] == [("job1", "COMPLETED", "https://sync.example/out.mp4")]
+
+
+def test_webhook_rejects_bad_signatures_and_unknown_generations(webhook, monkeypatch):
+    assert _post({"id": "gen-1"}, secret="wrong").status_code == 403
+    assert _post({"id": "gen-2"}).status_code == 200
+    assert webhook["fetched"] == [] and webhook["enqueued"] == []
+
+    monkeypatch.setattr(settings, "sync_webhook_secret", None)
+    assert _post({"id": "gen-1"}).status_code == 404
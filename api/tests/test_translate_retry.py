@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from app.config import settings
+from app.utils import text
+
+
+class _Resp:
+    def __init__(self, status, content=""):
+        self.status_code = status
+        self.headers = {"Retry-After": "0"} if status == 429 else {}
+        self._content = content
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(response=self)
+
+    def json(self):
+        return {"choices": [{"message": {"content": self._content}}]}
+
+
+class _FlakySession:
+    """Answers 429 on the first call for every chunk, then echoes the chunk uppercased."""
+
+    def __init__(self):
+        self.seen = set()
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def post(self, url, headers, json, timeout):
+        chunk = json["messages"][1]["content"]
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+            if chunk not in self.seen:
+                self.seen.add(chunk)
+                return _Resp(429)
+        return _Resp(200, chunk.upper())
+
+
+def test_openai_chunks_run_concurrently_retry_and_keep_order(monkeypatch):
+    session = _FlakySession()
+    monkeypatch.setattr(text, "_http", lambda: session)
+    monkeypatch.setattr(text, "_openai_key", lambda: "key")
+    monkeypatch.setattr(settings, "translate_concurrency", 4)
+    monkeypatch.setattr(settings, "translate_backoff_base_sec", 0.01)
+    paragraphs = [f"paragraph {i} " + "x" * 5000 for i in range(4)]
+    out = text.translate_to_korean_natural("\n\n".join(paragraphs))
+    assert out.split("\n\n") == [p.upper() for p in paragraphs]
+    assert session.calls == 8  # one 429 + one success per chunk
+    assert session.peak > 1
+
+
+def test_with_retries_does_not_retry_programming_errors(monkeypatch):
+    monkeypatch.setattr(settings, "translate_backoff_base_sec", 0.01)
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise KeyError("choices")
+
+    with pytest.raises(KeyError):
+        text.with_retries(broken, attempts=3)
+    assert len(calls) == 1
+
+    flaky = iter([requests.ConnectionError("reset"), "ok"])
+
+    def connect():
+        item = next(flaky)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    assert text.with_retries(connect, attempts=3) == "ok"
+
+
+def test_segment_translation_raises_once_retries_are_exhausted(monkeypatch):
+    monkeypatch.setattr(settings, "translate_backoff_base_sec", 0.01)
+    monkeypatch.setattr(settings, "translate_max_retries", 1)
+    monkeypatch.setattr(text, "_openai_key", lambda: None)
+    monkeypatch.setattr(text, "GoogleTranslator", object)
+
+    def throttled(chunk, deadline=None):
+        return text.with_retries(lambda: (_ for _ in ()).throw(text.RetryableError("HTTP 429")))
+
+    monkeypatch.setattr(text, "_google_translate", throttled)
+    with pytest.raises(text.TranslationError):
+        text.translate_segments_to_korean(["hello", "world"])
+
+
+def test_segment_translation_does_not_fall_back_on_non_transient_errors(monkeypatch):
+    monkeypatch.setattr(text, "_openai_key", lambda: None)
+    monkeypatch.setattr(text, "GoogleTranslator", object)
+    calls = []
+
+    def bad_credentials(chunk, deadline=None):
+        calls.append(chunk)
+        raise requests.HTTPError(response=_Resp(403))
+
+    monkeypatch.setattr(text, "_google_translate", bad_credentials)
+    with pytest.raises(text.TranslationError):
+        text.translate_segments_to_korean([f"line {i}" for i in range(20)])
+    assert len(calls) == 1  # no line-by-line fallback
+
+
+def test_line_fallback_shares_one_retry_budget(monkeypatch):
+    monkeypatch.setattr(settings, "translate_backoff_base_sec", 0.05)
+    monkeypatch.setattr(settings, "translate_max_retries", 3)
+    monkeypatch.setattr(text, "_openai_key", lambda: None)
+    monkeypatch.setattr(text, "GoogleTranslator", object)
+    monkeypatch.setattr(text, "_backoff_delay", lambda attempt, retry_after=None: 0.05 * 2**attempt)
+    calls = []
+
+    def outage(chunk, deadline=None):
+        def call():
+            calls.append(chunk)
+            raise text.RetryableError("HTTP 503")
+
+        return text.with_retries(call, deadline=deadline)
+
+    monkeypatch.setattr(text, "_google_translate", outage)
+    started = time.monotonic()
+    with pytest.raises(text.TranslationError):
+        text.translate_segments_to_korean([f"line {i}" for i in range(20)])
+    # 4 attempts for the chunk, then the first line spends the shared budget and fails the job
+    line_calls = calls[4:]
+    assert 1 <= len(line_calls) <= 4 and set(line_calls) == {"line 0"}
+    assert time.monotonic() - started < 1.5
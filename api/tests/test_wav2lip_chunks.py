@@ -0,0 +1,93 @@
+import shutil
+import subprocess
+import time
+
+import pytest
+
+from app.utils import wav2lip
+from app.utils.wav2lip import chunk_boundaries
+from bench.wav2lip_scaling import scaling_report
+
+
+def test_chunk_boundaries_start_on_keyframes_and_cover_duration():
+    keyframes = [float(k) for k in range(0, 600, 4)]
+    bounds = chunk_boundaries(600.0, keyframes, chunks=4, min_chunk_sec=30)
+    assert len(bounds) == 4
+    assert bounds[0][0] == 0.0 and bounds[-1][1] == 600.0
+    assert all(start in keyframes for start, _ in bounds)
+    assert all(a[1] == b[0] for a, b in zip(bounds, bounds[1:]))
+
+
+def test_chunk_boundaries_short_video_single_chunk():
+    assert chunk_boundaries(40.0, [0.0, 10.0, 20.0, 30.0], chunks=8, min_chunk_sec=30) == [(0.0, 40.0)]
+
+
+def test_chunked_stats_report_utilization_without_model_load(monkeypatch, tmp_path):
+    def fake_local(face, audio, out, cwd=None, env=None, on_line=None):
+        on_line("Load checkpoint from: wav2lip_gan.pth")
+        time.sleep(0.2)
+        on_line("Model loaded")
+        time.sleep(0.1)
+
+    monkeypatch.setattr(wav2lip, "probe_duration", lambda video: 120.0)
+    monkeypatch.setattr(wav2lip, "keyframe_times", lambda video: [0.0, 60.0])
+    monkeypatch.setattr(wav2lip.settings, "wav2lip_chunk_min_sec", 30)
+    for name in ("cut_video", "cut_audio", "remux_to_ts", "concat_videos", "mux_video_audio"):
+        monkeypatch.setattr(wav2lip, name, lambda *args, **kwargs: None)
+    monkeypatch.setattr(wav2lip, "run_wav2lip_local", fake_local)
+
+    stats = wav2lip.run_wav2lip_chunked(tmp_path / "face.mp4", tmp_path / "a.wav", tmp_path / "out.mp4", workers=2)
+    assert stats["chunks"] == 2
+    assert 0.35 <= stats["model_load_sec_total"] < 0.6
+    assert 0.15 <= stats["chunk_sec_total"] < 0.4
+    assert "speedup" not in stats and 0 < stats["utilization"] <= 1.0
+
+
+def test_scaling_report_speedup_and_efficiency_against_single_process():
+    report = scaling_report(100.0, {4: {"wall_sec": 40.0}, 2: {"wall_sec": 60.0}})
+    assert list(report["runs"]) == ["2", "4"]
+    assert report["runs"]["2"]["speedup"] == 1.67 and report["runs"]["2"]["efficiency"] == 0.83
+    assert report["runs"]["4"]["speedup"] == 2.5 and report["runs"]["4"]["efficiency"] == 0.62
+
+
+def _count_frames(video):
+    out = subprocess.run(
+        ["ffprobe", "-v", "error", "-count_frames", "-select_streams", "v:0", "-show_entries", "stream=nb_read_frames", "-of", "csv=p=0", str(video)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return int(out.strip())
+
+
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="needs ffmpeg")
+def test_chunk_seams_keep_every_frame(monkeypatch, tmp_path):
+    face, audio = tmp_path / "face.mp4", tmp_path / "audio.wav"
+    subprocess.run(
+        ["ffmpeg", "-y", "-f", "lavfi", "-i", "testsrc=size=96x64:rate=25:duration=6", "-c:v", "libx264", "-g", "25", str(face)],
+        check=True,
+        capture_output=True,
+    )
+    subprocess.run(
+        ["ffmpeg", "-y", "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=16000", "-t", "6", str(audio)],
+        check=True,
+        capture_output=True,
+    )
+
+    def fake_local(face_part, audio_part, out, cwd=None, env=None, on_line=None):
+        # Stands in for inference.py: a fresh libx264 encode of the chunk with its audio
+        subprocess.run(
+            ["ffmpeg", "-y", "-i", str(face_part), "-i", str(audio_part), "-c:v", "libx264", "-c:a", "aac", str(out)],
+            check=True,
+            capture_output=True,
+        )
+
+    monkeypatch.setattr(wav2lip, "run_wav2lip_local", fake_local)
+    monkeypatch.setattr(wav2lip.settings, "wav2lip_chunk_min_sec", 1)
+    out = tmp_path / "out" / "lipsynced.mp4"
+
+    stats = wav2lip.run_wav2lip_chunked(face, audio, out, workers=3)
+
+    assert stats["chunks"] == 3
+    assert _count_frames(out) == _count_frames(face) == 150
+    assert wav2lip.probe_duration(out) == pytest.approx(wav2lip.probe_duration(face), abs=0.05)
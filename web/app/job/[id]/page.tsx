@@ -2,13 +2,16 @@
 import { useEffect, useMemo, useRef, useState } from "react";
 import Link from "next/link";
 
-type JobStatus = "QUEUED" | "RUNNING" | "FAILED" | "DONE";
+type JobStatus = "QUEUED" | "RUNNING" | "FAILED" | "DONE" | "CANCELLED";
 
 type JobStatusResponse = {
   status: JobStatus;
   progress: number;
   resultUrl?: string;
+  draftUrl?: string;
+  previewSubtitlesUrl?: string;
   logs?: string[];
+  logCursor?: number;
   error?: string;
 };
 
@@ -16,6 +19,7 @@ export default function JobPage({ params }: { params: Promise<{ id: string }> })
   const [jobId, setJobId] = useState<string | null>(null);
   const [state, setState] = useState<JobStatusResponse>({ status: "QUEUED", progress: 0 });
   const [logText, setLogText] = useState("");
+  const [liveSubs, setLiveSubs] = useState<string[]>([]);
   const esRef = useRef<EventSource | null>(null);
   const [sseStatus, setSseStatus] = useState<"connecting" | "open" | "error">("connecting");
   const [sseError, setSseError] = useState<string | null>(null);
@@ -38,6 +42,7 @@ export default function JobPage({ params }: { params: Promise<{ id: string }> })
       })
       .then((d: JobStatusResponse) => setState(d))
       .catch((e) => setSseError(String(e?.message || e)));
+    let stopped = false;
     const es = new EventSource(`${apiBase}/stream/${jobId}`);
     esRef.current = es;
     es.onopen = () => {
@@ -52,6 +57,12 @@ export default function JobPage({ params }: { params: Promise<{ id: string }> })
           setState((prev) => ({ ...prev, ...data }));
         } else if (data.type === "result") {
           setState((prev) => ({ ...prev, resultUrl: data.result_url || data.resultUrl }));
+        } else if (data.type === "draft") {
+          setState((prev) => ({ ...prev, draftUrl: data.draft_url }));
+        } else if (data.type === "subtitles") {
+          // STT 윈도우별 번역 자막 미리보기 (최근 5줄)
+          const texts = (data.cues || []).map((c: { text: string }) => c.text);
+          setLiveSubs((prev) => [...prev, ...texts].slice(-5));
         } else if (data.type === "log") {
           setLogText((t) => `${t}${t ? "\n" : ""}${data.message}`);
         }
@@ -60,20 +71,40 @@ export default function JobPage({ params }: { params: Promise<{ id: string }> })
     es.onerror = (err) => {
       setSseStatus("error");
       setSseError("SSE connection error; falling back to polling");
-      // SSE 연결이 종료되면 폴백으로 주기적 조회
+      // SSE 연결이 종료되면 폴백으로 롱폴링 (ETag + 로그 커서로 변경분만 수신)
       es.close();
-      const iv = setInterval(async () => {
-        const r = await fetch(`${apiBase}/jobs/${jobId}`);
-        if (r.ok) {
-          const d = (await r.json()) as JobStatusResponse;
-          setState(d);
-          if (d.logs) setLogText(d.logs.join("\n"));
-          if (d.status === "DONE" || d.status === "FAILED") clearInterval(iv);
+      let cursor = 0;
+      let etag: string | null = null;
+      const poll = async () => {
+        while (!stopped) {
+          try {
+            const headers: Record<string, string> = etag ? { "If-None-Match": etag } : {};
+            const r = await fetch(`${apiBase}/jobs/${jobId}?sinceLog=${cursor}&wait=25`, { headers });
+            if (r.status === 304) {
+              // 변경 없음: 서버가 wait를 짧게 자르더라도 요청이 몰리지 않도록 잠깐 쉰다
+              await new Promise((res) => setTimeout(res, 1000));
+              continue;
+            }
+            if (!r.ok) throw new Error(`GET /jobs/${jobId} failed: ${r.status}`);
+            etag = r.headers.get("ETag");
+            const d = (await r.json()) as JobStatusResponse;
+            setState(d);
+            const lines = (d.logs || []).join("\n");
+            const first = cursor === 0;
+            if (lines) setLogText((t) => (first || !t ? lines : `${t}\n${lines}`));
+            cursor = d.logCursor ?? cursor;
+            if (d.status === "DONE" || d.status === "FAILED" || d.status === "CANCELLED") break;
+          } catch {
+            await new Promise((res) => setTimeout(res, 3000));
+          }
         }
-      }, 1500);
-      return () => clearInterval(iv);
+      };
+      poll();
+    };
+    return () => {
+      stopped = true;
+      es.close();
     };
-    return () => es.close();
   }, [apiBase, jobId]);
 
   if (!jobId) return <div>Loading...</div>;
@@ -94,6 +125,20 @@ export default function JobPage({ params }: { params: Promise<{ id: string }> })
         <div className="progress"><div style={{ width: `${state.progress}%` }} /></div>
         <p style={{ marginTop: 8 }}>상태: {state.status} ({state.progress}%)</p>
         {state.error && <p style={{ color: "#fca5a5" }}>{state.error}</p>}
+        {(state.status === "QUEUED" || state.status === "RUNNING") && (
+          <button
+            className="button"
+            onClick={() => fetch(`${apiBase}/jobs/${jobId}`, { method: "DELETE" }).catch((e) => setSseError(String(e?.message || e)))}
+          >
+            작업 취소
+          </button>
+        )}
+        {state.draftUrl && !resultUrl && (
+          <div style={{ marginTop: 12 }}>
+            <div style={{ fontSize: 14, opacity: 0.9 }}>미리보기(초안) — 고품질 결과를 생성 중입니다</div>
+            <video controls src={`${apiBase}${state.draftUrl}`} style={{ width: "100%", borderRadius: 12, marginTop: 8 }} />
+          </div>
+        )}
         {resultUrl && (
           <div style={{ marginTop: 12 }}>
             <a className="button" href={resultUrl} download>Download Result</a>
@@ -103,6 +148,17 @@ export default function JobPage({ params }: { params: Promise<{ id: string }> })
           </div>
         )}
       </div>
+      {(liveSubs.length > 0 || state.previewSubtitlesUrl) && (
+        <div className="card" style={{ marginTop: 12 }}>
+          <div style={{ fontSize: 14, opacity: 0.9 }}>실시간 자막 미리보기</div>
+          <div className="log">{liveSubs.join("\n")}</div>
+          {state.previewSubtitlesUrl && (
+            <a href={`${apiBase}${state.previewSubtitlesUrl}`} target="_blank" rel="noreferrer">
+              WebVTT
+            </a>
+          )}
+        </div>
+      )}
       <div className="card" style={{ marginTop: 12 }}>
         <div className="log">{logText || (state.logs || []).join("\n")}</div>
       </div>
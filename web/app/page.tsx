@@ -5,12 +5,16 @@ import { z } from "zod";
 const CreateJobSchema = z.object({
   youtubeUrl: z.string().url(),
   options: z.any().optional(),
+  start: z.number().nonnegative().optional(),
+  end: z.number().positive().optional(),
 });
 
 type CreateJobResponse = { jobId: string };
 
 export default function HomePage() {
   const [url, setUrl] = useState("");
+  const [start, setStart] = useState("");
+  const [end, setEnd] = useState("");
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [options, setOptions] = useState<any>(undefined);
@@ -35,7 +39,8 @@ export default function HomePage() {
   async function onSubmit(e: React.FormEvent) {
     e.preventDefault();
     setError(null);
-    const parsed = CreateJobSchema.safeParse({ youtubeUrl: url, options });
+    const clip = { start: start ? Number(start) : undefined, end: end ? Number(end) : undefined };
+    const parsed = CreateJobSchema.safeParse({ youtubeUrl: url, options, ...clip });
     if (!parsed.success) {
       setError("유효한 YouTube URL을 입력해주세요.");
       return;
@@ -45,8 +50,12 @@ export default function HomePage() {
       const res = await fetch(`${apiBase}/jobs`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ youtubeUrl: url, options }),
+        body: JSON.stringify({ youtubeUrl: url, options, ...clip }),
       });
+      if (res.status === 429) {
+        const retryAfter = res.headers.get("Retry-After");
+        throw new Error(`서버가 혼잡합니다. ${retryAfter ? `${retryAfter}초 후` : "잠시 후"} 다시 시도해주세요.`);
+      }
       if (!res.ok) throw new Error("작업 생성 실패");
       const data = (await res.json()) as CreateJobResponse;
       window.location.href = `/job/${data.jobId}`;
@@ -63,6 +72,10 @@ export default function HomePage() {
       <div className="card" style={{ marginTop: 16 }}>
         <form onSubmit={onSubmit}>
           <input className="input" placeholder="YouTube URL" value={url} onChange={(e) => setUrl(e.target.value)} />
+          <div style={{ display: "flex", gap: 8, marginTop: 12 }}>
+            <input className="input" type="number" min={0} step="any" placeholder="시작(초, 선택)" value={start} onChange={(e) => setStart(e.target.value)} />
+            <input className="input" type="number" min={0} step="any" placeholder="끝(초, 선택)" value={end} onChange={(e) => setEnd(e.target.value)} />
+          </div>
           <div
             onDragOver={(e) => { e.preventDefault(); setDropActive(true); }}
             onDragLeave={() => setDropActive(false)}